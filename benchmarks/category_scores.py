@@ -0,0 +1,101 @@
+"""
+Building, threshold-checking and ranking large batches of moderation scores.
+
+Generates responses moderation responses (as json, the way the endpoint returns
+them) with random scores and times, for the array-backed CategoryScores and for the
+attribute-per-category layout it replaced: parsing the scores, checking them against
+a guild's per-category thresholds, and finding each one's highest category.  Also
+reports the memory the batch of scores keeps once the parsed json is dropped.
+
+usage: python benchmarks/category_scores.py [responses]
+"""
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from TalkTurbo.Moderations import CATEGORIES, CategoryScores, ModerationThresholds
+
+THRESHOLDS = {"violence": 0.6, "self-harm/intent": 0.2, "hate/threatening": 0.3}
+
+
+class AttributeScores:
+    """The previous layout: one instance attribute per category, built from the dict."""
+
+    def __init__(self, scores: dict) -> None:
+        self.sexual = scores.get("sexual", 0.0)
+        self.hate = scores.get("hate", 0.0)
+        self.harassment = scores.get("harassment", 0.0)
+        self.selfharm = scores.get("self-harm", 0.0)
+        self.sexual_minor = scores.get("sexual/minors", 0.0)
+        self.hate_threatening = scores.get("hate/threatening", 0.0)
+        self.violence_graphic = scores.get("violence/graphic", 0.0)
+        self.self_harm_intent = scores.get("self-harm/intent", 0.0)
+        self.self_harm_instruction = scores.get("self-harm/instructions", 0.0)
+        self.harassment_threatening = scores.get("harassment/threatening", 0.0)
+        self.violence = scores.get("violence", 0.0)
+
+    def max_category(self) -> str:
+        return max(vars(self), key=vars(self).get)
+
+
+ATTRIBUTE_THRESHOLDS = {"violence": 0.6, "self_harm_intent": 0.2, "hate_threatening": 0.3}
+
+
+def attribute_breached(scores: AttributeScores) -> bool:
+    return any(getattr(scores, name) >= value for name, value in ATTRIBUTE_THRESHOLDS.items())
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def build_memory(build) -> int:
+    tracemalloc.start()
+    batch = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del batch
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    random.seed(0)
+    responses = [
+        json.dumps({category: random.random() ** 8 for category in CATEGORIES})
+        for _ in range(count)
+    ]
+    thresholds = ModerationThresholds(THRESHOLDS)
+
+    parsed = [json.loads(scores) for scores in responses]
+
+    old, old_build = timed(lambda: [AttributeScores(scores) for scores in parsed])
+    old_flags, old_check = timed(lambda: [attribute_breached(scores) for scores in old])
+    _, old_max = timed(lambda: [scores.max_category() for scores in old])
+    old_memory = build_memory(lambda: [AttributeScores(json.loads(scores)) for scores in responses])
+
+    new, new_build = timed(lambda: [CategoryScores.from_mapping(scores) for scores in parsed])
+    new_flags, new_check = timed(lambda: thresholds.breached_batch(new))
+    _, new_max = timed(lambda: [scores.max_category() for scores in new])
+    new_memory = build_memory(
+        lambda: [CategoryScores.from_mapping(json.loads(scores)) for scores in responses]
+    )
+
+    assert old_flags == new_flags
+
+    print(f"{count} moderation responses, {sum(new_flags)} breach the thresholds")
+    print(f"{'':>12} {'attributes':>12} {'array':>12}")
+    print(f"{'build':>12} {1000 * old_build:>9.1f} ms {1000 * new_build:>9.1f} ms")
+    print(f"{'thresholds':>12} {1000 * old_check:>9.1f} ms {1000 * new_check:>9.1f} ms")
+    print(f"{'max':>12} {1000 * old_max:>9.1f} ms {1000 * new_max:>9.1f} ms")
+    print(f"{'memory':>12} {old_memory / 2**20:>9.1f} MB {new_memory / 2**20:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
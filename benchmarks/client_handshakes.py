@@ -0,0 +1,134 @@
+"""
+TLS handshakes made when guilds switch models, with and without shared clients.
+
+Starts a local HTTPS stand-in for the OpenAI API (with a throwaway self-signed
+certificate, made with the openssl command line tool) and counts the TLS handshakes
+it accepts.  Each guild picks a model and asks for a completion, once with a new
+adapter per /set_model (the old behaviour) and once through the AdapterPool.
+
+usage: python benchmarks/client_handshakes.py [guilds] [models]
+"""
+
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+
+from TalkTurbo.ApiAdapters.AdapterPool import AdapterPool
+from TalkTurbo.ApiAdapters.OpenAIAdapter import OpenAIAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.ClientRegistry import ClientRegistry
+from TalkTurbo.Messages import UserMessage
+
+COMPLETION = {
+    "id": "chatcmpl-stand-in",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stand-in",
+    "choices": [
+        {
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": "hello"},
+        }
+    ],
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["content-length"]))
+        body = json.dumps(COMPLETION).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingHTTPSServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, ssl_context: ssl.SSLContext):
+        super().__init__(address, handler)
+        self.ssl_context = ssl_context
+        self.handshakes = 0
+
+    def get_request(self):
+        sock, address = super().get_request()
+        # the handshake happens in server_side wrap_socket
+        self.handshakes += 1
+        return self.ssl_context.wrap_socket(sock, server_side=True), address
+
+
+def self_signed_certificate(directory: str) -> tuple[str, str]:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+        + ["-keyout", key, "-out", cert, "-subj", "/CN=127.0.0.1"]
+        + ["-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def unshared_adapter(model: str) -> OpenAIAdapter:
+    """A new adapter with its own client, as /set_model built before the pool."""
+    adapter = OpenAIAdapter("test", model_name=model)
+    adapter._open_ai_client = OpenAI(api_key="test")
+    return adapter
+
+
+def run(server: CountingHTTPSServer, make_adapter, guilds: int, models: list[str]) -> tuple:
+    server.handshakes = 0
+    start = time.perf_counter()
+    for guild in range(guilds):
+        context = ChatContext()
+        context.add_message(UserMessage(f"hello from guild {guild}"))
+        make_adapter(models[guild % len(models)]).get_chat_completion(context)
+    return server.handshakes, time.perf_counter() - start
+
+
+def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    models = OpenAIAdapter.AVAILABLE_MODELS[: int(sys.argv[2]) if len(sys.argv) > 2 else 3]
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = self_signed_certificate(directory)
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(cert, key)
+        server = CountingHTTPSServer(("127.0.0.1", 0), StandInHandler, ssl_context)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # point the SDK at the stand-in, trusting its certificate
+        os.environ["OPENAI_BASE_URL"] = f"https://127.0.0.1:{server.server_address[1]}/v1"
+        os.environ["SSL_CERT_FILE"] = cert
+
+        print(f"{guilds} guilds picking one of {len(models)} models, one completion each")
+        for label, make_adapter in (
+            ("adapter per /set_model", unshared_adapter),
+            ("shared pool", lambda model: AdapterPool.get(OpenAIAdapter, "test", model)),
+        ):
+            ClientRegistry.clear()
+            AdapterPool.clear()
+            handshakes, elapsed = run(server, make_adapter, guilds, models)
+            print(f"{label:>22}: {handshakes:3} TLS handshakes, {elapsed:5.2f} s")
+
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
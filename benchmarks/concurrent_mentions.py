@@ -0,0 +1,74 @@
+"""
+Wall time to answer one mention in each of many guilds at once, sync vs async completions.
+
+The adapter is a stand-in with a fixed provider latency: the sync path sleeps the way a
+blocking SDK call does (freezing the event loop, so mentions are served one at a time),
+the async path awaits the way the native async clients do.
+
+usage: python benchmarks/concurrent_mentions.py [guild_count] [latency_ms]
+"""
+
+import asyncio
+import sys
+import time
+
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.CompletionAssistant import CompletionAssistant
+from TalkTurbo.Messages import AssistantMessage, ContentMessage, UserMessage
+from TalkTurbo.TurboGuild import TurboGuild
+
+
+class SleepingAdapter(ApiAdapter):
+    def __init__(self, latency: float):
+        super().__init__(api_token="", model_name="fake", max_tokens=100)
+        self.latency = latency
+
+    def get_chat_completion(self, context: ChatContext) -> ContentMessage:
+        time.sleep(self.latency)
+        return AssistantMessage("ok")
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        await asyncio.sleep(self.latency)
+        return AssistantMessage("ok")
+
+    def convert_context_to_api_format(self, context: ChatContext) -> list:
+        return list(context.get_messages_as_list())
+
+
+async def mention_sync(guild: TurboGuild):
+    guild.chat_context.add_message(UserMessage("hello turbo"))
+    CompletionAssistant.get_chat_completion(guild.chat_context, guild.api_adapter)
+
+
+async def mention_async(guild: TurboGuild):
+    guild.chat_context.add_message(UserMessage("hello turbo"))
+    await CompletionAssistant.get_chat_completion_async(guild.chat_context, guild.api_adapter)
+
+
+async def run(handler, guilds: list[TurboGuild]) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(guild) for guild in guilds))
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+
+    adapter = SleepingAdapter(latency)
+    CompletionAssistant.set_adapter(adapter)
+    guilds = [TurboGuild(str(i), api_adapter=adapter) for i in range(count)]
+
+    blocking = asyncio.run(run(mention_sync, guilds))
+    non_blocking = asyncio.run(run(mention_async, guilds))
+
+    print(f"guilds: {count}, provider latency: {1000 * latency:.0f} ms")
+    print(f"sync completions:  {1000 * blocking:8.1f} ms")
+    print(
+        f"async completions: {1000 * non_blocking:8.1f} ms  ({blocking / non_blocking:.1f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
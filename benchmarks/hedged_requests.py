@@ -0,0 +1,76 @@
+"""
+Completion latency through a RoutingAdapter, with and without hedging.
+
+Two stand-in models of the same class answer in about base ms, but each request has
+a tail_pct chance of stalling for tail ms.  Reports p50/p95/p99 latency and how many
+hedges were sent and won.
+
+usage: python benchmarks/hedged_requests.py [requests] [base_ms] [tail_ms] [tail_pct]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ApiAdapters.RoutingAdapter import RoutingAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.Messages import AssistantMessage, UserMessage
+from TalkTurbo.Metrics import LatencyStats
+
+
+class StandInModel(ApiAdapter):
+    def __init__(self, name: str, base: float, tail: float, tail_chance: float):
+        super().__init__(api_token="", model_name=name, max_tokens=100)
+        self.PROVIDER = "stand-in"
+        self.base, self.tail, self.tail_chance = base, tail, tail_chance
+
+    async def get_chat_completion_async(self, context: ChatContext):
+        stalled = random.random() < self.tail_chance
+        await asyncio.sleep(self.tail if stalled else self.base * random.uniform(0.8, 1.2))
+        return AssistantMessage(self.model_name)
+
+    def get_chat_completion(self, context: ChatContext):
+        raise NotImplementedError
+
+    def convert_context_to_api_format(self, context: ChatContext):
+        return []
+
+
+async def run(router: RoutingAdapter, requests: int) -> LatencyStats:
+    context = ChatContext()
+    context.add_message(UserMessage("hello"))
+    latencies = LatencyStats(window=requests)
+    for _ in range(requests):
+        start = time.perf_counter()
+        await router.get_chat_completion_async(context)
+        latencies.record(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    base = (int(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    tail = (int(sys.argv[3]) if len(sys.argv) > 3 else 400) / 1000
+    tail_chance = (float(sys.argv[4]) if len(sys.argv) > 4 else 5) / 100
+
+    print(
+        f"{requests} requests, {1000 * base:.0f} ms models,"
+        f" {100 * tail_chance:.0f}% stall for {1000 * tail:.0f} ms"
+    )
+    for hedge in (False, True):
+        random.seed(0)
+        RoutingAdapter.MODEL_STATS.clear()
+        models = [StandInModel(name, base, tail, tail_chance) for name in ("a", "b")]
+        router = RoutingAdapter(models, hedge=hedge, hedge_percentile=90)
+        latencies = asyncio.run(run(router, requests))
+        print(
+            f"{'hedged' if hedge else 'not hedged':>10}: p50 {1000 * latencies.p50:6.1f} ms,"
+            f" p95 {1000 * latencies.p95:6.1f} ms, p99 {1000 * latencies.percentile(99):6.1f} ms,"
+            f" {router.hedges} hedges, {router.hedges_won} won"
+        )
+
+
+if __name__ == "__main__":
+    main()
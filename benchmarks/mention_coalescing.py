@@ -0,0 +1,57 @@
+"""
+Completion requests made for bursts of mentions in one guild, with and without coalescing.
+
+Each burst is burst_size mentions arriving a few milliseconds apart; the stand-in
+completion takes latency ms.  Reports requests made, requests saved and the wall time
+until every mention in the bursts is answered.
+
+usage: python benchmarks/mention_coalescing.py [bursts] [burst_size] [window_ms] [latency_ms]
+"""
+
+import asyncio
+import sys
+import time
+
+from TalkTurbo.GuildWorkQueue import GuildWorkQueue
+
+
+async def run(queue: GuildWorkQueue, bursts: int, burst_size: int, latency: float) -> float:
+    async def answer(items: list) -> list:
+        await asyncio.sleep(latency)
+        return [f"answer {item}" for item in items]
+
+    async def mention(item):
+        return await queue.run_batched(item, answer)
+
+    start = time.perf_counter()
+    pending = []
+    for burst in range(bursts):
+        for i in range(burst_size):
+            pending.append(asyncio.create_task(mention((burst, i))))
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(latency)
+
+    await asyncio.gather(*pending)
+    return time.perf_counter() - start
+
+
+def main():
+    bursts = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    burst_size = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    window = (int(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+    latency = (int(sys.argv[4]) if len(sys.argv) > 4 else 200) / 1000
+
+    print(f"{bursts} bursts of {burst_size} mentions, {1000 * latency:.0f} ms completions")
+    for label, queue in (
+        ("no coalescing", GuildWorkQueue()),
+        (f"{1000 * window:.0f} ms window", GuildWorkQueue(coalesce_window=window)),
+    ):
+        elapsed = asyncio.run(run(queue, bursts, burst_size, latency))
+        print(
+            f"{label:>15}: {queue.batches:4} requests, {queue.requests_saved:4} saved,"
+            f" {elapsed:6.2f} s to answer every mention"
+        )
+
+
+if __name__ == "__main__":
+    main()
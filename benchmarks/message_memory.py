@@ -0,0 +1,63 @@
+"""
+Memory used by a 10k-message history with eager vs lazy tokenization.
+
+"eager" keeps the full token list for every message, as ContentMessage used to.
+"lazy" keeps only the token count.
+
+usage: python benchmarks/message_memory.py [message_count]
+"""
+
+import sys
+import tracemalloc
+
+from TalkTurbo.Messages import AssistantMessage, UserMessage
+
+SAMPLE_USER = "hey turbo, can you explain how python list comprehensions work? number {}"
+SAMPLE_ASSISTANT = (
+    "Oh sure, because reading the docs is just too hard. A list comprehension builds a list "
+    "from an iterable in one expression: [x * 2 for x in range(10)]. You're welcome. #{}"
+)
+
+
+def build_history(count: int, keep_encodings: bool) -> tuple[list, list]:
+    messages = []
+    encodings = []
+    for i in range(count):
+        cls, template = (
+            (UserMessage, SAMPLE_USER) if i % 2 == 0 else (AssistantMessage, SAMPLE_ASSISTANT)
+        )
+        message = cls(template.format(i))
+        message.encoding_length_in_tokens
+        if keep_encodings:
+            encodings.append(message.encoding)
+        messages.append(message)
+
+    return messages, encodings
+
+
+def measure(count: int, keep_encodings: bool) -> int:
+    tracemalloc.start()
+    history = build_history(count, keep_encodings)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del history
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    # warm the tokenizer so its own allocations are not measured
+    UserMessage("warm up").encoding_length_in_tokens
+
+    eager = measure(count, keep_encodings=True)
+    lazy = measure(count, keep_encodings=False)
+
+    print(f"messages: {count}")
+    print(f"eager (token lists kept): {eager / 1024:10.1f} KiB  {eager / count:7.1f} B/message")
+    print(f"lazy  (token count only): {lazy / 1024:10.1f} KiB  {lazy / count:7.1f} B/message")
+    print(f"saved: {(eager - lazy) / 1024:.1f} KiB ({100 * (eager - lazy) / eager:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
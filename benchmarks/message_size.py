@@ -0,0 +1,56 @@
+"""
+Per-message memory of the slotted ContentMessage vs the old __dict__ layout.
+
+The "before" layout is reproduced by LegacyContentMessage below: a per-instance
+__dict__, a datetime timestamp and four separate moderation fields.  Content strings
+are shared between both runs so only the message objects themselves are measured.
+
+usage: python benchmarks/message_size.py [message_count]
+"""
+
+import sys
+import tracemalloc
+from datetime import datetime
+
+from TalkTurbo.Messages import MessageRole, UserMessage
+
+
+class LegacyContentMessage:
+    def __init__(self, role: MessageRole, content: str, name: str = None):
+        self.role = role
+        self.created_on_utc = datetime.utcnow()
+        self.content = content
+        self.name = name
+        self._encoding_length_in_tokens = None
+        self._moderated = False
+        self._category_flags = None
+        self._category_scores = None
+        self._flagged = None
+
+
+def measure(count: int, factory) -> float:
+    contents = [f"message number {i}" for i in range(count)]
+
+    tracemalloc.start()
+    messages = [factory(content) for content in contents]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del messages
+    return current / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    before = measure(count, lambda content: LegacyContentMessage(MessageRole.USER, content))
+    after = measure(count, UserMessage)
+
+    print(f"messages: {count}")
+    print(f"before (__dict__ + datetime): {before:6.1f} B/message")
+    print(f"after  (__slots__ + int ts):  {after:6.1f} B/message")
+    print(f"saved: {before - after:.1f} B/message ({100 * (before - after) / before:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
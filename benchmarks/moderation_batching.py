@@ -0,0 +1,92 @@
+"""
+Moderation requests made by a busy bot, with and without batching across guilds.
+
+guilds each send messages at random (poisson) intervals, messages_per_second in
+total, for seconds.  A stand-in moderation endpoint takes moderation_ms per request
+however many inputs it has.  Reports moderation requests made and p50/p95 latency of
+moderating a message, unbatched and with a window_ms batching window.
+
+usage: python benchmarks/moderation_batching.py [guilds] [messages_per_second] [seconds] [window_ms] [moderation_ms]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from TalkTurbo.Metrics import LatencyStats
+from TalkTurbo.ModerationBatcher import ModerationBatcher
+
+RESULT = {"flagged": False, "categories": {"hate": False}, "category_scores": {"hate": 0.01}}
+
+
+class StandInModerations:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+
+    async def __call__(self, contents: list[str], model: str) -> list[dict]:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return [RESULT for _ in contents]
+
+
+async def guild(guild_id: int, rate: float, seconds: float, moderate, latencies: LatencyStats):
+    deadline = time.perf_counter() + seconds
+    pending = []
+    i = 0
+    while True:
+        await asyncio.sleep(random.expovariate(rate))
+        if time.perf_counter() > deadline:
+            break
+
+        async def one(content: str):
+            start = time.perf_counter()
+            await moderate(content)
+            latencies.record(time.perf_counter() - start)
+
+        pending.append(asyncio.create_task(one(f"guild {guild_id} message {i}")))
+        i += 1
+
+    await asyncio.gather(*pending)
+
+
+async def run(guilds: int, rate: float, seconds: float, window: float, latency: float):
+    send = StandInModerations(latency)
+    if window > 0:
+        batcher = ModerationBatcher(window=window, max_batch=32, send=send)
+
+        async def moderate(content: str):
+            return await batcher.moderate(content, "stand-in")
+
+    else:
+
+        async def moderate(content: str):
+            return (await send([content], "stand-in"))[0]
+
+    latencies = LatencyStats(window=100_000)
+    await asyncio.gather(
+        *(guild(i, rate / guilds, seconds, moderate, latencies) for i in range(guilds))
+    )
+    return send.requests, latencies
+
+
+def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 200
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    window = (int(sys.argv[4]) if len(sys.argv) > 4 else 50) / 1000
+    latency = (int(sys.argv[5]) if len(sys.argv) > 5 else 120) / 1000
+
+    for label, batch_window in (("unbatched", 0.0), (f"{1000 * window:.0f} ms window", window)):
+        random.seed(0)
+        requests, latencies = asyncio.run(run(guilds, rate, seconds, batch_window, latency))
+        print(
+            f"{label:>14}: {requests} requests for {len(latencies)} messages"
+            f" ({requests / seconds:.1f}/s), p50 {1000 * latencies.p50:.1f} ms"
+            f" / p95 {1000 * latencies.p95:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Moderation calls and latency for repeated content, with and without the moderation cache.
+
+Mentions are drawn from a pool of distinct texts with a skewed (zipf-like)
+popularity, half of them re-typed with different spacing, like copy-pasted memes and
+repeated prompts.  A stand-in moderation endpoint takes moderation_ms per call.
+Reports the moderation calls made and p50/p95 latency of moderating a mention.
+
+usage: python benchmarks/moderation_cache.py [mentions] [distinct_texts] [moderation_ms]
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+
+import TalkTurbo.Messages
+from TalkTurbo.Messages import UserMessage
+from TalkTurbo.Metrics import LatencyStats
+from TalkTurbo.ModerationCache import MODERATION_CACHE
+
+MODERATION = {
+    "id": "modr-0",
+    "model": "text-moderation-007",
+    "results": [
+        {
+            "flagged": False,
+            "categories": {"hate": False, "violence": False},
+            "category_scores": {"hate": 0.01, "violence": 0.02},
+        }
+    ],
+}
+
+
+class StandInResponse:
+    def model_dump_json(self, by_alias: bool = False) -> str:
+        return json.dumps(MODERATION)
+
+
+class StandInModerations:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def create(self, input: str, model: str):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return StandInResponse()
+
+
+class StandInClient:
+    def __init__(self, latency: float):
+        self.moderations = StandInModerations(latency)
+
+
+def mentions_for(count: int, distinct: int) -> list[str]:
+    texts = [f"mention number {i} with some words" for i in range(distinct)]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    mentions = random.choices(texts, weights=weights, k=count)
+    return [text.replace(" ", "  ") + "\n" if random.random() < 0.5 else text for text in mentions]
+
+
+async def run(mentions: list[str], latency: float, cache_size: int) -> tuple[int, LatencyStats]:
+    client = StandInClient(latency)
+    TalkTurbo.Messages.ASYNC_OPENAI_CLIENT = client
+    MODERATION_CACHE.clear()
+    MODERATION_CACHE.configure(max_size=cache_size)
+
+    latencies = LatencyStats(window=len(mentions))
+    for content in mentions:
+        start = time.perf_counter()
+        await UserMessage(content).moderate_async()
+        latencies.record(time.perf_counter() - start)
+
+    return client.moderations.calls, latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latency = (int(sys.argv[3]) if len(sys.argv) > 3 else 120) / 1000
+
+    random.seed(0)
+    mentions = mentions_for(count, distinct)
+
+    for label, cache_size in (("no cache", 0), ("cache", 4096)):
+        calls, latencies = asyncio.run(run(mentions, latency, cache_size))
+        print(
+            f"{label:>8}: {calls} moderation calls for {count} mentions,"
+            f" p50 {1000 * latencies.p50:.1f} ms / p95 {1000 * latencies.p95:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
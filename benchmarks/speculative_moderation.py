@@ -0,0 +1,96 @@
+"""
+Mention latency with moderation before the completion, and with both in parallel.
+
+Stand-in moderation and completion calls take a randomized latency around
+moderation_ms and completion_ms; flagged_pct of the mentions are flagged.  Reports
+p50/p95 latency of answering (or rejecting) a mention, and how many speculative
+completions were thrown away.
+
+usage: python benchmarks/speculative_moderation.py [mentions] [moderation_ms] [completion_ms] [flagged_pct]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.CompletionAssistant import CompletionAssistant
+from TalkTurbo.Messages import AssistantMessage, UserMessage
+from TalkTurbo.Metrics import LatencyStats
+
+
+def jittered(latency: float) -> float:
+    # long tailed, like real provider latencies
+    return latency * random.lognormvariate(0, 0.35)
+
+
+class StandInModel(ApiAdapter):
+    def __init__(self, latency: float):
+        super().__init__(api_token="", model_name="stand-in", max_tokens=100)
+        self.latency = latency
+
+    async def get_chat_completion_async(self, context: ChatContext):
+        await asyncio.sleep(jittered(self.latency))
+        return AssistantMessage("answer")
+
+    def get_chat_completion(self, context: ChatContext):
+        raise NotImplementedError
+
+    def convert_context_to_api_format(self, context: ChatContext):
+        return []
+
+
+async def moderate(latency: float, flagged: bool) -> bool:
+    await asyncio.sleep(jittered(latency))
+    return flagged
+
+
+async def sequential(context: ChatContext, message, moderation_latency: float, flagged: bool):
+    if await moderate(moderation_latency, flagged):
+        return None
+    context.add_message(message)
+    return (await CompletionAssistant.get_chat_completion_async(context)).get_latest_message()
+
+
+async def speculative(context: ChatContext, message, moderation_latency: float, flagged: bool):
+    return await CompletionAssistant.get_speculative_chat_completion(
+        context, message, moderate(moderation_latency, flagged)
+    )
+
+
+async def run(answer, mentions: int, moderation: float, flagged_chance: float) -> LatencyStats:
+    context = ChatContext()
+    latencies = LatencyStats(window=mentions)
+    for i in range(mentions):
+        start = time.perf_counter()
+        await answer(
+            context, UserMessage(f"mention {i}"), moderation, random.random() < flagged_chance
+        )
+        latencies.record(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    mentions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    moderation = (int(sys.argv[2]) if len(sys.argv) > 2 else 150) / 1000
+    completion = (int(sys.argv[3]) if len(sys.argv) > 3 else 600) / 1000
+    flagged_chance = (float(sys.argv[4]) if len(sys.argv) > 4 else 2) / 100
+
+    CompletionAssistant.set_adapter(StandInModel(completion))
+    print(
+        f"{mentions} mentions, ~{1000 * moderation:.0f} ms moderation,"
+        f" ~{1000 * completion:.0f} ms completion, {100 * flagged_chance:.0f}% flagged"
+    )
+    for label, answer in (("moderate first", sequential), ("speculative", speculative)):
+        random.seed(0)
+        latencies = asyncio.run(run(answer, mentions, moderation, flagged_chance))
+        print(
+            f"{label:>15}: p50 {1000 * latencies.p50:6.1f} ms, p95 {1000 * latencies.p95:6.1f} ms"
+        )
+    print(f"speculative completions discarded: {CompletionAssistant.SPECULATION['discarded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Time to create 1,000 guild contexts with pre-load data, with and without the token count cache.
+
+Every guild builds its own message objects from the same pre-load.yaml strings and
+system prompt, so without the cache every guild re-tokenizes identical content.
+
+usage: python benchmarks/token_cache.py [guild_count] [pre_load_path]
+"""
+
+import sys
+import time
+
+import yaml
+
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.Messages import AssistantMessage, SystemMessage, UserMessage
+from TalkTurbo.Tokenizers import TOKEN_COUNT_CACHE, TokenizerRegistry
+from TalkTurbo.TurboGuild import TurboGuild
+
+
+def create_guilds(count: int, pre_load: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        context = ChatContext(system_prompt=SystemMessage(TurboGuild.DEFAULT_SYSTEM_PROMPT.content))
+        context.add_pre_load_data(
+            *(
+                message
+                for turn in pre_load["context"]
+                for message in (UserMessage(turn["user"]), AssistantMessage(turn["assistant"]))
+            )
+        )
+        context.add_pre_load_system_prompt(SystemMessage(pre_load["system_prompt"]))
+
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    path = sys.argv[2] if len(sys.argv) > 2 else "pre-load.yaml"
+
+    with open(path, "r", encoding="utf-8") as file:
+        pre_load = yaml.safe_load(file)
+
+    # load the encoding outside of the timed runs
+    TokenizerRegistry.get().encoding
+
+    max_size = TOKEN_COUNT_CACHE.max_size
+    TOKEN_COUNT_CACHE.max_size = 0
+    uncached = create_guilds(count, pre_load)
+
+    TOKEN_COUNT_CACHE.max_size = max_size
+    TOKEN_COUNT_CACHE.clear()
+    cached = create_guilds(count, pre_load)
+
+    print(f"guilds: {count}")
+    print(f"without cache: {1000 * uncached:8.1f} ms")
+    print(f"with cache:    {1000 * cached:8.1f} ms  ({uncached / cached:.1f}x faster)")
+    print(f"cache stats:   {TOKEN_COUNT_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Process-wide adapters, one per provider and model."""
+
+import threading
+from typing import TypeVar
+
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ClientRegistry import ClientRegistry
+
+Adapter = TypeVar("Adapter", bound=ApiAdapter)
+
+
+class AdapterPool:
+    """
+    Shares adapters across guilds.
+
+    Adapters hold no per-guild state, so every guild that picks a model can use the
+    same instance (and through the ClientRegistry, the same connections) instead of
+    building a new one on each /set_model.
+    """
+
+    _ADAPTERS: dict[tuple, ApiAdapter] = {}
+    _LOCK = threading.Lock()
+
+    @staticmethod
+    def get(adapter_class: type[Adapter], api_token: str, model_name: str, **kwargs) -> Adapter:
+        """
+        The adapter_class adapter for model_name, created on first use.
+
+        kwargs (e.g. max_tokens) are passed to the adapter and are part of the key.
+        """
+        key = (
+            adapter_class,
+            ClientRegistry.key_digest(api_token),
+            model_name,
+            tuple(sorted(kwargs.items())),
+        )
+        with AdapterPool._LOCK:
+            adapter = AdapterPool._ADAPTERS.get(key)
+            if adapter is None:
+                adapter = adapter_class(api_token=api_token, model_name=model_name, **kwargs)
+                AdapterPool._ADAPTERS[key] = adapter
+
+        return adapter
+
+    @staticmethod
+    def clear():
+        with AdapterPool._LOCK:
+            AdapterPool._ADAPTERS.clear()
+
+    @staticmethod
+    def size() -> int:
+        return len(AdapterPool._ADAPTERS)
@@ -1,38 +1,94 @@
 """Adapter for Anthropic's API."""
 
-from anthropic import Anthropic
+from typing import AsyncIterator
+
+from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
 from anthropic.types.message import Message as AnthropicMessage
 
 from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ApiAdapters.ModelDescription import ModelDescription
 from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.KeyPool import KeyPoolRegistry
 from TalkTurbo.Messages import ContentMessage, MessageFactory, SystemMessage
+from TalkTurbo.Tokenizers import ApproximateTokenCounter
 
 
 class AnthropicAdapter(ApiAdapter):
     """Adapter for Anthropic's API."""
 
-    AVAILABLE_MODELS = [
-        "claude-3-opus-20240229",
-        "claude-3-sonnet-20240229",
-        "claude-3-haiku-20240307",
-    ]
+    PROVIDER = "anthropic"
+
+    # no local tokenizer for claude models
+    TOKEN_ENCODING = ApproximateTokenCounter.NAME
+
+    # https://docs.anthropic.com/en/docs/about-claude/models
+    MODEL_DESCRIPTIONS = {
+        description.model_name: description
+        for description in [
+            ModelDescription(
+                "claude-3-opus-20240229", max_input_tokens=200000, max_output_tokens=4096
+            ),
+            ModelDescription(
+                "claude-3-sonnet-20240229", max_input_tokens=200000, max_output_tokens=4096
+            ),
+            ModelDescription(
+                "claude-3-haiku-20240307", max_input_tokens=200000, max_output_tokens=4096
+            ),
+        ]
+    }
+    AVAILABLE_MODELS = list(MODEL_DESCRIPTIONS)
 
     def __init__(
         self,
         api_token: str,
-        max_tokens: int = 4096,
+        max_tokens: int = 1024,
         model_name: str = "claude-3-opus-20240229",
     ):
         super().__init__(api_token=api_token, model_name=model_name, max_tokens=max_tokens)
-        self._anthropic_client = Anthropic(api_key=self.api_token)
+        # api_token may be a comma separated list of keys to spread requests across
+        self._anthropic_client = KeyPoolRegistry.client(
+            self.PROVIDER, self.api_token, Anthropic, DefaultHttpxClient
+        )
+        self._async_anthropic_client = KeyPoolRegistry.client(
+            self.PROVIDER, self.api_token, AsyncAnthropic, DefaultAsyncHttpxClient
+        )
 
     def get_chat_completion(self, context: ChatContext) -> ContentMessage:
         cleaned_context = self.convert_context_to_api_format(context)
 
         completion = self._anthropic_client.messages.create(
-            max_tokens=1024, messages=cleaned_context, model=self.model_name
+            max_tokens=self.response_token_limit(),
+            messages=cleaned_context,
+            model=self.model_name,
+        )
+
+        return self._message_from_completion(completion)
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        """Async version of get_chat_completion, backed by AsyncAnthropic."""
+        cleaned_context = self.convert_context_to_api_format(context)
+
+        completion = await self._async_anthropic_client.messages.create(
+            max_tokens=self.response_token_limit(),
+            messages=cleaned_context,
+            model=self.model_name,
         )
 
+        return self._message_from_completion(completion)
+
+    async def stream_chat_completion(self, context: ChatContext) -> AsyncIterator[str]:
+        """Stream a chat completion with messages.stream."""
+        cleaned_context = self.convert_context_to_api_format(context)
+
+        async with self._async_anthropic_client.messages.stream(
+            max_tokens=self.response_token_limit(),
+            messages=cleaned_context,
+            model=self.model_name,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    def _message_from_completion(self, completion: AnthropicMessage) -> ContentMessage:
         if not completion:
             return SystemMessage(
                 "_(turbo's host here: turbo didn't have anything to say :bluefootbooby:)_"
@@ -43,20 +99,30 @@ class AnthropicAdapter(ApiAdapter):
         return MessageFactory.create_message(message, role)
 
     def convert_context_to_api_format(self, context: ChatContext):
+        return self._convert_context_cached(context)
+
+    def _convert_prefix(self, context: ChatContext) -> list:
         messages = [
-            {"content": "(ignore this message)", "role": "user"}
-        ] + context.get_messages_as_list()
+            {"content": "(ignore this message)", "role": "user"},
+            *context.prefix.completion_dicts,
+        ]
         return self._remove_system_messages_from_context(messages)
 
+    def _convert_message(self, message: ContentMessage) -> dict:
+        return self._remove_system_messages_from_context([message.to_completion_dict()])[0]
+
     def _get_content_and_role_from_anthropic_message(
         self, anthropic_message: AnthropicMessage
     ) -> tuple[str, str]:
         return anthropic_message.content[0].text, anthropic_message.role
 
-    def _remove_system_messages_from_context(self, messages: list[ContentMessage]) -> list:
-        """convert any system messages to user messages"""
-        for message in messages:
-            if message["role"] == "system":
-                message["role"] = "assistant"
+    def _remove_system_messages_from_context(self, messages: list[dict]) -> list:
+        """
+        convert any system messages to assistant messages
 
-        return messages
+        the message dicts are shared with the context, so converted messages are copies.
+        """
+        return [
+            {**message, "role": "assistant"} if message["role"] == "system" else message
+            for message in messages
+        ]
@@ -1,20 +1,109 @@
 """Generic interface for interacting with LLM SDKs"""
 
+import asyncio
+import weakref
 from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator
 
+from TalkTurbo.ApiAdapters.ModelDescription import ModelDescription
 from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.ContextPrefix import ContextPrefix
+from TalkTurbo.MessageHistory import MessageHistory
 from TalkTurbo.Messages import ContentMessage
+from TalkTurbo.Tokenizers import TokenCounter, TokenizerRegistry
+
+
+class ConversionCache:
+    """One context's messages in an adapter's provider format, as of a context version."""
+
+    __slots__ = (
+        "version",
+        "prefix",
+        "history",
+        "appended_count",
+        "evicted_count",
+        "converted_prefix",
+        "converted_messages",
+        "converted",
+    )
+
+    def __init__(self, prefix: ContextPrefix, history: MessageHistory, converted_prefix: list):
+        self.version = None
+        self.prefix = prefix
+        self.history = history
+        self.appended_count = history.evicted_count
+        self.evicted_count = history.evicted_count
+        self.converted_prefix = converted_prefix
+        self.converted_messages = deque()
+        self.converted: list = None
 
 
 class ApiAdapter(ABC):
     """Generic interface for interacting with LLM SDKs"""
 
+    # provider name, used to key per-provider resources (executor pools, rate limits, ...)
+    PROVIDER: str = None
+
+    # encoding used to budget contexts sent through this adapter, see TokenizerRegistry.
+    # None looks the encoding up by model name.
+    TOKEN_ENCODING: str = None
+
+    # model name -> ModelDescription for every model the adapter supports
+    MODEL_DESCRIPTIONS: dict[str, ModelDescription] = {}
+
+    # share of the context budget kept free for per-message formatting tokens
+    # and token count estimates that run low
+    CONTEXT_BUDGET_MARGIN = 0.05
+
     def __init__(self, api_token, model_name, max_tokens) -> None:
         super().__init__()
         self.api_token = api_token
         self.max_tokens = max_tokens
         self.model_name = model_name
 
+        # context -> ConversionCache, see _convert_context_cached
+        self._conversion_caches: weakref.WeakKeyDictionary[
+            ChatContext, ConversionCache
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def token_counter(self) -> TokenCounter:
+        """The shared TokenCounter matching what this adapter's provider bills."""
+        if self.TOKEN_ENCODING:
+            return TokenizerRegistry.get(self.TOKEN_ENCODING)
+
+        return TokenizerRegistry.for_model(self.model_name)
+
+    @property
+    def model_description(self) -> ModelDescription | None:
+        """The ModelDescription of the current model, or None if the model is unknown."""
+        return self.MODEL_DESCRIPTIONS.get(self.model_name)
+
+    def response_token_limit(self) -> int:
+        """Max tokens to request for a response: max_tokens, capped at the model's output limit."""
+        if self.model_description:
+            return min(self.max_tokens, self.model_description.max_output_tokens)
+
+        return self.max_tokens
+
+    def context_budget(self) -> int | None:
+        """
+        Max tokens of context to send to the current model.
+
+        Leaves room for a response of response_token_limit() tokens plus a safety margin.
+        None if the model is unknown.
+        """
+        if not self.model_description:
+            return None
+
+        budget = self.model_description.context_budget(self.response_token_limit())
+        return int(budget * (1 - self.CONTEXT_BUDGET_MARGIN))
+
+    def fit_context(self, context: ChatContext):
+        """Count and trim a context for this adapter's model."""
+        context.resize(self.context_budget() or context.max_tokens, self.token_counter)
+
     @abstractmethod
     def get_chat_completion(self, context: ChatContext) -> ContentMessage:
         """
@@ -27,6 +116,37 @@ class ApiAdapter(ABC):
             ContentMessage: The response content.
         """
 
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        """
+        Get a chat completion without blocking the event loop.
+
+        Child classes should override this with their SDK's native async client.  The
+        default runs get_chat_completion in a worker thread.
+
+        Args:
+            context: A ChatContext object.
+
+        Returns:
+            ContentMessage: The response content.
+        """
+        return await asyncio.to_thread(self.get_chat_completion, context)
+
+    async def stream_chat_completion(self, context: ChatContext) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text deltas.
+
+        Child classes should override this with their SDK's streaming API.  The default
+        yields the whole completion as a single delta.
+
+        Args:
+            context: A ChatContext object.  It is not modified.
+
+        Yields:
+            str: The next piece of the response text.
+        """
+        response = await self.get_chat_completion_async(context)
+        yield response.content
+
     @abstractmethod
     def convert_context_to_api_format(self, context: ChatContext) -> list[dict]:
         """
@@ -40,3 +160,82 @@ class ApiAdapter(ABC):
             list[dict]: A list of dictionaries, where each dictionary represents a message
             in the context, formatted for the relevant API.
         """
+
+    def _convert_prefix(self, context: ChatContext) -> list:
+        """
+        Convert the context's prefix (system prompt and pre-load data) to the provider format.
+
+        Child classes using _convert_context_cached must implement this.
+        """
+        raise NotImplementedError()
+
+    def _convert_message(self, message: ContentMessage) -> dict:
+        """
+        Convert a single live message to the provider format.
+
+        Child classes using _convert_context_cached must implement this.
+        """
+        raise NotImplementedError()
+
+    def _convert_context_cached(self, context: ChatContext) -> list:
+        """
+        Convert a context with _convert_prefix and _convert_message, reusing earlier work.
+
+        The converted prefix is kept until the context's prefix changes, and converted
+        messages are kept until they are evicted, so each request only converts the
+        messages added since the last one.  An unchanged context version returns the
+        previous result as is.  A fork (see ChatContext.fork) starts from the cache of the
+        context it was forked from, so it only converts what was added to the fork.
+
+        The returned list is shared with later calls - do not mutate it.
+        """
+        cache = self._conversion_caches.get(context)
+        if cache is None:
+            cache = self._cache_from_fork_source(context)
+
+        if cache is not None and cache.version == context.version:
+            return cache.converted
+
+        prefix = context.prefix
+        history = context.history
+
+        if cache is None or cache.prefix is not prefix:
+            cache = ConversionCache(prefix, history, self._convert_prefix(context))
+            self._conversion_caches[context] = cache
+
+        if cache.history is not history or history.evicted_count >= cache.appended_count:
+            # the history was replaced or everything converted so far has been evicted
+            cache.history = history
+            cache.converted_messages.clear()
+            cache.appended_count = cache.evicted_count = history.evicted_count
+        else:
+            # drop what was evicted since the last conversion
+            for _ in range(history.evicted_count - cache.evicted_count):
+                cache.converted_messages.popleft()
+            cache.evicted_count = history.evicted_count
+
+        # convert what was appended since the last conversion
+        new_messages = history.tail(history.appended_count - cache.appended_count)
+        cache.converted_messages.extend(self._convert_message(message) for message in new_messages)
+        cache.appended_count = history.appended_count
+
+        cache.converted = cache.converted_prefix + list(cache.converted_messages)
+        cache.version = context.version
+
+        return cache.converted
+
+    def _cache_from_fork_source(self, context: ChatContext) -> ConversionCache | None:
+        """A fork's first cache: a copy of its source context's cache, brought up to date."""
+        source = context.fork_source
+        if source is None:
+            return None
+
+        # the fork's history continues the source's, so the source's conversions carry over
+        self._convert_context_cached(source)
+        source_cache = self._conversion_caches[source]
+        cache = ConversionCache(source_cache.prefix, context.history, source_cache.converted_prefix)
+        cache.appended_count = source_cache.appended_count
+        cache.evicted_count = source_cache.evicted_count
+        cache.converted_messages = source_cache.converted_messages.copy()
+        self._conversion_caches[context] = cache
+        return cache
@@ -1,49 +1,99 @@
 """Adapter for Google's API."""
 
+from typing import AsyncIterator
+
 import google.generativeai as genai
 
 from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ApiAdapters.ModelDescription import ModelDescription
 from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.ClientRegistry import ClientRegistry
 from TalkTurbo.Messages import AssistantMessage, ContentMessage, MessageRole
+from TalkTurbo.Tokenizers import ApproximateTokenCounter
+
+
+def _configure_genai(api_key: str):
+    genai.configure(api_key=api_key)
+    return genai
 
 
 class GoogleAdapter(ApiAdapter):
     """Adapter for Google's API."""
 
-    AVAILABLE_MODELS = ["gemini-pro"]
+    PROVIDER = "google"
+
+    # no local tokenizer for gemini models
+    TOKEN_ENCODING = ApproximateTokenCounter.NAME
 
-    def __init__(self, api_token: str, model_name: str = "gemini-pro", max_tokens=4096):
-        super().__init__(api_token=api_token, model_name=model_name, max_tokens=1024)
+    # https://ai.google.dev/gemini-api/docs/models/gemini
+    MODEL_DESCRIPTIONS = {
+        description.model_name: description
+        for description in [
+            ModelDescription("gemini-pro", max_input_tokens=30720, max_output_tokens=2048),
+        ]
+    }
+    AVAILABLE_MODELS = list(MODEL_DESCRIPTIONS)
 
-        genai.configure(api_key=self.api_token)
+    def __init__(self, api_token: str, model_name: str = "gemini-pro", max_tokens=1024):
+        super().__init__(api_token=api_token, model_name=model_name, max_tokens=max_tokens)
+
+        # genai keeps one global client, configure it once per key rather than per adapter
+        ClientRegistry.get("google", self.api_token, _configure_genai)
         self._google_client = genai.GenerativeModel(model_name=self.model_name)
 
     def get_chat_completion(self, context: ChatContext) -> ContentMessage:
         google_context = self.convert_context_to_api_format(context)
-        response = self._google_client.generate_content(google_context)
+        response = self._google_client.generate_content(
+            google_context,
+            generation_config={"max_output_tokens": self.response_token_limit()},
+        )
 
         return AssistantMessage(content=response.text)
 
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        """Async version of get_chat_completion, backed by generate_content_async."""
+        google_context = self.convert_context_to_api_format(context)
+        response = await self._google_client.generate_content_async(
+            google_context,
+            generation_config={"max_output_tokens": self.response_token_limit()},
+        )
+
+        return AssistantMessage(content=response.text)
+
+    async def stream_chat_completion(self, context: ChatContext) -> AsyncIterator[str]:
+        """Stream a chat completion with stream=True."""
+        google_context = self.convert_context_to_api_format(context)
+        response = await self._google_client.generate_content_async(
+            google_context,
+            generation_config={"max_output_tokens": self.response_token_limit()},
+            stream=True,
+        )
+
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
     def convert_context_to_api_format(self, context: ChatContext):
+        return self._convert_context_cached(context)
+
+    def _convert_prefix(self, context: ChatContext) -> list:
         # multi-turn expects a user and asst messages alternating
         # to fit the system prompt in we have to make up the first few
         # messages here
-        messages = [
-            context.system_prompt,
-            AssistantMessage("Sounds great ;)"),
-        ] + context.messages
+        return [
+            self._convert_message(context.system_prompt),
+            self._convert_message(AssistantMessage("Sounds great ;)")),
+        ]
 
-        # convert to google format
-        cc_list = [{"role": message.role.value, "parts": [message.content]} for message in messages]
+    def _convert_message(self, message: ContentMessage) -> dict:
+        role = message.role.value
 
-        # update the roles
-        for message in cc_list:
-            # system messages become user messages
-            if message["role"] == MessageRole.SYSTEM.value:
-                message["role"] = MessageRole.USER.value
+        # system messages become user messages
+        if role == MessageRole.SYSTEM.value:
+            role = MessageRole.USER.value
 
-            # assistant messages become "model" messages
-            if message["role"] in {MessageRole.ASSISTANT.value}:
-                message["role"] = "model"
+        # assistant messages become "model" messages
+        if role == MessageRole.ASSISTANT.value:
+            role = "model"
 
-        return cc_list
+        return {"role": role, "parts": [message.content]}
@@ -1,32 +1,83 @@
 """Adapter for Groq's API."""
 
-from groq import Groq
+from typing import AsyncIterator
+
+from groq import AsyncGroq, DefaultAsyncHttpxClient, DefaultHttpxClient, Groq
 
 from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ApiAdapters.ModelDescription import ModelDescription
 from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.KeyPool import KeyPoolRegistry
 from TalkTurbo.Messages import ContentMessage, MessageFactory, SystemMessage
+from TalkTurbo.Tokenizers import ApproximateTokenCounter
 
 
 class GroqAdapter(ApiAdapter):
     """Adapter for Groq's API."""
 
+    PROVIDER = "groq"
+
+    # hosted open models use their own tokenizers - estimate
+    TOKEN_ENCODING = ApproximateTokenCounter.NAME
+
     # https://console.groq.com/docs/models
-    AVAILABLE_MODELS = [
-        "llama3-8b-8192",  # meta
-        "llama3-70b-8192",  # meta
-        "mixtral-8x7b-32768",  # mistral
-        "gemma-7b-it",  # google
-    ]
+    MODEL_DESCRIPTIONS = {
+        description.model_name: description
+        for description in [
+            # meta
+            ModelDescription("llama3-8b-8192", max_input_tokens=8192, max_output_tokens=8192),
+            ModelDescription("llama3-70b-8192", max_input_tokens=8192, max_output_tokens=8192),
+            # mistral
+            ModelDescription("mixtral-8x7b-32768", max_input_tokens=32768, max_output_tokens=32768),
+            # google
+            ModelDescription("gemma-7b-it", max_input_tokens=8192, max_output_tokens=8192),
+        ]
+    }
+    AVAILABLE_MODELS = list(MODEL_DESCRIPTIONS)
 
     def __init__(self, api_token, model_name=AVAILABLE_MODELS[0], max_tokens=4096) -> None:
         super().__init__(api_token=api_token, model_name=model_name, max_tokens=max_tokens)
-        self._groq_client = Groq(api_key=self.api_token)
+        # api_token may be a comma separated list of keys to spread requests across
+        self._groq_client = KeyPoolRegistry.client(
+            self.PROVIDER, self.api_token, Groq, DefaultHttpxClient
+        )
+        self._async_groq_client = KeyPoolRegistry.client(
+            self.PROVIDER, self.api_token, AsyncGroq, DefaultAsyncHttpxClient
+        )
 
     def get_chat_completion(self, context: ChatContext) -> ContentMessage:
         completion = self._groq_client.chat.completions.create(
-            messages=context.get_messages_as_list(), model=self.model_name
+            messages=context.get_messages_as_list(),
+            model=self.model_name,
+            max_tokens=self.response_token_limit(),
         )
 
+        return self._message_from_completion(completion)
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        """Async version of get_chat_completion, backed by AsyncGroq."""
+        completion = await self._async_groq_client.chat.completions.create(
+            messages=context.get_messages_as_list(),
+            model=self.model_name,
+            max_tokens=self.response_token_limit(),
+        )
+
+        return self._message_from_completion(completion)
+
+    async def stream_chat_completion(self, context: ChatContext) -> AsyncIterator[str]:
+        """Stream a chat completion with stream=True."""
+        stream = await self._async_groq_client.chat.completions.create(
+            messages=context.get_messages_as_list(),
+            model=self.model_name,
+            max_tokens=self.response_token_limit(),
+            stream=True,
+        )
+
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _message_from_completion(self, completion) -> ContentMessage:
         if not completion:
             return SystemMessage(
                 "_(turbo's host here: turbo didn't have anything to say :bluefootbooby:)_"
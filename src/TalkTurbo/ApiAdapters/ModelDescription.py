@@ -15,6 +15,17 @@ class ModelDescription(ABC):
             f"{self.model_name} (input: {self.max_input_tokens}, output: {self.max_output_tokens})"
         )
 
+    def context_budget(self, reserved_output_tokens: int) -> int:
+        """
+        Tokens available for the prompt when room is kept for the response.
+
+        Args:
+            reserved_output_tokens: Tokens to keep free for the response.  Capped at
+                                    max_output_tokens.
+        """
+        reserved_output_tokens = min(reserved_output_tokens, self.max_output_tokens)
+        return max(self.max_input_tokens - reserved_output_tokens, 0)
+
     def to_dict(self) -> dict:
         return {
             "model_name": self.model_name,
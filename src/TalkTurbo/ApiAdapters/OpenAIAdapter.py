@@ -1,23 +1,36 @@
 """Adapter for OpenAI's API."""
 
-from openai import OpenAI
+from typing import AsyncIterator
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 
 from TalkTurbo import ChatContext
 from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ApiAdapters.ModelDescription import ModelDescription
+from TalkTurbo.KeyPool import KeyPoolRegistry
 from TalkTurbo.Messages import ContentMessage, MessageFactory, SystemMessage
 
 
 class OpenAIAdapter(ApiAdapter):
     """Adapter for OpenAI's API."""
 
-    AVAILABLE_MODELS = [
-        "gpt-4o-mini",
-        "o1-preview",
-        "o1-mini",
-        "gpt-4",
-        "gpt-4-turbo-preview",
-        "gpt-4o",
-    ]
+    PROVIDER = "openai"
+
+    # https://platform.openai.com/docs/models
+    MODEL_DESCRIPTIONS = {
+        description.model_name: description
+        for description in [
+            ModelDescription("gpt-4o-mini", max_input_tokens=128000, max_output_tokens=16384),
+            ModelDescription("o1-preview", max_input_tokens=128000, max_output_tokens=32768),
+            ModelDescription("o1-mini", max_input_tokens=128000, max_output_tokens=65536),
+            ModelDescription("gpt-4", max_input_tokens=8192, max_output_tokens=8192),
+            ModelDescription(
+                "gpt-4-turbo-preview", max_input_tokens=128000, max_output_tokens=4096
+            ),
+            ModelDescription("gpt-4o", max_input_tokens=128000, max_output_tokens=16384),
+        ]
+    }
+    AVAILABLE_MODELS = list(MODEL_DESCRIPTIONS)
 
     def __init__(
         self,
@@ -26,7 +39,13 @@ class OpenAIAdapter(ApiAdapter):
         max_tokens=4096,
     ):
         super().__init__(api_token=api_token, model_name=model_name, max_tokens=max_tokens)
-        self._open_ai_client = OpenAI(api_key=self.api_token)
+        # api_token may be a comma separated list of keys to spread requests across
+        self._open_ai_client = KeyPoolRegistry.client(
+            self.PROVIDER, self.api_token, OpenAI, DefaultHttpxClient
+        )
+        self._async_open_ai_client = KeyPoolRegistry.client(
+            self.PROVIDER, self.api_token, AsyncOpenAI, DefaultAsyncHttpxClient
+        )
 
     def get_chat_completion(self, context: ChatContext) -> ContentMessage:
         """
@@ -44,9 +63,37 @@ class OpenAIAdapter(ApiAdapter):
             Something went wrong with the request.
         """
         completion = self._open_ai_client.chat.completions.create(
-            messages=context.get_messages_as_list(), model=self.model_name
+            messages=context.get_messages_as_list(),
+            model=self.model_name,
+            max_completion_tokens=self.response_token_limit(),
         )
 
+        return self._message_from_completion(completion)
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        """Async version of get_chat_completion, backed by AsyncOpenAI."""
+        completion = await self._async_open_ai_client.chat.completions.create(
+            messages=context.get_messages_as_list(),
+            model=self.model_name,
+            max_completion_tokens=self.response_token_limit(),
+        )
+
+        return self._message_from_completion(completion)
+
+    async def stream_chat_completion(self, context: ChatContext) -> AsyncIterator[str]:
+        """Stream a chat completion with stream=True."""
+        stream = await self._async_open_ai_client.chat.completions.create(
+            messages=context.get_messages_as_list(),
+            model=self.model_name,
+            max_completion_tokens=self.response_token_limit(),
+            stream=True,
+        )
+
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _message_from_completion(self, completion) -> ContentMessage:
         if not completion:
             return SystemMessage(
                 "_(turbo's host here: turbo didn't have anything to say :bluefootbooby:)_"
@@ -0,0 +1,258 @@
+"""Retries, deadlines and a circuit breaker around any ApiAdapter."""
+
+import asyncio
+import logging
+import random
+import time
+from typing import AsyncIterator, Callable
+
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.CircuitBreaker import CircuitBreaker, CircuitBreakerRegistry
+from TalkTurbo.KeyPool import retry_after_seconds
+from TalkTurbo.Messages import ContentMessage
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call (retries included) runs past its deadline."""
+
+
+class ResilientAdapter(ApiAdapter):
+    """
+    Wraps an ApiAdapter with retries, per-call deadlines and a circuit breaker.
+
+    Transient errors (rate limits, overloaded or unavailable providers, timeouts and
+    dropped connections) are retried with jittered exponential backoff.  A Retry-After
+    from the provider is honoured.  Every call (retries included) must finish within
+    deadline seconds.
+
+    Calls go through the provider's shared CircuitBreaker, so once a provider keeps
+    failing every adapter for it fails fast with CircuitOpenError until it recovers.
+
+    Budgets, token counting and conversion are delegated to the wrapped adapter.
+    """
+
+    # http statuses worth retrying
+    TRANSIENT_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+    # exception class names (from any provider SDK) worth retrying
+    TRANSIENT_ERRORS = frozenset(
+        {
+            "APIConnectionError",
+            "APITimeoutError",
+            "ConnectError",
+            "ReadTimeout",
+            "ResourceExhausted",
+            "ServiceUnavailable",
+            "DeadlineExceeded",
+            "InternalServerError",
+        }
+    )
+
+    def __init__(
+        self,
+        adapter: ApiAdapter,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        deadline: float = 60.0,
+        breaker: CircuitBreaker = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        args:
+            adapter: The adapter to wrap.
+            max_retries: Retries after the first attempt.
+            base_delay: Backoff before the first retry, doubled for each retry after.
+            max_delay: Longest backoff between retries.
+            deadline: Seconds each call may take, retries included.  None for no deadline.
+            breaker: Defaults to the shared breaker for the adapter's provider.
+        """
+        super().__init__(
+            api_token=adapter.api_token,
+            model_name=adapter.model_name,
+            max_tokens=adapter.max_tokens,
+        )
+        self.adapter = adapter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreakerRegistry.get(
+            adapter.PROVIDER or type(adapter).__name__
+        )
+        self._sleep = sleep
+        self._logger = logging.getLogger("Turbo")
+
+        # budgets follow the wrapped adapter
+        self.PROVIDER = adapter.PROVIDER
+        self.TOKEN_ENCODING = adapter.TOKEN_ENCODING
+        self.MODEL_DESCRIPTIONS = adapter.MODEL_DESCRIPTIONS
+        self.CONTEXT_BUDGET_MARGIN = adapter.CONTEXT_BUDGET_MARGIN
+
+        # retries made and calls that gave up
+        self.retries = 0
+        self.failures = 0
+
+    def __repr__(self) -> str:
+        return f"ResilientAdapter({self.adapter!r})"
+
+    @property
+    def AVAILABLE_MODELS(self) -> list[str]:
+        return list(self.MODEL_DESCRIPTIONS)
+
+    def convert_context_to_api_format(self, context: ChatContext):
+        return self.adapter.convert_context_to_api_format(context)
+
+    def get_chat_completion(self, context: ChatContext) -> ContentMessage:
+        """
+        get_chat_completion of the wrapped adapter, retried.
+
+        A blocking call can not be interrupted, so the deadline is only checked between
+        attempts.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = self.adapter.get_chat_completion(context)
+            except Exception as exc:
+                delay = self._after_failure(exc, attempt, time.monotonic() - start)
+                self._sleep(delay)
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return response
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        """get_chat_completion_async of the wrapped adapter, retried within the deadline."""
+        return await self._with_deadline(self._get_chat_completion_async(context))
+
+    async def stream_chat_completion(self, context: ChatContext) -> AsyncIterator[str]:
+        """
+        stream_chat_completion of the wrapped adapter.
+
+        Retried only until the first delta arrives - after that the stream can not be
+        replayed, so errors are raised.  The deadline applies to the first delta.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            stream = self.adapter.stream_chat_completion(context)
+            try:
+                first = await self._with_deadline(stream.__anext__(), start)
+            except StopAsyncIteration:
+                self.breaker.record_success()
+                return
+            except DeadlineExceededError:
+                raise
+            except asyncio.CancelledError:
+                self.breaker.record_abandoned()
+                raise
+            except Exception as exc:
+                await stream.aclose()
+                await asyncio.sleep(self._after_failure(exc, attempt, time.monotonic() - start))
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            break
+
+        yield first
+        async for delta in stream:
+            yield delta
+
+    async def _get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = await self.adapter.get_chat_completion_async(context)
+            except asyncio.CancelledError:
+                self.breaker.record_abandoned()
+                raise
+            except Exception as exc:
+                await asyncio.sleep(self._after_failure(exc, attempt, time.monotonic() - start))
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return response
+
+    async def _with_deadline(self, awaitable, start: float = None):
+        if self.deadline is None:
+            return await awaitable
+
+        elapsed = time.monotonic() - start if start is not None else 0.0
+        try:
+            return await asyncio.wait_for(awaitable, max(self.deadline - elapsed, 0.0))
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            self.failures += 1
+            raise DeadlineExceededError(
+                f"{self.PROVIDER} {self.model_name} call exceeded its {self.deadline}s deadline"
+            ) from None
+
+    def _after_failure(self, exc: Exception, attempt: int, elapsed: float) -> float:
+        """
+        Record a failed attempt and return the backoff before the next one.
+
+        Re-raises exc if it should not be retried.
+        """
+        if not self.is_transient(exc):
+            # the provider answered - it's the request that's wrong
+            self.breaker.record_success()
+            raise exc
+
+        self.breaker.record_failure()
+        delay = self.backoff(attempt, self.retry_after(exc))
+
+        if attempt >= self.max_retries or (
+            self.deadline is not None and elapsed + delay > self.deadline
+        ):
+            self.failures += 1
+            raise exc
+
+        self.retries += 1
+        self._logger.warning(
+            "%s %s: %s, retry %s/%s in %.2fs",
+            self.PROVIDER,
+            self.model_name,
+            type(exc).__name__,
+            attempt + 1,
+            self.max_retries,
+            delay,
+        )
+        return delay
+
+    def backoff(self, attempt: int, retry_after: float = None) -> float:
+        """Full-jitter exponential backoff, or the provider's Retry-After if it's longer."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        return delay
+
+    @classmethod
+    def is_transient(cls, exc: Exception) -> bool:
+        if isinstance(exc, (ConnectionError, TimeoutError)):
+            return True
+
+        status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+        if isinstance(status, int) and status in cls.TRANSIENT_STATUSES:
+            return True
+
+        return any(klass.__name__ in cls.TRANSIENT_ERRORS for klass in type(exc).__mro__)
+
+    @staticmethod
+    def retry_after(exc: Exception) -> float | None:
+        """The Retry-After of the response that raised exc, in seconds, if it sent one."""
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if not headers:
+            return None
+
+        return retry_after_seconds(headers)
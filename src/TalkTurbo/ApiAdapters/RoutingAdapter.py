@@ -0,0 +1,282 @@
+"""Routes each request to the fastest healthy model of an equivalence set."""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from typing import AsyncIterator
+
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.CircuitBreaker import CircuitState
+from TalkTurbo.Messages import ContentMessage
+from TalkTurbo.Metrics import LatencyStats
+from TalkTurbo.RateLimiter import RateLimitScheduler
+
+
+class ModelStats:
+    """Rolling latency and error rate of one provider/model."""
+
+    def __init__(self, window: int = 256) -> None:
+        self.latency = LatencyStats(window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds: float = None):
+        """Record a request that succeeded after seconds (None if its latency isn't comparable)."""
+        if seconds is not None:
+            self.latency.record(seconds)
+        with self._lock:
+            self._outcomes.append(True)
+
+    def record_error(self):
+        with self._lock:
+            self._outcomes.append(False)
+
+    @property
+    def samples(self) -> int:
+        return len(self._outcomes)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def stats(self) -> dict:
+        return {**self.latency.stats(), "error_rate": self.error_rate}
+
+
+class RoutingAdapter(ApiAdapter):
+    """
+    An ApiAdapter over an equivalence set of adapters for interchangeable models.
+
+    Each request goes to the candidate with the best score - its median latency,
+    inflated by its error rate.  Candidates without stats are tried first, and ones
+    whose circuit breaker is open go last.  A failed request fails over to the next
+    candidate.
+
+    With hedging on, if the chosen candidate hasn't answered within its p95 latency a
+    duplicate request goes to the runner-up; the first answer wins and the other
+    request is cancelled.  Hedging starts once a candidate has min_samples latencies.
+
+    Latency and error stats are per provider/model and shared by every RoutingAdapter.
+    """
+
+    PROVIDER = "router"
+
+    # "provider/model" -> ModelStats, shared by every router
+    MODEL_STATS: dict[str, ModelStats] = defaultdict(ModelStats)
+
+    # score multiplier per unit of error rate
+    ERROR_PENALTY = 10.0
+
+    def __init__(
+        self,
+        candidates: list[ApiAdapter],
+        hedge: bool = False,
+        hedge_percentile: float = 95,
+        min_samples: int = 10,
+        scheduler: RateLimitScheduler = None,
+    ) -> None:
+        """
+        args:
+            candidates: Adapters for the interchangeable models, in order of preference.
+            hedge: Send a duplicate request to the runner-up when the chosen candidate is slow.
+            hedge_percentile: Latency percentile of the chosen candidate to hedge after.
+            min_samples: Latencies a candidate needs before it is hedged.
+            scheduler: Rate limits each request to a candidate within its provider's quota.
+        """
+        if not candidates:
+            raise ValueError("RoutingAdapter needs at least one candidate adapter.")
+
+        super().__init__(
+            api_token=None,
+            model_name=" | ".join(candidate.model_name for candidate in candidates),
+            max_tokens=min(candidate.max_tokens for candidate in candidates),
+        )
+        self.candidates = list(candidates)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.scheduler = scheduler
+        self._logger = logging.getLogger("Turbo")
+
+        # hedged requests sent, and how many of them answered first
+        self.hedges = 0
+        self.hedges_won = 0
+
+    @staticmethod
+    def stats_key(adapter: ApiAdapter) -> str:
+        return f"{adapter.PROVIDER}/{adapter.model_name}"
+
+    def stats_for(self, adapter: ApiAdapter) -> ModelStats:
+        return self.MODEL_STATS[self.stats_key(adapter)]
+
+    def ranked(self) -> list[ApiAdapter]:
+        """The candidates, best first."""
+        return sorted(self.candidates, key=self._score)
+
+    @property
+    def token_counter(self):
+        return self.ranked()[0].token_counter
+
+    def fit_context(self, context: ChatContext):
+        """Fit the context to the candidate with the smallest budget, so any of them can take it."""
+        tightest = min(
+            self.candidates,
+            key=lambda candidate: candidate.context_budget() or context.max_tokens,
+        )
+        tightest.fit_context(context)
+
+    def context_budget(self) -> int | None:
+        budgets = [candidate.context_budget() for candidate in self.candidates]
+        return min((budget for budget in budgets if budget), default=None)
+
+    def convert_context_to_api_format(self, context: ChatContext):
+        return self.ranked()[0].convert_context_to_api_format(context)
+
+    def get_chat_completion(self, context: ChatContext) -> ContentMessage:
+        """Blocking completion from the best candidate, failing over in rank order.  Never hedged."""
+        error = None
+        for candidate in self.ranked():
+            start = time.perf_counter()
+            try:
+                response = candidate.get_chat_completion(context)
+            except Exception as exc:
+                self.stats_for(candidate).record_error()
+                error = exc
+                continue
+
+            self.stats_for(candidate).record_success(time.perf_counter() - start)
+            return response
+
+        raise error
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        """Completion from the best candidate, hedged if enabled, failing over in rank order."""
+        ranked = self.ranked()
+        error = None
+        while ranked:
+            primary = ranked.pop(0)
+            hedge_delay = self._hedge_delay(primary) if ranked else None
+            try:
+                if hedge_delay is None:
+                    return await self._attempt(primary, context)
+
+                return await self._hedged(primary, ranked, hedge_delay, context)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._logger.warning("router: %s failed: %s", self.stats_key(primary), exc)
+                error = exc
+
+        raise error
+
+    async def stream_chat_completion(self, context: ChatContext) -> AsyncIterator[str]:
+        """Stream from the best candidate, failing over until the first delta.  Never hedged."""
+        error = None
+        for candidate in self.ranked():
+            stats = self.stats_for(candidate)
+            stream = candidate.stream_chat_completion(context)
+            try:
+                await self._schedule(candidate, context)
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                stats.record_success()
+                return
+            except Exception as exc:
+                stats.record_error()
+                error = exc
+                continue
+
+            # time to first delta isn't comparable with full completion latencies
+            stats.record_success()
+            yield first
+            async for delta in stream:
+                yield delta
+            return
+
+        raise error
+
+    async def _hedged(
+        self, primary: ApiAdapter, ranked: list[ApiAdapter], delay: float, context: ChatContext
+    ) -> ContentMessage:
+        """
+        primary's completion, hedged with the next of ranked if it's slower than delay.
+
+        The runner-up is only taken from ranked once the hedge is sent, so a primary that
+        fails early still fails over to it.
+        """
+        first = asyncio.create_task(self._attempt(primary, context))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        secondary = ranked.pop(0)
+        self.hedges += 1
+        self._logger.info(
+            "router: %s slower than %.2fs, hedging with %s",
+            self.stats_key(primary),
+            delay,
+            self.stats_key(secondary),
+        )
+        second = asyncio.create_task(self._attempt(secondary, context))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedges_won += 1
+                        return task.result()
+
+            # both failed
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, candidate: ApiAdapter, context: ChatContext) -> ContentMessage:
+        stats = self.stats_for(candidate)
+        await self._schedule(candidate, context)
+        start = time.perf_counter()
+        try:
+            response = await candidate.get_chat_completion_async(context)
+        except asyncio.CancelledError:
+            # the other request of a hedge won, this says nothing about the model
+            raise
+        except Exception:
+            stats.record_error()
+            raise
+
+        stats.record_success(time.perf_counter() - start)
+        return response
+
+    async def _schedule(self, candidate: ApiAdapter, context: ChatContext):
+        if self.scheduler is not None:
+            await self.scheduler.acquire(
+                candidate.PROVIDER, candidate.model_name, context.context_length_in_tokens()
+            )
+
+    def _hedge_delay(self, candidate: ApiAdapter) -> float | None:
+        stats = self.stats_for(candidate)
+        if not self.hedge or len(stats.latency) < self.min_samples:
+            return None
+
+        return stats.latency.percentile(self.hedge_percentile)
+
+    def _score(self, candidate: ApiAdapter) -> tuple:
+        breaker = getattr(candidate, "breaker", None)
+        circuit_open = breaker is not None and breaker.state is CircuitState.OPEN
+
+        stats = self.stats_for(candidate)
+        if not len(stats.latency):
+            # untried candidates go first, ones that only ever failed go last
+            return (circuit_open, math.inf if stats.error_rate == 1 else 0.0)
+
+        return (circuit_open, stats.latency.p50 * (1 + self.ERROR_PENALTY * stats.error_rate))
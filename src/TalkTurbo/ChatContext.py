@@ -1,31 +1,111 @@
 """Represents the context of a conversation with a chatbot."""
 
-import tiktoken
+import weakref
+from collections.abc import Sequence
+from itertools import islice
+from typing import Iterator
 
-from TalkTurbo.Messages import ContentMessage, SystemMessage, UserMessage
+from TalkTurbo.ContextPrefix import ContextPrefix
+from TalkTurbo.MessageHistory import MessageHistory
+from TalkTurbo.Messages import ContentMessage, FrozenDict, SystemMessage, UserMessage
+from TalkTurbo.Tokenizers import TokenCounter, TokenizerRegistry
+
+
+class ContextPayload(Sequence):
+    """
+    Read-only view of a ChatContext as completion dicts: the prefix, then the live messages.
+
+    Creating a view is constant-time - the dicts are built once, when a message enters
+    the context, and are FrozenDicts.  The view is live and reflects later changes to
+    the context, so use it right away rather than holding on to it.
+    """
+
+    __slots__ = ("_prefix_dicts", "_history")
+
+    def __init__(self, prefix_dicts: tuple[FrozenDict, ...], history: MessageHistory) -> None:
+        self._prefix_dicts = prefix_dicts
+        self._history = history
+
+    def __len__(self) -> int:
+        return len(self._prefix_dicts) + len(self._history)
+
+    def __iter__(self) -> Iterator[FrozenDict]:
+        yield from self._prefix_dicts
+        yield from self._history.completion_dicts()
+
+    def __reversed__(self) -> Iterator[FrozenDict]:
+        return reversed(list(self))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("ContextPayload index out of range")
+
+        if index < len(self._prefix_dicts):
+            return self._prefix_dicts[index]
+
+        return next(islice(self._history.completion_dicts(), index - len(self._prefix_dicts), None))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return list(self) == list(other)
+
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ContextPayload({list(self)!r})"
 
 
 class ChatContext:
     """
     Represents the context of a conversation with a chatbot.
+
+    The system prompt and pre-load data live in an immutable ContextPrefix that can be
+    shared with other contexts.  Changing either gives this context its own prefix.
+
+    Live messages are kept in a turn-aware MessageHistory; eviction drops whole
+    user/assistant turns from the head of the history.
+
+    The context length in tokens is the prefix's cached count plus the history's
+    running total, so it never requires a recount.
+
+    version increases on every change to the context, so consumers (like the
+    adapters' conversion caches) can cheaply tell whether it changed.  Tokens are counted with
+    token_counter, which should match the model the context is sent to
+    (see ApiAdapter.token_counter).
     """
 
     _tokenizer_downloaded = False
 
+    # when set, every mutation re-checks the running token total against a full recount.
+    # expensive - only meant for debugging.
+    VERIFY_TOKEN_COUNT = False
+
     def __init__(
         self,
         messages: list[ContentMessage] = None,
         system_prompt: SystemMessage = SystemMessage(""),
         pre_load_data: list[ContentMessage] = None,
         max_tokens: int = 4096,
+        token_counter: TokenCounter = None,
+        prefix: ContextPrefix = None,
     ) -> None:
-        if not messages:
-            messages = []
-        self.messages = messages
-        self.system_prompt = system_prompt
-        self.pre_load_data = pre_load_data if pre_load_data else []
+        """
+        args:
+            prefix: A shared ContextPrefix.  Takes precedence over system_prompt
+                    and pre_load_data.
+        """
+        self._prefix = prefix or ContextPrefix(system_prompt, pre_load_data)
         self.max_tokens = max_tokens
-        self._encoding = tiktoken.get_encoding("cl100k_base")
+        self._token_counter = token_counter or TokenizerRegistry.get()
+        self._history = self._build_history(messages)
+        self.version = 0
+        self._forked_from = None
 
     def __str__(self) -> str:
         return (
@@ -35,74 +115,190 @@ class ChatContext:
             f"max_tokens={self.max_tokens})"
         )
 
-    def context_length_in_tokens(self) -> int:
-        """Return the total length of the context in tokens."""
-        total_tokens = self.system_prompt.encoding_length_in_tokens
+    @property
+    def messages(self) -> list[ContentMessage]:
+        """A snapshot of the live messages, oldest first.  Mutating it does not change the context."""
+        return list(self._history)
 
-        # count the pre-load data
-        if self.pre_load_data:
-            for message in self.pre_load_data:
-                total_tokens += message.encoding_length_in_tokens
+    @messages.setter
+    def messages(self, messages: list[ContentMessage]):
+        self._history = self._build_history(messages)
+        self.version += 1
 
-        # count the live messages
-        for message in self.messages:
-            total_tokens += message.encoding_length_in_tokens
+    @property
+    def history(self) -> MessageHistory:
+        """The live message history.  Read-only - use add_message to change it."""
+        return self._history
 
-        return total_tokens
+    @property
+    def prefix(self) -> ContextPrefix:
+        return self._prefix
+
+    def set_prefix(self, prefix: ContextPrefix):
+        """Use a (possibly shared) prefix and trim old messages that don't fit within max_tokens."""
+        self._prefix = prefix
+        self.version += 1
+
+        # shorten the context to max_tokens if needed
+        self._reduce_context()
+
+    @property
+    def system_prompt(self) -> SystemMessage:
+        return self._prefix.system_prompt
+
+    @system_prompt.setter
+    def system_prompt(self, system_prompt: SystemMessage):
+        self._prefix = self._prefix.with_system_prompt(system_prompt)
+        self.version += 1
+
+    @property
+    def pre_load_data(self) -> list[ContentMessage]:
+        """A snapshot of the pre-load data.  Use add_pre_load_data to change it."""
+        return list(self._prefix.pre_load_data)
+
+    @pre_load_data.setter
+    def pre_load_data(self, pre_load_data: list[ContentMessage]):
+        self._prefix = ContextPrefix(self._prefix.system_prompt, pre_load_data)
+        self.version += 1
+
+    @property
+    def token_counter(self) -> TokenCounter:
+        return self._token_counter
+
+    def set_token_counter(self, token_counter: TokenCounter):
+        """Recount the context with a different token counter and trim it to max_tokens."""
+        self.resize(self.max_tokens, token_counter)
+
+    def resize(self, max_tokens: int, token_counter: TokenCounter = None):
+        """
+        Change the token budget (and optionally the token counter) of the context.
+
+        Old messages that no longer fit are trimmed.
+        """
+        if token_counter is not None and token_counter is not self._token_counter:
+            self._token_counter = token_counter
+            self._history.recount(self._tokens)
+
+        self.max_tokens = max_tokens
+
+        # shorten the context to max_tokens if needed
+        self._reduce_context()
+
+    def context_length_in_tokens(self) -> int:
+        """Return the total length of the context in tokens."""
+        return self._prefix.token_count(self._token_counter) + self._history.token_count
 
     def add_message(self, message: ContentMessage | str):
         """Add a message to the context and trim old messages that don't fit within max_tokens."""
         if isinstance(message, str):
-            message = UserMessage(message, self._encoding)
+            message = UserMessage(message)
 
-        self.messages.append(message)
+        self._history.append(message, self._tokens(message))
+        self.version += 1
 
         # shorten the context to max_tokens if needed
         self._reduce_context()
 
-    def add_pre_load_data(self, message: ContentMessage):
-        """Add pre-load messages to the context and trim old messages that don't fit within max_tokens."""
-        if not isinstance(message, ContentMessage):
-            raise ValueError("Message must be an instance of ContentMessage.")
+    def fork(self) -> "ChatContext":
+        """
+        A copy of the context to try changes on without touching this one.
+
+        The prefix is shared and the history copied along with its token counts, so
+        nothing is recounted.
+        """
+        fork = ChatContext.__new__(ChatContext)
+        fork._prefix = self._prefix
+        fork.max_tokens = self.max_tokens
+        fork._token_counter = self._token_counter
+        fork._history = self._history.copy()
+        fork.version = self.version
+        fork._forked_from = (weakref.ref(self), self.version)
+        return fork
 
-        self.pre_load_data.append(message)
+    @property
+    def fork_source(self) -> "ChatContext | None":
+        """The context this one was forked from, while that context is unchanged since the fork."""
+        if self._forked_from is None:
+            return None
 
-        # shorten the context to max_tokens if needed
-        self._reduce_context()
+        source_ref, version = self._forked_from
+        source = source_ref()
+        return source if source is not None and source.version == version else None
+
+    def add_pre_load_data(self, *messages: ContentMessage):
+        """
+        Add pre-load messages to the context and trim old messages that don't fit within max_tokens.
+
+        Pass every message of a pre-load in one call: the shared prefix is rebuilt once per call.
+        """
+        if not all(isinstance(message, ContentMessage) for message in messages):
+            raise ValueError("Message must be an instance of ContentMessage.")
+
+        self.set_prefix(self._prefix.with_pre_load_data(*messages))
 
     def add_pre_load_system_prompt(self, message: ContentMessage):
         """Add pre-load system prompt to the context and trim old messages that don't fit within max_tokens."""
         if not isinstance(message, ContentMessage):
             raise ValueError("Message must be an instance of ContentMessage.")
 
-        self.system_prompt = message
-
-        # shorten the context to max_tokens if needed
-        self._reduce_context()
+        self.set_prefix(self._prefix.with_system_prompt(message))
 
     def get_latest_message(self) -> ContentMessage:
         """Return the latest message in the context."""
-        return self.messages[-1]
+        return self._history.latest()
 
     def _reduce_context(self):
         """
         Reduce the context to max_tokens if needed.
 
+        Whole turns are dropped from the head of the history.  The newest turn is
+        always kept so the latest message is never lost.
+
         Side-effect: modifies self.messages
         """
-        while self.context_length_in_tokens() > self.max_tokens:
-            # delete pairs of messages user/assistant message
-            # until the context is short enough
-            del self.messages[0]
-            del self.messages[1]
+        while self.context_length_in_tokens() > self.max_tokens and self._history.turn_count > 1:
+            self._history.evict_oldest_turn()
+            self.version += 1
 
-    def get_messages_as_list(self) -> list[dict]:
-        """Convert the context messages to a list of message dicts"""
-        messages = [self.system_prompt.to_completion_dict()]
+        if ChatContext.VERIFY_TOKEN_COUNT:
+            self._verify_token_count()
 
-        if self.pre_load_data:
-            messages += [message.to_completion_dict() for message in self.pre_load_data]
+    def _count_tokens(self) -> int:
+        """Count the tokens in the system prompt, pre-load data and messages from scratch."""
+        total_tokens = self._tokens(self._prefix.system_prompt)
 
-        messages += [message.to_completion_dict() for message in self.messages]
+        # count the pre-load data
+        for message in self._prefix.pre_load_data:
+            total_tokens += self._tokens(message)
 
-        return messages
+        # count the live messages
+        for message in self._history:
+            total_tokens += self._tokens(message)
+
+        return total_tokens
+
+    def _tokens(self, message: ContentMessage) -> int:
+        return message.token_count(self._token_counter)
+
+    def _build_history(self, messages: list[ContentMessage] = None) -> MessageHistory:
+        messages = messages or []
+        return MessageHistory(messages, [self._tokens(message) for message in messages])
+
+    def _verify_token_count(self):
+        """Raise a RuntimeError if the running token total has drifted from a full recount."""
+        expected = self._count_tokens()
+        if self.context_length_in_tokens() != expected:
+            raise RuntimeError(
+                f"ChatContext token count drifted: running total {self.context_length_in_tokens()}, "
+                f"recount {expected}"
+            )
+
+    def get_messages_as_list(self) -> ContextPayload:
+        """
+        The context messages as message dicts.
+
+        Returns a read-only ContextPayload view over completion dicts that are built
+        once, so this is constant-time however long the context is.  Adapters that
+        need to change a message must copy it first.
+        """
+        return ContextPayload(self._prefix.completion_dicts, self._history)
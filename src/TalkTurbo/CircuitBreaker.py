@@ -0,0 +1,143 @@
+"""Per-provider circuit breakers that fail fast while a provider is down."""
+
+import threading
+import time
+from collections import Counter
+from enum import Enum
+from typing import Callable
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"circuit for {name} is open, retrying in {retry_in:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of calls to one provider.
+
+    CLOSED: calls go through.  failure_threshold consecutive failures open the circuit.
+    OPEN: calls fail fast with CircuitOpenError for reset_timeout seconds.
+    HALF_OPEN: one trial call goes through; success closes the circuit, failure opens it again.
+
+    Every state change is counted in transitions, keyed by (from, to) state.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.transitions: Counter[tuple[CircuitState, CircuitState]] = Counter()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            self._check_reset()
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not go to the provider."""
+        with self._lock:
+            self._check_reset()
+
+            if self._state is CircuitState.OPEN:
+                raise CircuitOpenError(
+                    self.name, self._opened_at + self.reset_timeout - self._clock()
+                )
+
+            if self._state is CircuitState.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.name, 0.0)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state is not CircuitState.CLOSED:
+                self._transition(CircuitState.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state is CircuitState.HALF_OPEN or (
+                self._state is CircuitState.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = self._clock()
+                self._transition(CircuitState.OPEN)
+
+    def record_abandoned(self):
+        """The call was cancelled before it succeeded or failed."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._failures,
+            "transitions": {
+                f"{before.value}->{after.value}": count
+                for (before, after), count in self.transitions.items()
+            },
+        }
+
+    def _check_reset(self):
+        if (
+            self._state is CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._transition(CircuitState.HALF_OPEN)
+
+    def _transition(self, state: CircuitState):
+        self.transitions[(self._state, state)] += 1
+        self._state = state
+
+
+class CircuitBreakerRegistry:
+    """Process-wide circuit breakers, one per provider."""
+
+    _BREAKERS: dict[str, CircuitBreaker] = {}
+    _LOCK = threading.Lock()
+
+    @staticmethod
+    def get(provider: str, **kwargs) -> CircuitBreaker:
+        """
+        The breaker for provider, created with kwargs (see CircuitBreaker) on first use.
+        """
+        with CircuitBreakerRegistry._LOCK:
+            breaker = CircuitBreakerRegistry._BREAKERS.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(provider, **kwargs)
+                CircuitBreakerRegistry._BREAKERS[provider] = breaker
+
+        return breaker
+
+    @staticmethod
+    def stats() -> dict[str, dict]:
+        return {
+            provider: breaker.stats()
+            for provider, breaker in CircuitBreakerRegistry._BREAKERS.items()
+        }
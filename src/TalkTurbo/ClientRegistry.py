@@ -0,0 +1,69 @@
+"""Process-wide SDK clients, one per provider and api key."""
+
+import hashlib
+import threading
+from collections import Counter
+from typing import Callable, TypeVar
+
+Client = TypeVar("Client")
+
+
+class ClientRegistry:
+    """
+    Shares provider SDK clients across the process.
+
+    Every SDK client owns an HTTP connection pool, so building one per adapter (or per
+    /set_model) means a fresh TCP and TLS handshake for each.  Clients are created once
+    per (provider, api key) and reused, so every guild rides the same warm keep-alive
+    connections.
+
+    Keys are only held as a digest, and clients live for the life of the process.
+    """
+
+    _CLIENTS: dict[tuple[str, str], object] = {}
+    _LOCK = threading.Lock()
+
+    # clients created and clients reused, per provider
+    created: Counter[str] = Counter()
+    reused: Counter[str] = Counter()
+
+    @staticmethod
+    def get(provider: str, api_key: str, factory: Callable[..., Client]) -> Client:
+        """
+        The client for provider and api_key, created with factory(api_key=api_key) on first use.
+
+        args:
+            provider: Names the client, e.g. "openai" or "openai-async".  Sync and async
+                      clients of one SDK need different names.
+        """
+        key = (provider, ClientRegistry.key_digest(api_key))
+        with ClientRegistry._LOCK:
+            client = ClientRegistry._CLIENTS.get(key)
+            if client is None:
+                client = factory(api_key=api_key)
+                ClientRegistry._CLIENTS[key] = client
+                ClientRegistry.created[provider] += 1
+            else:
+                ClientRegistry.reused[provider] += 1
+
+        return client
+
+    @staticmethod
+    def clear():
+        """Forget every client, e.g. after the api keys change."""
+        with ClientRegistry._LOCK:
+            ClientRegistry._CLIENTS.clear()
+            ClientRegistry.created.clear()
+            ClientRegistry.reused.clear()
+
+    @staticmethod
+    def stats() -> dict[str, dict]:
+        return {
+            provider: {"created": created, "reused": ClientRegistry.reused[provider]}
+            for provider, created in ClientRegistry.created.items()
+        }
+
+    @staticmethod
+    def key_digest(api_key: str) -> str:
+        """A stand-in for api_key in cache keys."""
+        return hashlib.sha256((api_key or "").encode()).hexdigest()
@@ -3,8 +3,16 @@ The CompletionAssistant class is responsible for managing the API adapters and
 providing a unified interface for interacting with them.
 """
 
+import asyncio
+import time
+from collections import Counter, defaultdict
+from typing import AsyncIterator, Awaitable, Callable
+
 from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
 from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.Messages import AssistantMessage, ContentMessage
+from TalkTurbo.Metrics import LatencyStats
+from TalkTurbo.RateLimiter import Priority, RateLimitScheduler
 
 
 class CompletionAssistant:
@@ -13,6 +21,16 @@ class CompletionAssistant:
     ADAPTER = None
     INITIALIZED = None
 
+    # rate limits async requests when set, see set_scheduler
+    SCHEDULER: RateLimitScheduler = None
+
+    # provider name -> time from sending a streamed request to receiving its first delta
+    TIME_TO_FIRST_TOKEN: dict[str, LatencyStats] = defaultdict(LatencyStats)
+
+    # speculative completions "committed" to their context, or "discarded" because
+    # moderation flagged the prompt
+    SPECULATION: Counter[str] = Counter()
+
     @staticmethod
     def set_adapter(adapter: ApiAdapter):
         """
@@ -25,6 +43,42 @@ class CompletionAssistant:
         CompletionAssistant.ADAPTER = adapter
         CompletionAssistant.INITIALIZED = True
 
+    @staticmethod
+    def set_scheduler(scheduler: RateLimitScheduler):
+        """
+        Rate limit async completion requests with scheduler.
+
+        Args:
+            scheduler: Instance of RateLimitScheduler, or None to stop rate limiting.
+        """
+        CompletionAssistant.SCHEDULER = scheduler
+
+    @staticmethod
+    async def schedule(
+        context: ChatContext,
+        adapter: ApiAdapter = None,
+        priority: Priority = Priority.MENTION,
+        deadline: float = None,
+    ):
+        """
+        Wait for the scheduler to admit a completion request for context.
+
+        The request costs context.context_length_in_tokens() tokens against the
+        provider and model quotas.  Returns right away if no scheduler is set, or if the
+        adapter schedules its own requests (e.g. a RoutingAdapter, per candidate tried).
+        """
+        adapter = adapter or CompletionAssistant.ADAPTER
+        if CompletionAssistant.SCHEDULER is None or getattr(adapter, "scheduler", None):
+            return
+
+        await CompletionAssistant.SCHEDULER.acquire(
+            adapter.PROVIDER,
+            adapter.model_name,
+            context.context_length_in_tokens(),
+            priority=priority,
+            deadline=deadline,
+        )
+
     @staticmethod
     def get_chat_completion(context: ChatContext, adapter: ApiAdapter = None) -> ChatContext:
         """
@@ -41,8 +95,136 @@ class CompletionAssistant:
         if not adapter:
             adapter = CompletionAssistant.ADAPTER
 
+        # count and trim the context for the adapter's model
+        adapter.fit_context(context)
+
         response = adapter.get_chat_completion(context)
 
         context.add_message(response)
 
         return context
+
+    @staticmethod
+    async def get_chat_completion_async(
+        context: ChatContext,
+        adapter: ApiAdapter = None,
+        priority: Priority = Priority.MENTION,
+        deadline: float = None,
+    ) -> ChatContext:
+        """
+        Get a chat completion from the adapter without blocking the event loop.
+
+        Updates the context with the response from the adapter.  If a scheduler is set
+        the request first waits for its turn within the rate limits.
+        """
+        if not CompletionAssistant.INITIALIZED:
+            raise RuntimeError(
+                "CompletionAssistant has not been initialized. Please set the adapter first."
+            )
+
+        # use the static adapter if one is not passed in
+        if not adapter:
+            adapter = CompletionAssistant.ADAPTER
+
+        # count and trim the context for the adapter's model
+        adapter.fit_context(context)
+
+        await CompletionAssistant.schedule(context, adapter, priority, deadline)
+        response = await adapter.get_chat_completion_async(context)
+
+        context.add_message(response)
+
+        return context
+
+    @staticmethod
+    async def stream_chat_completion(
+        context: ChatContext,
+        adapter: ApiAdapter = None,
+        priority: Priority = Priority.MENTION,
+        deadline: float = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion from the adapter as text deltas.
+
+        The full response is added to the context only once the stream completes - if
+        the stream fails or is abandoned (or yields nothing) the context is left as it was.
+        Rate limited like get_chat_completion_async.
+        """
+        if not CompletionAssistant.INITIALIZED:
+            raise RuntimeError(
+                "CompletionAssistant has not been initialized. Please set the adapter first."
+            )
+
+        # use the static adapter if one is not passed in
+        if not adapter:
+            adapter = CompletionAssistant.ADAPTER
+
+        # count and trim the context for the adapter's model
+        adapter.fit_context(context)
+
+        await CompletionAssistant.schedule(context, adapter, priority, deadline)
+        deltas = []
+        start = time.perf_counter()
+        async for delta in adapter.stream_chat_completion(context):
+            if not deltas:
+                CompletionAssistant.TIME_TO_FIRST_TOKEN[adapter.PROVIDER].record(
+                    time.perf_counter() - start
+                )
+            deltas.append(delta)
+            yield delta
+
+        if deltas:
+            context.add_message(AssistantMessage("".join(deltas)))
+
+    @staticmethod
+    async def get_speculative_chat_completion(
+        context: ChatContext,
+        message: ContentMessage,
+        flagged: Awaitable[bool],
+        complete: Callable[[ChatContext], Awaitable[ChatContext]] = None,
+    ) -> ContentMessage | None:
+        """
+        Get a chat completion for message while message is still being moderated.
+
+        The completion runs on a fork of context with message added, at the same time
+        as flagged.  If flagged comes back True the completion is cancelled (or its
+        response dropped), None is returned and context is left as it was.  Otherwise
+        message and the response are added to context once both are done.
+
+        Args:
+            flagged: The moderation of message, e.g. message.flagged_async().
+            complete: Completes a context in place, get_chat_completion_async by default.
+
+        Returns:
+            The response, or None if message was flagged.
+        """
+        complete = complete or CompletionAssistant.get_chat_completion_async
+
+        fork = context.fork()
+        fork.add_message(message)
+        completion = asyncio.ensure_future(complete(fork))
+
+        try:
+            is_flagged = await flagged
+        except BaseException:
+            CompletionAssistant._discard(completion)
+            raise
+
+        if is_flagged:
+            CompletionAssistant._discard(completion)
+            CompletionAssistant.SPECULATION["discarded"] += 1
+            return None
+
+        response = (await completion).get_latest_message()
+        context.add_message(message)
+        context.add_message(response)
+        CompletionAssistant.SPECULATION["committed"] += 1
+
+        return response
+
+    @staticmethod
+    def _discard(task: asyncio.Future):
+        """Cancel task, swallowing the error it may already have finished with."""
+        task.cancel()
+        if task.done() and not task.cancelled():
+            task.exception()
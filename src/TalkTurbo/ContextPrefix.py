@@ -0,0 +1,60 @@
+"""The system prompt and pre-load turns that open every request of a ChatContext."""
+
+from TalkTurbo.Messages import ContentMessage, FrozenDict, SystemMessage
+from TalkTurbo.Tokenizers import TokenCounter
+
+
+class ContextPrefix:
+    """
+    Immutable system prompt plus pre-load messages, shared between ChatContexts.
+
+    The completion dicts are built once and token counts are cached per counter, so
+    any number of guilds can reference the same prefix for free.  Prefixes are never
+    modified; the with_* methods return a new prefix (copy-on-write).
+    """
+
+    __slots__ = ("system_prompt", "pre_load_data", "_completion_dicts", "_token_counts")
+
+    def __init__(
+        self,
+        system_prompt: SystemMessage = None,
+        pre_load_data: list[ContentMessage] = None,
+    ) -> None:
+        self.system_prompt = system_prompt if system_prompt is not None else SystemMessage("")
+        self.pre_load_data: tuple[ContentMessage, ...] = tuple(pre_load_data or ())
+        self._completion_dicts = tuple(
+            FrozenDict(message.to_completion_dict())
+            for message in (self.system_prompt, *self.pre_load_data)
+        )
+        self._token_counts: dict[str, int] = {}
+
+    def __str__(self) -> str:
+        return (
+            f"ContextPrefix(system_prompt='{self.system_prompt}', "
+            f"pre_load_data={len(self.pre_load_data)} messages)"
+        )
+
+    @property
+    def completion_dicts(self) -> tuple[dict, ...]:
+        """The system prompt and pre-load data as read-only completion dicts."""
+        return self._completion_dicts
+
+    def token_count(self, counter: TokenCounter) -> int:
+        """Total tokens of the system prompt and pre-load data, cached per counter."""
+        token_count = self._token_counts.get(counter.name)
+
+        if token_count is None:
+            token_count = self.system_prompt.token_count(counter)
+            for message in self.pre_load_data:
+                token_count += message.token_count(counter)
+            self._token_counts[counter.name] = token_count
+
+        return token_count
+
+    def with_system_prompt(self, system_prompt: SystemMessage) -> "ContextPrefix":
+        """Return a copy of this prefix with a different system prompt."""
+        return ContextPrefix(system_prompt, self.pre_load_data)
+
+    def with_pre_load_data(self, *messages: ContentMessage) -> "ContextPrefix":
+        """Return a copy of this prefix with messages appended to the pre-load data."""
+        return ContextPrefix(self.system_prompt, self.pre_load_data + messages)
@@ -0,0 +1,125 @@
+"""
+Bounded thread pools for blocking provider calls.
+
+Blocking SDK calls (completions, moderation, dalle) run in a per-provider pool via
+run_in_executor so they never stall the gateway event loop, and a slow provider can
+only tie up its own workers.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from TalkTurbo.Metrics import LatencyStats
+
+
+class BoundedExecutor:
+    """
+    A fixed-size thread pool that tracks its queue depth and queue wait times.
+
+    queue_depth is the number of calls waiting for a free worker; wait_times holds how
+    long calls waited before a worker picked them up.
+    """
+
+    def __init__(self, name: str, max_workers: int) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.wait_times = LatencyStats()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        # one token per call still waiting for a worker
+        self._queued = set()
+        self._running = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queued)
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a worker thread and await the result."""
+        token = object()
+        with self._lock:
+            self._queued.add(token)
+
+        call = partial(self._call, token, time.perf_counter(), partial(fn, *args, **kwargs))
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            # a call cancelled (or rejected) before a worker picked it up never reaches _call
+            with self._lock:
+                self._queued.discard(token)
+
+    def _call(self, token, submitted: float, call):
+        self.wait_times.record(time.perf_counter() - submitted)
+        with self._lock:
+            self._queued.discard(token)
+            self._running += 1
+
+        try:
+            return call()
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "running": self.running,
+            "wait_time": self.wait_times.stats(),
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class ExecutorPool:
+    """
+    One BoundedExecutor per provider, created on first use.
+
+    Pool sizes come from pool_sizes, keyed by provider name; providers without an
+    entry get default_size workers.
+    """
+
+    DEFAULT_SIZE = 4
+
+    def __init__(self, pool_sizes: dict[str, int] = None, default_size: int = DEFAULT_SIZE) -> None:
+        self.pool_sizes = dict(pool_sizes or {})
+        self.default_size = default_size
+        self._executors: dict[str, BoundedExecutor] = {}
+
+    def get(self, provider: str) -> BoundedExecutor:
+        if provider not in self._executors:
+            size = self.pool_sizes.get(provider, self.default_size)
+            self._executors[provider] = BoundedExecutor(provider, size)
+
+        return self._executors[provider]
+
+    async def run(self, provider: str, fn, *args, **kwargs):
+        """Run a blocking call in the provider's pool and await the result."""
+        return await self.get(provider).run(fn, *args, **kwargs)
+
+    def stats(self) -> dict[str, dict]:
+        return {provider: executor.stats() for provider, executor in self._executors.items()}
+
+    def shutdown(self, wait: bool = True):
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
+
+    @staticmethod
+    def parse_pool_sizes(spec: str) -> dict[str, int]:
+        """Parse a "provider=size,provider=size" string, as given on the command line."""
+        pool_sizes = {}
+        for entry in filter(None, (part.strip() for part in (spec or "").split(","))):
+            provider, _, size = entry.partition("=")
+            if not provider or not size.isdigit() or int(size) < 1:
+                raise ValueError(f"invalid pool size {entry!r}, expected provider=size")
+            pool_sizes[provider.strip()] = int(size)
+
+        return pool_sizes
@@ -0,0 +1,163 @@
+"""Serializes the work that mutates a guild's chat context."""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+
+class _Job:
+    __slots__ = ("item", "handler", "batched", "future")
+
+    def __init__(self, item, handler, batched: bool, future: asyncio.Future) -> None:
+        self.item = item
+        self.handler = handler
+        self.batched = batched
+        self.future = future
+
+
+class GuildWorkQueue:
+    """
+    Runs a guild's jobs one at a time, in the order they were submitted.
+
+    Every job that touches the guild's ChatContext should go through the queue, so a
+    completion in flight never interleaves with another message being added.
+
+    Jobs submitted with run_batched can be coalesced: when coalesce_window is set, the
+    queue waits that long after picking up a batched job, then hands it to its handler
+    together with any jobs for the same handler that arrived in the meantime (up to
+    max_batch).  One handler call then answers all of them.
+
+    The worker task is started on demand and exits when the queue is empty.
+    """
+
+    def __init__(self, coalesce_window: float = 0.0, max_batch: int = 5) -> None:
+        """
+        args:
+            coalesce_window: Seconds to wait for more batched jobs.  0 disables coalescing.
+            max_batch: The most jobs a single handler call receives.
+        """
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self._jobs: deque[_Job] = deque()
+        self._worker: asyncio.Task = None
+        self._logger = logging.getLogger("Turbo")
+
+        # batched jobs received and handler calls made for them
+        self.batched_jobs = 0
+        self.batches = 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def requests_saved(self) -> int:
+        """Handler calls avoided by coalescing."""
+        return self.batched_jobs - self.batches
+
+    async def run(self, job: Callable[[], Awaitable[Any]]) -> Any:
+        """Run job() once every job submitted before it has finished, and return its result."""
+        return await self._submit(None, job, batched=False)
+
+    async def run_batched(self, item, handler: Callable[[list], Awaitable[list]]) -> Any:
+        """
+        Queue item for handler.
+
+        handler is awaited with a list of items and must return one result per item;
+        this call returns the result for item.
+        """
+        return await self._submit(item, handler, batched=True)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self),
+            "batched_jobs": self.batched_jobs,
+            "batches": self.batches,
+            "requests_saved": self.requests_saved,
+        }
+
+    async def _submit(self, item, handler, batched: bool) -> Any:
+        job = _Job(item, handler, batched, asyncio.get_running_loop().create_future())
+        self._jobs.append(job)
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+
+        return await job.future
+
+    async def _work(self):
+        try:
+            while self._jobs:
+                await self._run_next()
+        finally:
+            # the worker only stops with jobs left when it is cancelled; don't leave their
+            # callers waiting on a queue nothing is working through
+            self._fail(self._jobs, asyncio.CancelledError())
+            self._jobs.clear()
+
+    async def _run_next(self):
+        job = self._jobs[0]
+        if not job.batched:
+            self._jobs.popleft()
+            await self._resolve([job], job.handler(), batched=False)
+            return
+
+        # the job stays queued while waiting, so it is failed with the rest on cancellation
+        if self.coalesce_window > 0:
+            await asyncio.sleep(self.coalesce_window)
+
+        batch = [self._jobs.popleft()]
+        while (
+            self.coalesce_window > 0
+            and len(batch) < self.max_batch
+            and self._pending_batchable(job.handler)
+        ):
+            batch.append(self._jobs.popleft())
+
+        self.batched_jobs += len(batch)
+        self.batches += 1
+        if len(batch) > 1:
+            self._logger.info(
+                "coalesced %s jobs into one request (%s saved so far)",
+                len(batch),
+                self.requests_saved,
+            )
+
+        await self._resolve(batch, job.handler([queued.item for queued in batch]), batched=True)
+
+    def _pending_batchable(self, handler) -> bool:
+        return bool(self._jobs) and self._jobs[0].batched and self._jobs[0].handler == handler
+
+    @staticmethod
+    async def _resolve(jobs: list[_Job], awaitable: Awaitable, batched: bool):
+        """Await a handler and hand its result (or exception) to the jobs' callers."""
+        try:
+            result = await awaitable
+        except BaseException as exc:
+            GuildWorkQueue._fail(jobs, exc)
+            # cancellation (or an interpreter exit) still stops the worker
+            if not isinstance(exc, Exception):
+                raise
+            return
+
+        results = result if batched else [result]
+        for job, job_result in zip(jobs, results):
+            if not job.future.done():
+                job.future.set_result(job_result)
+
+        if len(results) < len(jobs):
+            GuildWorkQueue._fail(
+                jobs[len(results) :],
+                RuntimeError(f"handler returned {len(results)} results for {len(jobs)} jobs"),
+            )
+
+    @staticmethod
+    def _fail(jobs, exc: BaseException):
+        for job in jobs:
+            if job.future.done():
+                continue
+            # a future can't be handed a CancelledError, only cancelled
+            if isinstance(exc, asyncio.CancelledError):
+                job.future.cancel()
+            else:
+                job.future.set_exception(exc)
@@ -0,0 +1,284 @@
+"""Pools of api keys per provider, spreading requests by each key's remaining quota."""
+
+import math
+import re
+import threading
+import time
+from typing import Callable, Mapping
+
+import httpx
+
+from TalkTurbo.ClientRegistry import ClientRegistry
+
+# remaining quota headers, openai and groq first, then anthropic
+REMAINING_REQUESTS_HEADERS = (
+    "x-ratelimit-remaining-requests",
+    "anthropic-ratelimit-requests-remaining",
+)
+REMAINING_TOKENS_HEADERS = ("x-ratelimit-remaining-tokens", "anthropic-ratelimit-tokens-remaining")
+RESET_REQUESTS_HEADERS = ("x-ratelimit-reset-requests",)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> float | None:
+    """The delay a retry-after-ms or retry-after header asks for, in seconds, if any."""
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        # http dates are not supported, callers fall back to their own delay
+        return None
+
+    return None
+
+
+class ApiKey:
+    """One api key of a KeyPool, and what the provider last told us about its quota."""
+
+    __slots__ = (
+        "key",
+        "label",
+        "remaining_requests",
+        "remaining_tokens",
+        "cooldown_until",
+        "last_used",
+        "requests",
+        "throttles",
+    )
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        # safe to log
+        self.label = f"...{key[-4:]}" if key and len(key) > 8 else "key"
+        # None until a response reports it
+        self.remaining_requests: int = None
+        self.remaining_tokens: int = None
+        self.cooldown_until = 0.0
+        self.last_used = -math.inf
+        self.requests = 0
+        self.throttles = 0
+
+    def __repr__(self) -> str:
+        return f"ApiKey({self.label})"
+
+
+class KeyPool:
+    """
+    Spreads one provider's requests across several api keys.
+
+    Each request takes the key with the most remaining quota, as reported by the
+    provider's rate limit headers; keys without reports yet are tried first, and ties
+    go to the least recently used key.  A throttled (429) key cools down for its
+    Retry-After, or cooldown seconds, and a key that reports no remaining requests
+    cools down until its quota resets.  If every key is cooling down the one that
+    recovers first is used.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        keys: list[str],
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not keys:
+            raise ValueError(f"KeyPool for {provider} needs at least one key.")
+
+        self.provider = provider
+        self.keys = [ApiKey(key) for key in keys]
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self) -> ApiKey:
+        """The key to send the next request with."""
+        with self._lock:
+            now = self._clock()
+            available = [key for key in self.keys if key.cooldown_until <= now]
+            if available:
+                key = max(available, key=self._headroom)
+            else:
+                key = min(self.keys, key=lambda key: key.cooldown_until)
+
+            key.last_used = now
+            key.requests += 1
+            # until the response says otherwise, this request used up some quota
+            if key.remaining_requests:
+                key.remaining_requests -= 1
+
+        return key
+
+    def record_response(self, key: ApiKey, status_code: int, headers: Mapping[str, str]):
+        """Update key's quota from a response's status and rate limit headers."""
+        with self._lock:
+            now = self._clock()
+            remaining_requests = self._header_int(headers, REMAINING_REQUESTS_HEADERS)
+            remaining_tokens = self._header_int(headers, REMAINING_TOKENS_HEADERS)
+            if remaining_requests is not None:
+                key.remaining_requests = remaining_requests
+            if remaining_tokens is not None:
+                key.remaining_tokens = remaining_tokens
+
+            if status_code == 429:
+                key.throttles += 1
+                retry_after = retry_after_seconds(headers)
+                key.cooldown_until = now + (self.cooldown if retry_after is None else retry_after)
+            elif remaining_requests == 0:
+                reset = self._header_duration(headers, RESET_REQUESTS_HEADERS)
+                key.cooldown_until = now + (self.cooldown if reset is None else reset)
+
+    def stats(self) -> list[dict]:
+        now = self._clock()
+        return [
+            {
+                "key": key.label,
+                "requests": key.requests,
+                "throttles": key.throttles,
+                "remaining_requests": key.remaining_requests,
+                "remaining_tokens": key.remaining_tokens,
+                "cooling_down": max(key.cooldown_until - now, 0.0),
+            }
+            for key in self.keys
+        ]
+
+    @staticmethod
+    def _headroom(key: ApiKey) -> tuple:
+        def known(value):
+            return math.inf if value is None else value
+
+        return (known(key.remaining_requests), known(key.remaining_tokens), -key.last_used)
+
+    @staticmethod
+    def _header_int(headers: Mapping[str, str], names: tuple[str, ...]) -> int | None:
+        for name in names:
+            try:
+                return int(float(headers[name]))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        return None
+
+    @staticmethod
+    def _header_duration(headers: Mapping[str, str], names: tuple[str, ...]) -> float | None:
+        """Parse a duration header like "1s", "6m0s" or "20ms" into seconds."""
+        for name in names:
+            parts = _DURATION_PART.findall(headers.get(name) or "")
+            if parts:
+                return sum(float(value) * _DURATION_UNITS[unit] for value, unit in parts)
+
+        return None
+
+    @staticmethod
+    def parse_keys(keys: str) -> list[str]:
+        """Split a comma separated list of keys, as set in the environment."""
+        return [key.strip() for key in (keys or "").split(",") if key.strip()]
+
+
+class PooledClient:
+    """
+    Stands in for a provider SDK client, sending each request with a key from a KeyPool.
+
+    The key is picked when a resource is looked up (client.chat, client.moderations,
+    ...), so every call such as client.chat.completions.create(...) takes its own key.
+    Each key's client is shared through the ClientRegistry and reports its responses'
+    rate limit headers back to the pool.
+    """
+
+    def __init__(
+        self,
+        pool: KeyPool,
+        factory: Callable[..., object],
+        http_client_class: type[httpx.Client] | type[httpx.AsyncClient],
+    ) -> None:
+        self._pool = pool
+        self._factory = factory
+        self._http_client_class = http_client_class
+        self._is_async = issubclass(http_client_class, httpx.AsyncClient)
+
+    def __getattr__(self, name: str):
+        return getattr(self._client(self._pool.acquire()), name)
+
+    def _client(self, key: ApiKey):
+        pool = self._pool
+
+        if self._is_async:
+
+            async def on_response(response: httpx.Response):
+                pool.record_response(key, response.status_code, response.headers)
+
+        else:
+
+            def on_response(response: httpx.Response):
+                pool.record_response(key, response.status_code, response.headers)
+
+        def factory(api_key: str):
+            http_client = self._http_client_class(event_hooks={"response": [on_response]})
+            return self._factory(api_key=api_key, http_client=http_client)
+
+        name = f"{pool.provider}-async" if self._is_async else pool.provider
+        return ClientRegistry.get(name, key.key, factory)
+
+
+class KeyPoolRegistry:
+    """Process-wide key pools, one per provider and set of keys."""
+
+    _POOLS: dict[tuple[str, str], KeyPool] = {}
+    _LOCK = threading.Lock()
+
+    @staticmethod
+    def get(provider: str, api_keys: str, **kwargs) -> KeyPool:
+        """
+        The pool for provider's comma separated api_keys, created with kwargs (see
+        KeyPool) on first use.
+        """
+        pool_key = (provider, ClientRegistry.key_digest(api_keys))
+        with KeyPoolRegistry._LOCK:
+            pool = KeyPoolRegistry._POOLS.get(pool_key)
+            if pool is None:
+                pool = KeyPool(provider, KeyPool.parse_keys(api_keys) or [api_keys], **kwargs)
+                KeyPoolRegistry._POOLS[pool_key] = pool
+
+        return pool
+
+    @staticmethod
+    def client(
+        provider: str,
+        api_keys: str,
+        factory: Callable[..., object],
+        http_client_class: type[httpx.Client] | type[httpx.AsyncClient],
+    ):
+        """
+        An SDK client for provider's comma separated api_keys.
+
+        A single key gets a plain shared client from the ClientRegistry, several keys a
+        PooledClient that spreads requests between them.
+
+        args:
+            factory: The SDK client class, called with api_key and http_client.
+            http_client_class: The SDK's default httpx client class, sync or async to
+                               match factory.
+        """
+        keys = KeyPool.parse_keys(api_keys)
+        if len(keys) <= 1:
+            name = provider
+            if issubclass(http_client_class, httpx.AsyncClient):
+                name = f"{provider}-async"
+            return ClientRegistry.get(name, keys[0] if keys else api_keys, factory)
+
+        return PooledClient(KeyPoolRegistry.get(provider, api_keys), factory, http_client_class)
+
+    @staticmethod
+    def stats() -> dict[str, list[dict]]:
+        return {provider: pool.stats() for (provider, _), pool in KeyPoolRegistry._POOLS.items()}
+
+    @staticmethod
+    def clear():
+        with KeyPoolRegistry._LOCK:
+            KeyPoolRegistry._POOLS.clear()
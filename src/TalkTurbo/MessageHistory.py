@@ -0,0 +1,134 @@
+"""Turn-aware storage for the live messages of a ChatContext."""
+
+from collections import deque
+from itertools import islice
+from typing import Callable, Iterator
+
+from TalkTurbo.Messages import ContentMessage, FrozenDict, MessageRole
+
+
+class Turn:
+    """A user (or system) message and the assistant replies that follow it."""
+
+    __slots__ = ("messages", "completion_dicts", "token_count")
+
+    def __init__(self, message: ContentMessage, token_count: int) -> None:
+        self.messages = [message]
+        self.completion_dicts = [FrozenDict(message.to_completion_dict())]
+        self.token_count = token_count
+
+    def append(self, message: ContentMessage, token_count: int):
+        self.messages.append(message)
+        self.completion_dicts.append(FrozenDict(message.to_completion_dict()))
+        self.token_count += token_count
+
+    def copy(self) -> "Turn":
+        turn = Turn.__new__(Turn)
+        turn.messages = list(self.messages)
+        turn.completion_dicts = list(self.completion_dicts)
+        turn.token_count = self.token_count
+        return turn
+
+
+class MessageHistory:
+    """
+    Deque-backed message history that tracks user/assistant turn boundaries.
+
+    A turn starts with any non-assistant message; assistant messages are attached
+    to the turn they answer.  Eviction always removes a whole turn from the head,
+    so an assistant reply is never left in the history without its prompt.
+
+    Each message's completion dict is built once, when the message is appended.
+
+    appended_count and evicted_count count every message that ever entered or left
+    the history, so callers can tell exactly which messages changed since they last
+    looked (see ApiAdapter's conversion cache).
+    """
+
+    def __init__(self, messages: list[ContentMessage] = None, token_counts: list[int] = None):
+        self._turns: deque[Turn] = deque()
+        self._length = 0
+        self._token_count = 0
+        self.appended_count = 0
+        self.evicted_count = 0
+
+        messages = messages or []
+        token_counts = token_counts or [0] * len(messages)
+        for message, token_count in zip(messages, token_counts):
+            self.append(message, token_count)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[ContentMessage]:
+        for turn in self._turns:
+            yield from turn.messages
+
+    def __reversed__(self) -> Iterator[ContentMessage]:
+        for turn in reversed(self._turns):
+            yield from reversed(turn.messages)
+
+    def completion_dicts(self) -> Iterator[FrozenDict]:
+        """Iterate over the read-only completion dicts of every message, oldest first."""
+        for turn in self._turns:
+            yield from turn.completion_dicts
+
+    @property
+    def token_count(self) -> int:
+        """Total tokens of every message in the history."""
+        return self._token_count
+
+    @property
+    def turn_count(self) -> int:
+        return len(self._turns)
+
+    def append(self, message: ContentMessage, token_count: int):
+        """Append a message, starting a new turn unless it is an assistant reply."""
+        if message.role == MessageRole.ASSISTANT and self._turns:
+            self._turns[-1].append(message, token_count)
+        else:
+            self._turns.append(Turn(message, token_count))
+
+        self._length += 1
+        self._token_count += token_count
+        self.appended_count += 1
+
+    def copy(self) -> "MessageHistory":
+        """An independent copy that shares the (immutable) messages and their token counts."""
+        history = MessageHistory()
+        history._turns = deque(turn.copy() for turn in self._turns)
+        history._length = self._length
+        history._token_count = self._token_count
+        history.appended_count = self.appended_count
+        history.evicted_count = self.evicted_count
+        return history
+
+    def evict_oldest_turn(self) -> int:
+        """
+        Drop the oldest turn.
+
+        Returns:
+            The number of tokens freed.
+        """
+        turn = self._turns.popleft()
+        self._length -= len(turn.messages)
+        self._token_count -= turn.token_count
+        self.evicted_count += len(turn.messages)
+        return turn.token_count
+
+    def recount(self, token_count: Callable[[ContentMessage], int]):
+        """Recompute every turn's token total with a new counting function."""
+        self._token_count = 0
+        for turn in self._turns:
+            turn.token_count = sum(token_count(message) for message in turn.messages)
+            self._token_count += turn.token_count
+
+    def tail(self, count: int) -> list[ContentMessage]:
+        """Return the newest count messages, oldest first."""
+        return list(islice(reversed(self), count))[::-1]
+
+    def latest(self) -> ContentMessage:
+        """Return the most recent message.  Raises IndexError if the history is empty."""
+        if not self._turns:
+            raise IndexError("latest() called on an empty MessageHistory")
+        return self._turns[-1].messages[-1]
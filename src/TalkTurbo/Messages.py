@@ -1,15 +1,22 @@
 import json
-from datetime import datetime
+import time
 from enum import Enum
 
-import tiktoken
-
-from TalkTurbo import OPENAI_CLIENT
-from TalkTurbo.Moderations import CategoryFlags, CategoryScores
+from TalkTurbo import ASYNC_OPENAI_CLIENT, OPENAI_CLIENT
+from TalkTurbo.ModerationBatcher import MODERATION_BATCHER
+from TalkTurbo.ModerationCache import MODERATION_CACHE
+from TalkTurbo.Moderations import (
+    CategoryFlags,
+    CategoryScores,
+    ModerationResult,
+    ModerationThresholds,
+    PreModerationFilter,
+)
+from TalkTurbo.Tokenizers import TOKEN_COUNT_CACHE, TokenCounter, TokenizerRegistry
 
 # api ref: https://platform.openai.com/docs/api-reference/chat/create
 
-ENCODER = tiktoken.get_encoding("cl100k_base")
+MODERATION_MODEL = "text-moderation-latest"
 
 
 class MessageRole(Enum):
@@ -20,87 +27,192 @@ class MessageRole(Enum):
     FUNCTION = "function"
 
 
+class FrozenDict(dict):
+    """A dict that can not be modified after creation.  Used for shared completion dicts."""
+
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def copy(self) -> dict:
+        """Return a mutable copy."""
+        return dict(self)
+
+
 class Message:
+    # messages are slotted - long guild histories hold a lot of them
+    __slots__ = ("role", "created_on_utc")
+
     def __init__(self, role: MessageRole):
         self.role = role
-        self.created_on_utc = datetime.utcnow()
+        # creation time as integer seconds since the epoch (UTC)
+        self.created_on_utc = int(time.time())
 
     def __str__(self):
-        return str(vars(self))
+        return str(
+            {
+                slot: getattr(self, slot, None)
+                for cls in reversed(type(self).__mro__)
+                for slot in getattr(cls, "__slots__", ())
+            }
+        )
 
 
 class ContentMessage(Message):
+    __slots__ = ("content", "name", "_encoding_length_in_tokens", "_token_counter", "_moderation")
+
     def __init__(self, role: MessageRole, content: str, name: str = None):
         super().__init__(role)
         self.content = content
         self.name = name
-        self.encoding = ENCODER.encode(self.content)
-        self.encoding_length_in_tokens = len(self.encoding)
 
-        # moderation fields - these may be None if the
-        # message is unmoderated.
+        # token count - computed on first access of token_count / encoding_length_in_tokens
+        # for the counter it was computed with.
+        # only the length is kept; use the encoding property for the full token list.
+        self._encoding_length_in_tokens = None
+        self._token_counter: TokenCounter = None
+
+        # moderation result - None if the message is unmoderated.
         # set with moderate()
         # get with getters.
-        self._moderated = False
-        self._category_flags = None
-        self._category_scores = None
-        self._flagged = None
+        self._moderation: ModerationResult = None
+
+    def token_count(self, counter: TokenCounter = None) -> int:
+        """
+        Length of the content in tokens.  Tokenized on first access, then cached.
+
+        Args:
+            counter: The TokenCounter to count with.  Defaults to the registry default.
+                     Asking for a different counter than last time recounts.
+        """
+        counter = counter or TokenizerRegistry.get()
+        if self._token_counter is not counter:
+            self._encoding_length_in_tokens = TOKEN_COUNT_CACHE.count(counter, self.content)
+            self._token_counter = counter
+
+        return self._encoding_length_in_tokens
+
+    @property
+    def encoding_length_in_tokens(self) -> int:
+        """Length of the content in tokens with the default counter."""
+        return self.token_count()
+
+    @property
+    def encoding(self) -> list[int]:
+        """The full token encoding of the content.  Built on every access, never stored."""
+        return TokenizerRegistry.get().encode(self.content)
 
     def to_completion_dict(self) -> dict:
         return {"role": self.role.value, "content": self.content}
 
     def moderate(self):
-        """moderate this message"""
-        moderation_response = OPENAI_CLIENT.moderations.create(
-            input=self.content, model="text-moderation-latest"
-        )
+        """moderate this message, reusing a cached verdict for the same content if there is one"""
+        moderation_data = MODERATION_CACHE.get(self.content, MODERATION_MODEL)
+        if moderation_data is None:
+            moderation_response = OPENAI_CLIENT.moderations.create(
+                input=self.content, model=MODERATION_MODEL
+            )
+            moderation_data = json.loads(moderation_response.model_dump_json(by_alias=True))
+            MODERATION_CACHE.put(self.content, MODERATION_MODEL, moderation_data)
+
+        self._moderation = ModerationResult.from_moderation_response(moderation_data)
+
+    async def moderate_async(self):
+        """
+        moderate this message without blocking the event loop, see moderate.
+
+        Batched with other messages' moderations if the MODERATION_BATCHER is enabled.
+        """
+        moderation_data = await MODERATION_CACHE.get_async(self.content, MODERATION_MODEL)
+        if moderation_data is None:
+            if MODERATION_BATCHER.enabled:
+                moderation_data = await MODERATION_BATCHER.moderate(self.content, MODERATION_MODEL)
+            else:
+                moderation_response = await ASYNC_OPENAI_CLIENT.moderations.create(
+                    input=self.content, model=MODERATION_MODEL
+                )
+                moderation_data = json.loads(moderation_response.model_dump_json(by_alias=True))
+            await MODERATION_CACHE.put_async(self.content, MODERATION_MODEL, moderation_data)
+
+        self._moderation = ModerationResult.from_moderation_response(moderation_data)
+
+    def pre_moderate(self, pre_filter: PreModerationFilter, guild_id=None) -> bool:
+        """
+        Moderate this message locally, if pre_filter is confident about it.
 
-        moderation_data = json.loads(moderation_response.model_dump_json())
+        Returns:
+            True if this message is moderated (see flagged), False if it still needs the
+            moderation endpoint.
+        """
+        if self._moderation is None:
+            _, self._moderation = pre_filter.check(self.content, guild_id)
 
-        self._flagged = moderation_data["results"][0]["flagged"]
-        self._category_flags = CategoryFlags.from_moderation_response(moderation_data)
-        self._category_scores = CategoryScores.from_moderation_response(moderation_data)
-        self._moderated = True
+        return self._moderation is not None
 
-    def flagged(self) -> bool:
+    async def flagged_async(self, thresholds: ModerationThresholds = None) -> bool:
         """
+        Async version of flagged.
+
         Returns:
             True if this message has content flags, else False
         """
-        if not self._moderated:
+        if self._moderation is None:
+            await self.moderate_async()
+
+        return self._moderation.flagged_with(thresholds)
+
+    def flagged(self, thresholds: ModerationThresholds = None) -> bool:
+        """
+        Args:
+            thresholds: A guild's own per-category thresholds, if it set any.
+
+        Returns:
+            True if this message has content flags, or a score reaching thresholds, else False
+        """
+        if self._moderation is None:
             self.moderate()
 
-        return self._flagged
+        return self._moderation.flagged_with(thresholds)
 
     def get_category_flags(self) -> CategoryFlags:
         """
         Returns:
             A CategoryFlags instance for this message.
         """
-        if not self._moderated:
+        if self._moderation is None:
             self.moderate()
 
-        return self._category_flags
+        return self._moderation.category_flags
 
     def get_category_scores(self) -> CategoryScores:
         """
         Returns:
             A CategoryScores instance for this message.
         """
-        if not self._moderated:
+        if self._moderation is None:
             self.moderate()
 
-        return self._category_scores
+        return self._moderation.category_scores
 
-    def get_max_category(self) -> str:
+    def get_max_category(self) -> tuple[str, float]:
         """
         Returns:
-            The highest scoring category.
+            The highest scoring category and its score.
         """
-        return max(self.get_category_scores())
+        scores = self.get_category_scores()
+        return scores.max_category(), scores.max_score()
 
 
 class SystemMessage(ContentMessage):
+    __slots__ = ()
+
     def __init__(self, content: str, name: str = None):
         """
         args:
@@ -113,6 +225,8 @@ class SystemMessage(ContentMessage):
 
 
 class UserMessage(ContentMessage):
+    __slots__ = ()
+
     def __init__(self, content: str, name: str = None):
         """
         args:
@@ -125,6 +239,8 @@ class UserMessage(ContentMessage):
 
 
 class AssistantMessage(ContentMessage):
+    __slots__ = ()
+
     def __init__(self, content: str, name: str = None):
         """
         args:
@@ -137,11 +253,15 @@ class AssistantMessage(ContentMessage):
 
 
 class FunctionMessage(Message):
+    __slots__ = ()
+
     def __init__(self, role: MessageRole):
         raise NotImplementedError()
 
 
 class ToolMessage(Message):
+    __slots__ = ()
+
     def __init__(self, role: MessageRole):
         raise NotImplementedError()
 
@@ -152,7 +272,7 @@ class FlaggedContentError(Exception):
         super().__init__(f"message f{self.content_message} flagged for content")
 
     def __str__(self):
-        return f"ContentFlaggedError: flagged category: {self.content_message.get_max_category()}, content: {self.content_message.content}"
+        return f"ContentFlaggedError: flagged category: {self.content_message.get_max_category()[0]}, content: {self.content_message.content}"
 
 
 class MessageFactory:
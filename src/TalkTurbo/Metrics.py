@@ -0,0 +1,48 @@
+"""Lightweight in-process metrics: rolling latency percentiles and counters."""
+
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    """
+    Rolling window of latency samples in seconds.
+
+    Only the latest window samples are kept, so percentiles track recent behaviour.
+    Thread-safe - samples are recorded from worker threads and read from the event loop.
+    """
+
+    def __init__(self, window: int = 1024) -> None:
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, percent: float) -> float:
+        """The percent-th percentile (0-100) of the window, or 0.0 if there are no samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+
+        if not samples:
+            return 0.0
+
+        index = min(int(len(samples) * percent / 100), len(samples) - 1)
+        return samples[index]
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> float:
+        return self.percentile(95)
+
+    def stats(self) -> dict:
+        return {"count": self.count, "p50": self.p50, "p95": self.p95}
@@ -0,0 +1,135 @@
+"""Batches moderation requests from every guild into one request per window."""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable
+
+from TalkTurbo import ASYNC_OPENAI_CLIENT
+
+
+class ModerationBatcher:
+    """
+    Collects the contents waiting for moderation and sends them as a single request.
+
+    The moderation endpoint accepts a list of inputs.  The first content to arrive opens
+    a batch; the batch is sent once window seconds have passed or max_batch contents
+    have joined it, whichever comes first.  Each caller gets its own content's result,
+    shaped like a single-input moderation response.  Identical contents in a batch are
+    only sent once.  If the request fails every caller in the batch gets the error.
+
+    Batches are per moderation model.  Shared by every ContentMessage, see
+    MODERATION_BATCHER.
+    """
+
+    def __init__(
+        self,
+        window: float = 0.0,
+        max_batch: int = 32,
+        send: Callable[[list[str], str], Awaitable[list[dict]]] = None,
+    ) -> None:
+        """
+        args:
+            window: Seconds a batch stays open for more contents.  0 disables batching.
+            max_batch: The most contents sent in one request.
+            send: Moderates a list of contents with a model, returning one result per
+                  content.  Defaults to the OpenAI moderation endpoint.
+        """
+        self.window = window
+        self.max_batch = max_batch
+        self._send = send or ModerationBatcher.send_to_openai
+        self._pending: dict[str, list[tuple[str, asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: set[asyncio.Task] = set()
+        self._logger = logging.getLogger("Turbo")
+
+        # contents moderated and requests made for them
+        self.items = 0
+        self.batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_batch > 1
+
+    @property
+    def requests_saved(self) -> int:
+        """Moderation requests avoided by batching."""
+        return self.items - self.batches
+
+    def configure(self, window: float = None, max_batch: int = None):
+        """Change the window or max batch.  Arguments left as None are kept."""
+        if window is not None:
+            self.window = window
+        if max_batch is not None:
+            self.max_batch = max_batch
+
+    async def moderate(self, content: str, model: str) -> dict:
+        """The moderation response for content, sent with the rest of its batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(model, [])
+        batch.append((content, future))
+
+        if len(batch) >= self.max_batch:
+            self._flush(model)
+        elif len(batch) == 1:
+            self._timers[model] = loop.call_later(self.window, self._flush, model)
+
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "requests_saved": self.requests_saved,
+            "in_flight": len(self._in_flight),
+        }
+
+    def _flush(self, model: str):
+        timer = self._timers.pop(model, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(model, None)
+        if batch:
+            task = asyncio.ensure_future(self._send_batch(batch, model))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send_batch(self, batch: list[tuple[str, asyncio.Future]], model: str):
+        contents = list(dict.fromkeys(content for content, _ in batch))
+        self.items += len(batch)
+        self.batches += 1
+        if len(batch) > 1:
+            self._logger.debug("moderating %s messages in one request", len(batch))
+
+        try:
+            results = await self._send(contents, model)
+            if len(results) != len(contents):
+                raise ValueError(
+                    f"moderated {len(contents)} messages but got {len(results)} results"
+                )
+
+            by_content = dict(zip(contents, results))
+            for content, future in batch:
+                if not future.done():
+                    future.set_result({"results": [by_content[content]]})
+        except BaseException as exc:
+            # every caller still waiting gets the error, or the guilds awaiting them hang
+            for _, future in batch:
+                if future.done():
+                    continue
+                if isinstance(exc, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+
+    @staticmethod
+    async def send_to_openai(contents: list[str], model: str) -> list[dict]:
+        response = await ASYNC_OPENAI_CLIENT.moderations.create(input=contents, model=model)
+        return json.loads(response.model_dump_json(by_alias=True))["results"]
+
+
+MODERATION_BATCHER = ModerationBatcher()
@@ -0,0 +1,241 @@
+"""Cache of moderation verdicts, so identical content is only moderated once."""
+
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class ModerationCache:
+    """
+    Bounded LRU cache of moderation responses keyed by normalized content hash and
+    moderation model, with an optional SQLite tier that survives restarts.
+
+    Content is normalized (unicode NFKC, whitespace collapsed and stripped) before it
+    is hashed, so copy-pasted text with different spacing shares a verdict.  Case is
+    kept - it can change the scores.  Entries expire after ttl seconds in both tiers.
+
+    From the event loop use get_async and put_async, which read and write the disk
+    tier on a worker thread.  Shared by every ContentMessage, see MODERATION_CACHE.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4096,
+        ttl: float = 24 * 3600,
+        path: str = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            max_size: Maximum number of verdicts kept in memory.  0 disables the cache.
+            ttl: Seconds a verdict is reused for.
+            path: SQLite database for the disk tier, None to keep verdicts in memory only.
+            clock: Wall clock, so disk entries expire correctly across restarts.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._verdicts: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        # memory and disk tiers have their own locks, so the event loop never waits on a
+        # worker thread's disk i/o to look up the memory tier
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: sqlite3.Connection = None
+        if path:
+            self.open_disk_tier(path)
+
+    def __len__(self) -> int:
+        return len(self._verdicts)
+
+    def configure(self, max_size: int = None, ttl: float = None, path: str = None):
+        """Change the size, ttl or disk tier of the cache.  Arguments left as None are kept."""
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+                while len(self._verdicts) > max(self.max_size, 0):
+                    self._verdicts.popitem(last=False)
+            if ttl is not None:
+                self.ttl = ttl
+
+        if path:
+            self.open_disk_tier(path)
+
+    def open_disk_tier(self, path: str):
+        """Keep verdicts in the SQLite database at path too, dropping its expired ones."""
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS moderations"
+            " (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, response TEXT NOT NULL)"
+        )
+        db.execute("DELETE FROM moderations WHERE expires_at <= ?", (self._clock(),))
+        db.commit()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+            self._db = db
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @staticmethod
+    def normalize(content: str) -> str:
+        return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", content)).strip()
+
+    @staticmethod
+    def _key(content: str, model: str) -> str:
+        text = f"{model}\0{ModerationCache.normalize(content)}"
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, content: str, model: str) -> dict | None:
+        """The cached moderation response for content, or None."""
+        if self.max_size <= 0:
+            return None
+
+        key, now = ModerationCache._key(content, model), self._clock()
+        response = self._get_memory(key, now)
+        if response is None and self._db is not None:
+            response = self._get_disk(key, now)
+        if response is None:
+            self._miss()
+
+        return response
+
+    async def get_async(self, content: str, model: str) -> dict | None:
+        """get, with the disk tier read on a worker thread so the event loop isn't blocked."""
+        if self.max_size <= 0:
+            return None
+
+        key, now = ModerationCache._key(content, model), self._clock()
+        response = self._get_memory(key, now)
+        if response is None and self._db is not None:
+            response = await asyncio.to_thread(self._get_disk, key, now)
+        if response is None:
+            self._miss()
+
+        return response
+
+    def put(self, content: str, model: str, response: dict):
+        """Cache a moderation response for content, keeping only its verdict."""
+        if self.max_size <= 0:
+            return
+
+        key, expires_at, response = self._entry(content, model, response)
+        with self._lock:
+            self._remember(key, expires_at, response)
+        if self._db is not None:
+            self._put_disk(key, expires_at, response)
+
+    async def put_async(self, content: str, model: str, response: dict):
+        """put, with the disk tier written on a worker thread so the event loop isn't blocked."""
+        if self.max_size <= 0:
+            return
+
+        key, expires_at, response = self._entry(content, model, response)
+        with self._lock:
+            self._remember(key, expires_at, response)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_disk, key, expires_at, response)
+
+    def _entry(self, content: str, model: str, response: dict) -> tuple[str, float, dict]:
+        result = response["results"][0]
+        verdict = {
+            "results": [
+                {
+                    "flagged": result["flagged"],
+                    "categories": result["categories"],
+                    "category_scores": result["category_scores"],
+                }
+            ]
+        }
+        return ModerationCache._key(content, model), self._clock() + self.ttl, verdict
+
+    def _get_memory(self, key: str, now: float) -> dict | None:
+        with self._lock:
+            entry = self._verdicts.get(key)
+            if entry is None:
+                return None
+
+            expires_at, response = entry
+            if expires_at <= now:
+                del self._verdicts[key]
+                return None
+
+            self._verdicts.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def _get_disk(self, key: str, now: float) -> dict | None:
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT expires_at, response FROM moderations WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        response = json.loads(row[1])
+        with self._lock:
+            self._remember(key, row[0], response)
+            self.disk_hits += 1
+        return response
+
+    def _put_disk(self, key: str, expires_at: float, response: dict):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO moderations VALUES (?, ?, ?)",
+                    (key, expires_at, json.dumps(response)),
+                )
+                self._db.commit()
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _remember(self, key: str, expires_at: float, response: dict):
+        self._verdicts[key] = (expires_at, response)
+        self._verdicts.move_to_end(key)
+        while len(self._verdicts) > self.max_size:
+            self._verdicts.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._verdicts),
+            "max_size": self.max_size,
+        }
+
+    def clear(self):
+        """Drop every cached verdict (in memory and on disk) and reset the counters."""
+        with self._lock:
+            self._verdicts.clear()
+            self.hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM moderations")
+                self._db.commit()
+
+
+MODERATION_CACHE = ModerationCache()
@@ -1,102 +1,477 @@
+import math
+import operator
+import re
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from enum import Enum
+from itertools import compress
+from typing import Iterable
+
+# the moderation endpoint's categories, in the order every Categories array keeps them
+CATEGORIES = (
+    "sexual",
+    "hate",
+    "harassment",
+    "self-harm",
+    "sexual/minors",
+    "hate/threatening",
+    "violence/graphic",
+    "self-harm/intent",
+    "self-harm/instructions",
+    "harassment/threatening",
+    "violence",
+)
+CATEGORY_INDEX = {category: index for index, category in enumerate(CATEGORIES)}
+
+# python names of the categories, e.g. self_harm_intent for self-harm/intent
+CATEGORY_ATTRIBUTES = tuple(category.replace("-", "_").replace("/", "_") for category in CATEGORIES)
+ATTRIBUTE_INDEX = {attribute: index for index, attribute in enumerate(CATEGORY_ATTRIBUTES)}
+_ZEROS = (0,) * len(CATEGORIES)
+_IN_ORDER = operator.itemgetter(*CATEGORIES)
+
+
+def _category_attributes(cls):
+    """Give a Categories class a read-only attribute per category, e.g. scores.self_harm_intent."""
+
+    def getter(index: int):
+        return lambda self: self._cast(self.values[index])
+
+    for index, attribute in enumerate(CATEGORY_ATTRIBUTES):
+        setattr(cls, attribute, property(getter(index), doc=CATEGORIES[index]))
+    return cls
+
+
 class Categories:
+    """
+    One value per moderation category, kept in a compact array in CATEGORIES order.
+
+    Values can be read by attribute (scores.self_harm_intent), by category
+    (scores["self-harm/intent"]) or all at once from values, which is not changed
+    after construction.
+    """
+
+    __slots__ = ("values",)
+
+    # array typecode of the values, and the type they are read as
+    TYPECODE = "d"
+    _cast = float
+
+    def __init__(self, *values, **named) -> None:
+        """
+        args:
+            values: Values in CATEGORIES order.  Categories left out are 0.
+            named: Values by category attribute name, e.g. self_harm_intent=0.2.
+        """
+        if len(values) > len(CATEGORIES):
+            raise TypeError(f"{type(self).__name__} takes at most {len(CATEGORIES)} values")
+
+        values = array(self.TYPECODE, values)
+        values.extend(_ZEROS[len(values) :])
+        for attribute, value in named.items():
+            index = ATTRIBUTE_INDEX.get(attribute)
+            if index is None:
+                raise TypeError(f"unknown moderation category {attribute!r}")
+            values[index] = value
+        self._set(values)
+
+    @classmethod
+    def from_mapping(cls, values: dict):
+        """
+        Values keyed by the endpoint's category names, missing categories are 0.
+
+        The SDK's field names (self_harm_intent for self-harm/intent) are accepted too, as
+        model_dump_json() writes them unless by_alias is set.
+        """
+        try:
+            ordered = _IN_ORDER(values)
+        except KeyError:
+            ordered = [
+                values.get(category, values.get(attribute)) or 0
+                for category, attribute in zip(CATEGORIES, CATEGORY_ATTRIBUTES)
+            ]
+
+        categories = cls.__new__(cls)
+        categories._set(array(cls.TYPECODE, ordered))
+        return categories
+
+    def _set(self, values: array):
+        self.values = values
+
+    def __getitem__(self, category: str):
+        return self._cast(self.values[CATEGORY_INDEX[category]])
+
     def __iter__(self):
-        for attr, value in vars(self).items():
-            yield (attr, value)
+        for attribute, value in zip(CATEGORY_ATTRIBUTES, self.values):
+            yield (attribute, self._cast(value))
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and other.values == self.values
 
     def __str__(self):
-        out = ""
-        for cat, val in vars(self).items():
-            out += f"{cat}: {val}"
+        return ", ".join(f"{category}: {value}" for category, value in self)
 
 
+@_category_attributes
 class CategoryFlags(Categories):
-    def __init__(
-        self,
-        sexual: bool,
-        hate: bool,
-        harassment: bool,
-        self_harm: bool,
-        sexual_minors: bool,
-        hate_threatening: bool,
-        violence_graphic: bool,
-        self_harm_intent: bool,
-        self_harm_instructions: bool,
-        harassment_threatening: bool,
-        violence: bool,
-    ) -> None:
-        self.sexual = sexual
-        self.hate = hate
-        self.harassment = harassment
-        self.selfharm = self_harm
-        self.sexual_minor = sexual_minors
-        self.hate_threatening = hate_threatening
-        self.violence_graphic = violence_graphic
-        self.self_harm_inten = self_harm_intent
-        self.self_harm_instruction = self_harm_instructions
-        self.harassment_threatening = harassment_threatening
-        self.violence = violence
+    __slots__ = ()
+
+    TYPECODE = "b"
+    _cast = bool
 
     @classmethod
     def from_moderation_response(cls, response):
-        categories = response["results"][0]["categories"]
-        return cls(
-            sexual=categories.get("sexual", False),
-            hate=categories.get("hate", False),
-            harassment=categories.get("harassment", False),
-            self_harm=categories.get("self-harm", False),
-            sexual_minors=categories.get("sexual/minors", False),
-            hate_threatening=categories.get("hate/threatening", False),
-            violence_graphic=categories.get("violence/graphic", False),
-            self_harm_intent=categories.get("self-harm/intent", False),
-            self_harm_instructions=categories.get("self-harm/instructions", False),
-            harassment_threatening=categories.get("harassment/threatening", False),
-            violence=categories.get("violence", False),
-        )
+        return cls.from_mapping(response["results"][0]["categories"])
 
 
+@_category_attributes
 class CategoryScores(Categories):
+    __slots__ = ("_max_index",)
+
+    def _set(self, values: array):
+        self.values = values
+        self._max_index = -1
+
+    @property
+    def max_index(self) -> int:
+        """Index of the highest score, found on first use and then kept."""
+        if self._max_index < 0:
+            self._max_index = self.values.index(max(self.values))
+        return self._max_index
+
+    def max_category(self) -> str:
+        """The category with the highest score."""
+        return CATEGORIES[self.max_index]
+
+    def max_score(self) -> float:
+        return self.values[self.max_index]
+
+    @classmethod
+    def from_moderation_response(cls, response):
+        return cls.from_mapping(response["results"][0]["category_scores"])
+
+
+class ModerationThresholds:
+    """
+    Per-category scores at or above which a guild treats a message as flagged, on top
+    of the moderation endpoint's own flags.
+
+    Thresholds are kept in an array in CATEGORIES order, so checking scores against
+    them is one elementwise comparison of two arrays.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, thresholds: dict[str, float] = None) -> None:
+        """
+        args:
+            thresholds: Threshold per category name (e.g. "self-harm/intent").  Categories
+                        left out are only flagged by the endpoint.
+        """
+        self.values = array("d", [math.inf] * len(CATEGORIES))
+        for category, threshold in (thresholds or {}).items():
+            self.set(category, threshold)
+
+    def __bool__(self) -> bool:
+        return any(value != math.inf for value in self.values)
+
+    def set(self, category: str, threshold: float = None):
+        """Set category's threshold, or clear it if threshold is None."""
+        if category not in CATEGORY_INDEX:
+            raise ValueError(f"unknown moderation category {category!r}")
+        if threshold is not None and not 0.0 <= threshold <= 1.0:
+            raise ValueError(f"threshold for {category} must be between 0 and 1")
+
+        self.values[CATEGORY_INDEX[category]] = math.inf if threshold is None else threshold
+
+    def get(self, category: str) -> float | None:
+        threshold = self.values[CATEGORY_INDEX[category]]
+        return None if threshold == math.inf else threshold
+
+    def breached(self, scores: CategoryScores) -> bool:
+        """True if any score reaches its category's threshold."""
+        return any(map(operator.ge, scores.values, self.values))
+
+    def breached_categories(self, scores: CategoryScores) -> list[str]:
+        return list(compress(CATEGORIES, map(operator.ge, scores.values, self.values)))
+
+    def breached_batch(self, batch: Iterable[CategoryScores]) -> list[bool]:
+        """breached for every scores in batch."""
+        ge, thresholds = operator.ge, self.values
+        return [any(map(ge, scores.values, thresholds)) for scores in batch]
+
+
+class ModerationResult:
+    """The outcome of moderating a single message."""
+
+    __slots__ = ("flagged", "category_flags", "category_scores")
+
     def __init__(
-        self,
-        sexual: float,
-        hate: float,
-        harassment: float,
-        self_harm: float,
-        sexual_minors: float,
-        hate_threatening: float,
-        violence_graphic: float,
-        self_harm_intent: float,
-        self_harm_instructions: float,
-        harassment_threatening: float,
-        violence: float,
+        self, flagged: bool, category_flags: CategoryFlags, category_scores: CategoryScores
     ) -> None:
-        self.sexual = sexual
-        self.hate = hate
-        self.harassment = harassment
-        self.selfharm = self_harm
-        self.sexual_minor = sexual_minors
-        self.hate_threatening = hate_threatening
-        self.violence_graphic = violence_graphic
-        self.self_harm_intent = self_harm_intent
-        self.self_harm_instruction = self_harm_instructions
-        self.harassment_threatening = harassment_threatening
-        self.violence = violence
+        self.flagged = flagged
+        self.category_flags = category_flags
+        self.category_scores = category_scores
 
-    def max_category(self) -> str:
-        return max(vars(self), key=vars(self).get)
+    def flagged_with(self, thresholds: ModerationThresholds = None) -> bool:
+        """Flagged by the endpoint, or by a score reaching one of thresholds."""
+        return self.flagged or (
+            thresholds is not None and thresholds.breached(self.category_scores)
+        )
 
     @classmethod
     def from_moderation_response(cls, response):
-        scores = response["results"][0]["category_scores"]
         return cls(
-            sexual=scores.get("sexual", 0.0),
-            hate=scores.get("hate", 0.0),
-            harassment=scores.get("harassment", 0.0),
-            self_harm=scores.get("self-harm", 0.0),
-            sexual_minors=scores.get("sexual/minors", 0.0),
-            hate_threatening=scores.get("hate/threatening", 0.0),
-            violence_graphic=scores.get("violence/graphic", 0.0),
-            self_harm_intent=scores.get("self-harm/intent", 0.0),
-            self_harm_instructions=scores.get("self-harm/instructions", 0.0),
-            harassment_threatening=scores.get("harassment/threatening", 0.0),
-            violence=scores.get("violence", 0.0),
+            flagged=response["results"][0]["flagged"],
+            category_flags=CategoryFlags.from_moderation_response(response),
+            category_scores=CategoryScores.from_moderation_response(response),
         )
+
+
+class PreModerationDecision(Enum):
+    ALLOW = "allow"
+    REJECT = "reject"
+    ESCALATE = "escalate"
+
+
+# fenced code blocks and discord user/role/channel mentions
+# (the block's content is captured without its language tag)
+_CODE_BLOCK = re.compile(r"```(?:[\w+#-]*\n)?(.*?)```", re.DOTALL)
+_MENTION = re.compile(r"<[@#][!&]?\d+>")
+_WHITESPACE = re.compile(r"\s+")
+
+# what code is made of, to tell a fenced code block from fenced prose
+_CODE_SYMBOLS = frozenset("(){}[]<>=;:.,+-*/%&|^!~\"'`#$@\\")
+_CODE_WORD = re.compile(r"[a-z_][a-z0-9_]*")
+_CODE_KEYWORDS = frozenset(
+    (
+        "def class return if elif else for while in is not and or import from as with try"
+        " except finally raise lambda yield async await pass break continue del global"
+        " none true false self print len range dict list set str int float bool"
+        " function const let var new this null undefined typeof instanceof export default"
+        " public private protected static void char string fn mut impl struct enum match use"
+        " pub mod trait func package go defer select where insert update delete create table"
+        " echo sudo cd ls rm mkdir cat grep git npm pip"
+    ).split()
+)
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """A regex alternation matching any of terms, with their common prefixes factored out."""
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node: dict) -> str:
+        branches = [re.escape(char) + pattern(child) for char, child in node.items() if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if "" in node else "")
+
+    return pattern(trie)
+
+
+class PreModerationFilter:
+    """
+    A cheap local first stage of moderation, so only ambiguous messages are sent to the
+    moderation endpoint.
+
+    Messages containing a blocked term, global or the guild's own, are rejected.  Empty
+    messages, messages that are only code blocks (that read as code, not fenced prose)
+    and mentions, and short messages made only of safe words (greetings, thanks, ...) are allowed.  Everything else is
+    escalated to the endpoint.
+
+    Blocked terms are matched as whole words, ignoring case and spacing, with one compiled regex per
+    guild.  Each term is reported under a moderation category.  Decisions are counted
+    per path, with the time spent deciding.
+    """
+
+    DEFAULT_CATEGORY = "harassment"
+
+    DEFAULT_SAFE_WORDS = frozenset(
+        (
+            "hi hello hey heya hiya howdy yo sup hai "
+            "thanks thank you ty thx tysm np "
+            "ok okay k cool nice neat great lol lmao haha gg "
+            "gm gn good morning afternoon evening night bye cya later see "
+            "yes yeah yep no nope please welcome turbo there everyone all"
+        ).split()
+    )
+
+    def __init__(
+        self,
+        blocked_terms: Iterable[str] = (),
+        category: str = DEFAULT_CATEGORY,
+        safe_words: Iterable[str] = DEFAULT_SAFE_WORDS,
+        max_safe_length: int = 40,
+        allow_code: bool = True,
+    ) -> None:
+        """
+        args:
+            blocked_terms: Terms rejected in every guild.
+            category: The moderation category (one of CATEGORIES) blocked_terms are
+                      reported under.
+            safe_words: Words a short message may be made of to be allowed.
+            max_safe_length: The longest message (in characters) allowed for its words.
+            allow_code: Allow messages that are only fenced blocks of code.
+        """
+        self.max_safe_length = max_safe_length
+        self.allow_code = allow_code
+        self.decisions: Counter[PreModerationDecision] = Counter()
+        self.seconds = 0.0
+
+        # guild id (None for every guild) -> normalized term -> category
+        self._terms: dict[object, dict[str, str]] = {None: {}}
+        # guild id -> compiled blocked terms and the term -> category map it matches
+        self._matchers: dict[object, tuple[re.Pattern, dict[str, str]]] = {}
+
+        words = sorted((self._normalize(word) for word in safe_words), key=len, reverse=True)
+        word = "(?:" + "|".join(re.escape(word) for word in words) + ")"
+        self._safe = re.compile(rf"[\s,.!?']*{word}(?:[\s,.!?']+{word})*[\s,.!?']*")
+
+        self.add_terms(blocked_terms, category=category)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text).casefold())
+
+    def add_terms(self, terms: Iterable[str], guild_id=None, category: str = DEFAULT_CATEGORY):
+        """Block terms in guild_id, or in every guild if it's None."""
+        if category not in CATEGORY_INDEX:
+            raise ValueError(f"unknown moderation category {category!r}")
+
+        guild_terms = self._terms.setdefault(guild_id, {})
+        for term in terms:
+            term = self._normalize(term).strip()
+            if term:
+                guild_terms[term] = category
+        self._invalidate(guild_id)
+
+    def remove_terms(self, terms: Iterable[str], guild_id=None):
+        guild_terms = self._terms.get(guild_id, {})
+        for term in terms:
+            guild_terms.pop(self._normalize(term).strip(), None)
+        self._invalidate(guild_id)
+
+    def terms(self, guild_id=None) -> list[str]:
+        """The terms blocked in guild_id on top of the global ones (or the global ones)."""
+        return sorted(self._terms.get(guild_id, {}))
+
+    def check(
+        self, content: str, guild_id=None
+    ) -> tuple[PreModerationDecision, "ModerationResult"]:
+        """
+        Decide on content locally, if possible.
+
+        Returns:
+            The decision, and for ALLOW and REJECT the moderation result to use in place
+            of the endpoint's.  None for ESCALATE.
+        """
+        start = time.perf_counter()
+        unspaced = unicodedata.normalize("NFKC", content).casefold()
+        text = _WHITESPACE.sub(" ", unspaced)
+
+        # blocked terms are looked for everywhere, fenced code included
+        pattern, categories = self._matcher(guild_id)
+        match = pattern.search(text) if categories else None
+        if match:
+            decision = PreModerationDecision.REJECT
+            category = categories[match.group(0)]
+            result = ModerationResult.from_moderation_response(
+                {
+                    "results": [
+                        {
+                            "flagged": True,
+                            "categories": {category: True},
+                            "category_scores": {category: 1.0},
+                        }
+                    ]
+                }
+            )
+        else:
+            # code blocks are only set aside if every one of them reads as code
+            prose = text
+            if self.allow_code and all(map(self._looks_like_code, _CODE_BLOCK.findall(unspaced))):
+                prose = _WHITESPACE.sub(" ", _CODE_BLOCK.sub(" ", unspaced))
+            prose = _MENTION.sub(" ", prose).strip()
+            if not prose or (len(prose) <= self.max_safe_length and self._safe.fullmatch(prose)):
+                decision = PreModerationDecision.ALLOW
+                result = ModerationResult.from_moderation_response(
+                    {"results": [{"flagged": False, "categories": {}, "category_scores": {}}]}
+                )
+            else:
+                decision = PreModerationDecision.ESCALATE
+                result = None
+
+        self.seconds += time.perf_counter() - start
+        self.decisions[decision] += 1
+        return decision, result
+
+    @staticmethod
+    def _looks_like_code(block: str) -> bool:
+        """
+        True if a fenced block reads as code rather than prose: enough symbols, and most
+        of its words keywords, identifiers (snake_case, digits, calls, attributes) or
+        one or two letters.  Prose in strings and comments makes it fail, so it's sent
+        to the moderation endpoint.
+        """
+        block = block.strip()
+        if not block:
+            return True
+        if sum(char in _CODE_SYMBOLS for char in block) < 0.05 * len(block):
+            return False
+
+        words = list(_CODE_WORD.finditer(block))
+        code_words = 0
+        for match in words:
+            word, before, after = (
+                match.group(0),
+                block[match.start() - 1 : match.start()],
+                block[match.end() : match.end() + 1],
+            )
+            if (
+                len(word) <= 2
+                or word in _CODE_KEYWORDS
+                or "_" in word
+                or any(char.isdigit() for char in word)
+                or after in ("(", ".")
+                or before == "."
+            ):
+                code_words += 1
+
+        return code_words >= 0.6 * len(words)
+
+    def stats(self) -> dict:
+        checked = sum(self.decisions.values())
+        return {
+            **{decision.value: self.decisions[decision] for decision in PreModerationDecision},
+            "messages_per_second": checked / self.seconds if self.seconds else 0.0,
+        }
+
+    @staticmethod
+    def load_terms(path: str) -> list[str]:
+        """Read blocked terms from a file, one per line.  Blank lines and # comments are skipped."""
+        with open(path, encoding="utf-8") as file:
+            lines = (line.split("#", 1)[0].strip() for line in file)
+            return [line for line in lines if line]
+
+    def _invalidate(self, guild_id):
+        if guild_id is None:
+            self._matchers.clear()
+        else:
+            self._matchers.pop(guild_id, None)
+
+    def _matcher(self, guild_id) -> tuple[re.Pattern, dict[str, str]]:
+        matcher = self._matchers.get(guild_id)
+        if matcher is None:
+            categories = {**self._terms[None], **self._terms.get(guild_id, {})}
+            pattern = re.compile(rf"(?<!\w)(?:{_trie_pattern(categories)})(?!\w)")
+            matcher = self._matchers[guild_id] = (pattern, categories)
+
+        return matcher
@@ -1,13 +1,18 @@
+import asyncio
 import base64
 import logging
 import os
+import threading
 import time
 from typing import Dict, List, Tuple
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 
 from TalkTurbo import OPENAI_CLIENT
 from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.KeyPool import ApiKey, KeyPool
 from TalkTurbo.Messages import (
     AssistantMessage,
     ContentMessage,
@@ -26,11 +31,31 @@ class OpenAIModelAssistant:
         "large": "1024x1024",
     }
 
+    API_URL = "https://api.openai.com/v1"
+
+    # (connect, read) seconds for raw REST calls
+    DEFAULT_TIMEOUT = (5.0, 60.0)
+
+    # keep-alive connections kept per host
+    POOL_SIZE = 10
+
+    # shared by every assistant, see session()
+    _SESSION: requests.Session = None
+    _SESSION_LOCK = threading.Lock()
+
     def __init__(
         self,
         temperature: float = 0.7,
         min_dalle_timeout_in_seconds: float = 10.0,
+        connect_timeout: float = DEFAULT_TIMEOUT[0],
+        read_timeout: float = DEFAULT_TIMEOUT[1],
+        key_pool: KeyPool = None,
     ) -> None:
+        """
+        args:
+            key_pool: Keys to spread REST calls across.  When set, the openai_secret_key
+                      arguments are ignored.
+        """
         if temperature > 2.0 or temperature < 0:
             print(
                 f"invalid temperature ({temperature}, must be in [0, 2.0]). Setting to default (0.7)"
@@ -39,6 +64,44 @@ class OpenAIModelAssistant:
         self.temperature = temperature
         self.min_dalle_timeout_in_seconds = min_dalle_timeout_in_seconds
         self._last_dalle_gen_time = time.time()
+        self.timeout = (connect_timeout, read_timeout)
+        self.key_pool = key_pool
+
+        # created on first use, bound to the event loop that uses it
+        self._async_client: httpx.AsyncClient = None
+
+    @staticmethod
+    def session() -> requests.Session:
+        """The process-wide keep-alive session for raw REST calls."""
+        with OpenAIModelAssistant._SESSION_LOCK:
+            if OpenAIModelAssistant._SESSION is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=OpenAIModelAssistant.POOL_SIZE,
+                    pool_maxsize=OpenAIModelAssistant.POOL_SIZE,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                OpenAIModelAssistant._SESSION = session
+
+        return OpenAIModelAssistant._SESSION
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """This assistant's keep-alive client for async REST calls."""
+        if self._async_client is None:
+            connect_timeout, read_timeout = self.timeout
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_keepalive_connections=self.POOL_SIZE),
+            )
+
+        return self._async_client
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
 
     def get_chat_completion(self, message: ContentMessage, turbo_guild: TurboGuild) -> str:
         """
@@ -55,7 +118,7 @@ class OpenAIModelAssistant:
             return (
                 "_(turbo's host here: you've breached the content moderation threshold."
                 " Your message has not been passed to the model."
-                f" Breached category: {message.get_max_category()}."
+                f" Breached category: {message.get_max_category()[0]}."
                 "  Keep it safe and friendly please!)_"
             )
 
@@ -100,10 +163,10 @@ class OpenAIModelAssistant:
         if stop is None:
             stop = ["\n"]
 
-        headers = {"authorization": f"Bearer {openai_secret_key}"}
+        key, headers = self._authorize(self.key_pool, openai_secret_key)
         payload = {
             "model": "gpt-3.5-turbo",
-            "messages": context.get_messages_as_list(),
+            "messages": list(context.get_messages_as_list()),
             "temperature": temperature,
             "max_tokens": max_tokens,
             "n": 1,  # number of completions to generatei
@@ -111,11 +174,13 @@ class OpenAIModelAssistant:
         if hashed_user_identifier:
             payload["user"] = hashed_user_identifier
 
-        response = requests.post(
-            url="https://api.openai.com/v1/chat/completions",
+        response = self.session().post(
+            url=f"{self.API_URL}/chat/completions",
             headers=headers,
             json=payload,
+            timeout=self.timeout,
         )
+        self._record_response(self.key_pool, key, response)
 
         # print(f"response = {response.json()}")
 
@@ -134,8 +199,68 @@ class OpenAIModelAssistant:
         generate an image with dalle.
         return a path to a generated image or None if that fails
         """
-        headers = {"authorization": f"Bearer {openai_secret_key}"}
-        url = "https://api.openai.com/v1/images/generations"
+        key, headers = self._authorize(self.key_pool, openai_secret_key)
+        payload = self._dalle_payload(query, resolution, hashed_user_identifier, use_dalle_3)
+
+        try:
+            response = self.session().post(
+                url=f"{self.API_URL}/images/generations",
+                json=payload,
+                headers=headers,
+                timeout=self.timeout,
+            )
+            self._record_response(self.key_pool, key, response)
+            image_url = response.json()["data"][0]["url"]
+            image_data = self.session().get(image_url, timeout=self.timeout)
+        except requests.RequestException as exc:
+            logger.warning("dalle request failed: %s", exc)
+            return None
+        except (ValueError, KeyError, IndexError, TypeError) as exc:
+            # a body that is not json, or json without an image url
+            logger.warning("dalle returned an unexpected response: %r", exc)
+            return None
+
+        return self._save_image(image_data.content, path)
+
+    async def query_dalle_async(
+        self,
+        query: str,
+        path: str = "./dalle_tmp/",
+        resolution: str = "large",
+        hashed_user_identifier: str = None,
+        openai_secret_key: str = "",
+        use_dalle_3: bool = False,
+    ) -> str:
+        """
+        Async version of query_dalle, backed by httpx.
+
+        return a path to a generated image or None if that fails
+        """
+        key, headers = self._authorize(self.key_pool, openai_secret_key)
+        payload = self._dalle_payload(query, resolution, hashed_user_identifier, use_dalle_3)
+
+        try:
+            response = await self.async_client.post(
+                f"{self.API_URL}/images/generations", json=payload, headers=headers
+            )
+            self._record_response(self.key_pool, key, response)
+            image_url = response.json()["data"][0]["url"]
+            image_data = await self.async_client.get(image_url)
+        except httpx.HTTPError as exc:
+            logger.warning("dalle request failed: %s", exc)
+            return None
+        except (ValueError, KeyError, IndexError, TypeError) as exc:
+            # a body that is not json, or json without an image url
+            logger.warning("dalle returned an unexpected response: %r", exc)
+            return None
+
+        # keep disk writes off the event loop too
+        return await asyncio.to_thread(self._save_image, image_data.content, path)
+
+    @staticmethod
+    def _dalle_payload(
+        query: str, resolution: str, hashed_user_identifier: str, use_dalle_3: bool
+    ) -> dict:
         payload = {
             "prompt": query,
             "size": OpenAIModelAssistant.DALLE_RESOLUTION[resolution],
@@ -148,14 +273,9 @@ class OpenAIModelAssistant:
         if hashed_user_identifier:
             payload["user"] = hashed_user_identifier
 
-        response = requests.post(url=url, json=payload, headers=headers)
-        try:
-            image_url = response.json()["data"][0]["url"]
-        except KeyError:
-            return None
-
-        image_data = requests.get(image_url)
+        return payload
 
+    def _save_image(self, content: bytes, path: str) -> str:
         # update the path
         path = path + str(time.time()) + ".png"
 
@@ -163,7 +283,7 @@ class OpenAIModelAssistant:
         os.makedirs(os.path.dirname(path), exist_ok=True)
 
         with open(path, "wb") as f:
-            f.write(image_data.content)
+            f.write(content)
             f.close()
 
         # hit the clock
@@ -191,11 +311,19 @@ class OpenAIModelAssistant:
         return max(time.time() - self._last_dalle_gen_time, 0.0)
 
     @staticmethod
-    def get_moderation_score(message: str, openai_secret_key: str) -> Tuple[str, float]:
-        url = "https://api.openai.com/v1/moderations"
-        headers = {"authorization": f"Bearer {openai_secret_key}"}
+    def get_moderation_score(
+        message: str,
+        openai_secret_key: str,
+        timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+        key_pool: KeyPool = None,
+    ) -> Tuple[str, float]:
+        url = f"{OpenAIModelAssistant.API_URL}/moderations"
+        key, headers = OpenAIModelAssistant._authorize(key_pool, openai_secret_key)
         payload = {"input": message, "model": "text-moderation-latest"}
-        response = requests.post(url=url, json=payload, headers=headers)
+        response = OpenAIModelAssistant.session().post(
+            url=url, json=payload, headers=headers, timeout=timeout
+        )
+        OpenAIModelAssistant._record_response(key_pool, key, response)
 
         try:
             category, category_score = OpenAIModelAssistant._category_score(response.json())
@@ -204,6 +332,17 @@ class OpenAIModelAssistant:
 
         return category, category_score
 
+    @staticmethod
+    def _authorize(key_pool: KeyPool, openai_secret_key: str) -> Tuple[ApiKey, dict]:
+        """The pooled key to use (None without a pool) and the request's auth headers."""
+        key = key_pool.acquire() if key_pool else None
+        return key, {"authorization": f"Bearer {key.key if key else openai_secret_key}"}
+
+    @staticmethod
+    def _record_response(key_pool: KeyPool, key: ApiKey, response):
+        if key_pool:
+            key_pool.record_response(key, response.status_code, response.headers)
+
     @staticmethod
     def _category_score(moderation_response: Dict[str, any]) -> Tuple[str, float]:
         """
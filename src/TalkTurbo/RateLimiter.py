@@ -0,0 +1,269 @@
+"""
+Provider and model aware rate limiting for completion requests.
+
+Requests wait in priority order for token buckets that refill at the provider's
+requests/min and tokens/min quotas, so a burst is spread out over the quota window
+instead of being answered with 429s.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from enum import IntEnum
+from typing import Callable
+
+from TalkTurbo.Metrics import LatencyStats
+
+
+class Priority(IntEnum):
+    """Scheduling classes, most urgent first."""
+
+    # slash command interactions - discord expects an answer within seconds
+    INTERACTION = 0
+    # bot mentions
+    MENTION = 1
+    BACKGROUND = 2
+
+
+class TokenBucket:
+    """
+    A bucket of capacity units that refills continuously at rate_per_minute.
+
+    The bucket starts full, so a quiet provider can take a burst of up to capacity.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: float = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity or rate_per_minute
+        self._clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+
+    @property
+    def level(self) -> float:
+        self._refill()
+        return self._level
+
+    def delay(self, amount: float) -> float:
+        """Seconds until amount can be taken.  Requests larger than capacity wait for a full bucket."""
+        missing = min(amount, self.capacity) - self.level
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount: float):
+        self._refill()
+        self._level -= min(amount, self.capacity)
+
+    def _refill(self):
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimit:
+    """A requests/min and tokens/min quota.  None (or 0) leaves that dimension unlimited."""
+
+    __slots__ = ("requests_per_minute", "tokens_per_minute")
+
+    def __init__(self, requests_per_minute: int = None, tokens_per_minute: int = None) -> None:
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RateLimit) and (
+            self.requests_per_minute,
+            self.tokens_per_minute,
+        ) == (other.requests_per_minute, other.tokens_per_minute)
+
+    def __repr__(self) -> str:
+        return f"RateLimit({self.requests_per_minute!r}, {self.tokens_per_minute!r})"
+
+
+class _Limiter:
+    """The request and token buckets for one provider or one provider/model."""
+
+    __slots__ = ("requests", "tokens")
+
+    def __init__(self, limit: RateLimit, clock) -> None:
+        self.requests = limit.requests_per_minute and TokenBucket(
+            limit.requests_per_minute, clock=clock
+        )
+        self.tokens = limit.tokens_per_minute and TokenBucket(limit.tokens_per_minute, clock=clock)
+
+    def delay(self, tokens: int) -> float:
+        return max(
+            self.requests.delay(1) if self.requests else 0.0,
+            self.tokens.delay(tokens) if self.tokens else 0.0,
+        )
+
+    def take(self, tokens: int):
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(tokens)
+
+
+class _Waiter:
+    __slots__ = ("provider", "model", "limiters", "tokens", "future", "enqueued")
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        limiters: list[_Limiter],
+        tokens: int,
+        future: asyncio.Future,
+        enqueued: float,
+    ) -> None:
+        self.provider = provider
+        self.model = model
+        self.limiters = limiters
+        self.tokens = tokens
+        self.future = future
+        self.enqueued = enqueued
+
+    def delay(self) -> float:
+        return max(limiter.delay(self.tokens) for limiter in self.limiters)
+
+
+class RateLimitScheduler:
+    """
+    Admits completion requests in priority order within per-provider and per-model quotas.
+
+    Limits are keyed by provider name ("openai") or provider and model
+    ("openai/gpt-4o"); a request must fit within both.  Requests for a provider/model
+    without any limits are admitted immediately.
+
+    Requests queue per provider when the provider has a limit of its own, so priority
+    holds across all the models drawing on the provider's buckets.  Otherwise each
+    provider/model has its own queue, so a throttled model never holds up another.
+    Within a queue requests are admitted by priority, then deadline, then arrival
+    order.  Time spent queued is recorded per priority in wait_times.
+    """
+
+    def __init__(
+        self, limits: dict[str, RateLimit] = None, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock = clock
+        self._limiters = {key: _Limiter(limit, clock) for key, limit in (limits or {}).items()}
+        # keyed by (provider, None) for providers with a limit, else (provider, model)
+        self._queues: dict[tuple[str, str], list] = {}
+        self._dispatchers: dict[tuple[str, str], asyncio.Task] = {}
+        self._wakeups: dict[tuple[str, str], asyncio.Event] = {}
+        self._sequence = itertools.count()
+        self.wait_times = {priority: LatencyStats() for priority in Priority}
+
+    async def acquire(
+        self,
+        provider: str,
+        model: str,
+        tokens: int,
+        priority: Priority = Priority.MENTION,
+        deadline: float = None,
+    ):
+        """
+        Wait until a request costing tokens may be sent to provider's model.
+
+        args:
+            deadline: When the request should be sent by, on the scheduler's clock.
+                      Orders requests within a priority class.
+        """
+        limiters = self._limiters_for(provider, model)
+        if not limiters:
+            return
+
+        # requests sharing the provider's buckets must share a queue to be admitted in order
+        key = (provider, None) if provider in self._limiters else (provider, model)
+        waiter = _Waiter(
+            provider,
+            model,
+            limiters,
+            tokens,
+            asyncio.get_running_loop().create_future(),
+            self._clock(),
+        )
+        order = (priority, math.inf if deadline is None else deadline, next(self._sequence))
+        heapq.heappush(self._queues.setdefault(key, []), (order, waiter))
+
+        dispatcher = self._dispatchers.get(key)
+        if dispatcher is None or dispatcher.done():
+            self._wakeups[key] = asyncio.Event()
+            self._dispatchers[key] = asyncio.create_task(self._dispatch(key))
+        else:
+            # a more urgent request may now be at the head of the queue
+            self._wakeups[key].set()
+
+        await waiter.future
+        self.wait_times[priority].record(self._clock() - waiter.enqueued)
+
+    def queue_depth(self, provider: str = None, model: str = None) -> int:
+        """Requests waiting, for one provider/model or (by default) in total."""
+        return sum(
+            1
+            for queue in self._queues.values()
+            for _, waiter in queue
+            if provider in (None, waiter.provider) and model in (None, waiter.model)
+        )
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth(),
+            "wait_time": {
+                priority.name.lower(): stats.stats() for priority, stats in self.wait_times.items()
+            },
+        }
+
+    def _limiters_for(self, provider: str, model: str) -> list[_Limiter]:
+        return [
+            self._limiters[key]
+            for key in (provider, f"{provider}/{model}")
+            if key in self._limiters
+        ]
+
+    async def _dispatch(self, key: tuple[str, str]):
+        queue = self._queues[key]
+        wakeup = self._wakeups[key]
+        while queue:
+            _, waiter = queue[0]
+            if waiter.future.done():
+                heapq.heappop(queue)
+                continue
+
+            delay = waiter.delay()
+            if delay > 0:
+                # sleep until the head request fits, or a new request arrives
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(queue)
+            for limiter in waiter.limiters:
+                limiter.take(waiter.tokens)
+            waiter.future.set_result(None)
+
+    @staticmethod
+    def parse_limits(spec: str) -> dict[str, RateLimit]:
+        """
+        Parse a "key=rpm:tpm,..." string, as given on the command line.
+
+        key is a provider or provider/model; either rpm or tpm may be left empty or 0.
+        e.g. "openai=500:200000,openai/gpt-4o=:30000"
+        """
+        limits = {}
+        for entry in filter(None, (part.strip() for part in (spec or "").split(","))):
+            key, _, quota = entry.partition("=")
+            requests, _, tokens = quota.partition(":")
+            if not key or not all(value.isdigit() for value in (requests, tokens) if value):
+                raise ValueError(f"invalid rate limit {entry!r}, expected key=rpm:tpm")
+            limits[key.strip()] = RateLimit(int(requests or 0), int(tokens or 0))
+
+        return limits
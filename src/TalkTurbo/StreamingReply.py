@@ -0,0 +1,121 @@
+"""Chat replies that fit Discord's message length limit."""
+
+import time
+from typing import Awaitable, Callable
+
+# discord's cap on a message's length, in characters
+MAX_MESSAGE_LENGTH = 2000
+
+
+def split_message(text: str, max_length: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """
+    Split text into messages of at most max_length characters.
+
+    Splits fall between lines where possible; a single line longer than max_length is
+    cut into max_length pieces.
+    """
+    pages = []
+    page = None
+    for line in text.split("\n"):
+        if len(line) > max_length:
+            if page is not None:
+                pages.append(page)
+                page = None
+            while len(line) > max_length:
+                pages.append(line[:max_length])
+                line = line[max_length:]
+            if not line:
+                continue
+
+        if page is None:
+            page = line
+        elif len(page) + 1 + len(line) <= max_length:
+            page += "\n" + line
+        else:
+            pages.append(page)
+            page = line
+
+    # a trailing empty page would be an empty message
+    if page or not pages:
+        pages.append(page or "")
+
+    return pages
+
+
+class StreamingReply:
+    """
+    Turns a stream of text deltas into a reply that grows as the stream arrives.
+
+    The reply is sent with the first delta, then edited at most once every
+    min_interval seconds (Discord rate limits message edits to about five per five
+    seconds per channel).  finish() makes the final edit.
+
+    Discord messages are capped at MAX_LENGTH characters; text past that continues in
+    follow-up messages, split as split_message does.
+    """
+
+    MAX_LENGTH = MAX_MESSAGE_LENGTH
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable],
+        min_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        args:
+            send: Coroutine function that sends a message of the reply and returns the
+                  sent message, which must have an async edit(content=...).
+            min_interval: Minimum seconds between edits.
+        """
+        self._send = send
+        self.min_interval = min_interval
+        self._clock = clock
+        self._parts = []
+        # the messages sent so far, one per page, and the text each one shows
+        self._messages = []
+        self._shown = []
+        self._last_edit = 0.0
+        self.edit_count = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    async def append(self, delta: str):
+        """Add a delta, sending or editing the reply if the throttle allows."""
+        self._parts.append(delta)
+
+        if not self._messages:
+            if self.text.strip():
+                await self._show(self.text)
+        elif self._clock() - self._last_edit >= self.min_interval:
+            await self._show(self.text)
+
+    async def finish(self, empty_text: str = None):
+        """
+        Show the complete text.
+
+        args:
+            empty_text: Sent instead if the stream produced no text.
+        """
+        text = self.text if self.text.strip() else empty_text
+        if text:
+            await self._show(text)
+
+    async def _show(self, text: str):
+        changed = False
+        for index, page in enumerate(split_message(text, self.MAX_LENGTH)):
+            if index == len(self._messages):
+                self._messages.append(await self._send(page))
+                self._shown.append(page)
+            elif page != self._shown[index]:
+                await self._messages[index].edit(content=page)
+                self._shown[index] = page
+                self.edit_count += 1
+            else:
+                continue
+            changed = True
+
+        if changed:
+            self._last_edit = self._clock()
@@ -0,0 +1,197 @@
+"""Process-wide registry of token counters, keyed by encoding and model name."""
+
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import tiktoken
+
+
+class TokenCounter(ABC):
+    """Counts tokens for a single encoding."""
+
+    # whether counts are worth keeping in the TOKEN_COUNT_CACHE
+    CACHEABLE = True
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Return the number of tokens in text."""
+
+    def encode(self, text: str) -> list[int]:
+        """Return the full token encoding of text."""
+        raise NotImplementedError(f"{self.name} token counter can not encode text")
+
+
+class TiktokenCounter(TokenCounter):
+    """Exact token counts from a tiktoken encoding.  The encoding is loaded on first use."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._encoding = None
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        if self._encoding is None:
+            self._encoding = tiktoken.get_encoding(self.name)
+
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    def encode(self, text: str) -> list[int]:
+        return self.encoding.encode(text)
+
+
+class ApproximateTokenCounter(TokenCounter):
+    """
+    Fast character based estimate for providers without a local tokenizer.
+
+    Assumes 3.5 characters per token, which slightly over-counts typical English
+    text so budgets stay on the safe side.
+    """
+
+    NAME = "approximate"
+
+    # cheaper to recompute than to hash
+    CACHEABLE = False
+
+    def __init__(self) -> None:
+        super().__init__(ApproximateTokenCounter.NAME)
+
+    def count(self, text: str) -> int:
+        return (2 * len(text) + 6) // 7
+
+
+class TokenizerRegistry:
+    """Hands out one shared TokenCounter per encoding."""
+
+    DEFAULT_ENCODING = "cl100k_base"
+
+    # model name prefix -> encoding.  first match wins, so keep more specific prefixes first.
+    # models that match nothing get the approximate counter.
+    MODEL_ENCODINGS = [
+        ("gpt-4o", "o200k_base"),
+        ("o1", "o200k_base"),
+        ("gpt-4", "cl100k_base"),
+        ("gpt-3.5", "cl100k_base"),
+    ]
+
+    _COUNTERS: dict[str, TokenCounter] = {}
+    _LOCK = threading.Lock()
+
+    @staticmethod
+    def get(encoding_name: str = None) -> TokenCounter:
+        """
+        Get the shared counter for an encoding.
+
+        Args:
+            encoding_name: A tiktoken encoding name or ApproximateTokenCounter.NAME.
+                           Defaults to DEFAULT_ENCODING.
+        """
+        encoding_name = encoding_name or TokenizerRegistry.DEFAULT_ENCODING
+        counter = TokenizerRegistry._COUNTERS.get(encoding_name)
+        if counter is not None:
+            return counter
+
+        # token counts are cached per counter instance, so two threads must never each
+        # create their own counter for the same encoding
+        with TokenizerRegistry._LOCK:
+            counter = TokenizerRegistry._COUNTERS.get(encoding_name)
+            if counter is None:
+                if encoding_name == ApproximateTokenCounter.NAME:
+                    counter = ApproximateTokenCounter()
+                else:
+                    counter = TiktokenCounter(encoding_name)
+                TokenizerRegistry._COUNTERS[encoding_name] = counter
+
+        return counter
+
+    @staticmethod
+    def encoding_for_model(model_name: str) -> str:
+        """Return the name of the encoding used to count tokens for a model."""
+        for prefix, encoding_name in TokenizerRegistry.MODEL_ENCODINGS:
+            if model_name.startswith(prefix):
+                return encoding_name
+
+        return ApproximateTokenCounter.NAME
+
+    @staticmethod
+    def for_model(model_name: str) -> TokenCounter:
+        """Get the shared counter for a model."""
+        return TokenizerRegistry.get(TokenizerRegistry.encoding_for_model(model_name))
+
+
+class TokenCountCache:
+    """
+    Bounded LRU cache of token counts keyed by content hash and encoding name.
+
+    Shared by every ContentMessage so repeated strings (system prompts, pre-load
+    turns, canned replies) are tokenized once per encoding.
+    """
+
+    def __init__(self, max_size: int = 4096) -> None:
+        """
+        Args:
+            max_size: Maximum number of cached counts.  0 disables the cache.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._counts: OrderedDict[tuple[bytes, str], int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @staticmethod
+    def _key(text: str, encoding_name: str) -> tuple[bytes, str]:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest(), encoding_name
+
+    def count(self, counter: TokenCounter, text: str) -> int:
+        """Count the tokens in text with counter, reusing a cached count when possible."""
+        if not counter.CACHEABLE or self.max_size <= 0:
+            return counter.count(text)
+
+        key = TokenCountCache._key(text, counter.name)
+        with self._lock:
+            token_count = self._counts.get(key)
+            if token_count is not None:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return token_count
+
+        token_count = counter.count(text)
+
+        with self._lock:
+            self.misses += 1
+            self._counts[key] = token_count
+            while len(self._counts) > self.max_size:
+                self._counts.popitem(last=False)
+
+        return token_count
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._counts),
+            "max_size": self.max_size,
+        }
+
+    def clear(self):
+        """Drop every cached count and reset the hit/miss counters."""
+        with self._lock:
+            self._counts.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+TOKEN_COUNT_CACHE = TokenCountCache()
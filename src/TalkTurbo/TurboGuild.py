@@ -4,7 +4,10 @@ import logging
 
 from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
 from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.ContextPrefix import ContextPrefix
+from TalkTurbo.GuildWorkQueue import GuildWorkQueue
 from TalkTurbo.Messages import SystemMessage
+from TalkTurbo.Moderations import ModerationThresholds
 
 
 class TurboGuild:
@@ -18,23 +21,61 @@ class TurboGuild:
         "If asked, you are wearing sassy pants."
     )
 
+    # shared by every guild that does not override its prefix
+    DEFAULT_PREFIX = ContextPrefix(DEFAULT_SYSTEM_PROMPT)
+
     def __init__(
         self,
         id,
         name: str = None,
         chat_context: ChatContext = None,
         api_adapter: ApiAdapter = None,
+        prefix: ContextPrefix = None,
+        work_queue: GuildWorkQueue = None,
+        moderation_thresholds: ModerationThresholds = None,
     ) -> None:
+        """
+        args:
+            work_queue: Serializes the jobs that use chat_context.  Defaults to a queue
+                        that does not coalesce.
+            moderation_thresholds: Per-category scores this guild flags messages at, on
+                                   top of the moderation endpoint's flags.
+        """
         self.id = id
-        self.chat_context = chat_context or ChatContext(
-            system_prompt=TurboGuild.DEFAULT_SYSTEM_PROMPT
-        )
+        self.chat_context = chat_context or ChatContext(prefix=prefix or TurboGuild.DEFAULT_PREFIX)
+        self.work_queue = work_queue if work_queue is not None else GuildWorkQueue()
+        self.api_adapter = None
+        self.moderation_thresholds = moderation_thresholds or ModerationThresholds()
+
+        if api_adapter:
+            self.set_api_adapter(api_adapter)
+
+    def set_api_adapter(self, api_adapter: ApiAdapter):
+        """Use api_adapter for this guild and resize the context budget for its model."""
         self.api_adapter = api_adapter
+        api_adapter.fit_context(self.chat_context)
 
 
 class TurboGuildMap:
-    def __init__(self, guild_map: dict[str, TurboGuild] = None) -> None:
+    def __init__(
+        self,
+        guild_map: dict[str, TurboGuild] = None,
+        default_prefix: ContextPrefix = None,
+        coalesce_window: float = 0.0,
+        coalesce_max_batch: int = 5,
+    ) -> None:
+        """
+        args:
+            default_prefix: Prefix shared by every new guild's context.
+                            Defaults to TurboGuild.DEFAULT_PREFIX.
+            coalesce_window: Seconds each new guild's work queue waits to coalesce
+                             mentions, see GuildWorkQueue.  0 disables coalescing.
+            coalesce_max_batch: The most mentions coalesced into one request.
+        """
         self._guild_map: dict[str, TurboGuild] = guild_map or {}
+        self._default_prefix = default_prefix
+        self._coalesce_window = coalesce_window
+        self._coalesce_max_batch = coalesce_max_batch
         self._logger = logging.getLogger("Turbo")
         self._logger.info("created new turbo guild map!")
 
@@ -49,7 +90,15 @@ class TurboGuildMap:
                 "could not find guild %s, adding new TurboGuild instance to guild map",
                 id,
             )
-            self._guild_map[id] = TurboGuild(id)
+            self._guild_map[id] = TurboGuild(
+                id,
+                prefix=self._default_prefix,
+                work_queue=GuildWorkQueue(self._coalesce_window, self._coalesce_max_batch),
+            )
             guild = self._guild_map.get(id)
 
         return guild
+
+    def requests_saved(self) -> int:
+        """Completion requests saved by coalescing mentions, across every guild."""
+        return sum(guild.work_queue.requests_saved for guild in self._guild_map.values())
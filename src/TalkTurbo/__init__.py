@@ -1,8 +1,17 @@
 import os
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from TalkTurbo.KeyPool import KeyPoolRegistry
 
 load_dotenv()
 
-OPENAI_CLIENT = OpenAI(api_key=os.environ.get("OPENAI_SECRET_KEY", None))
+# shared with every OpenAIAdapter using the same key(s).
+# OPENAI_SECRET_KEY may be a comma separated list of keys to spread moderations across
+OPENAI_CLIENT = KeyPoolRegistry.client(
+    "openai", os.environ.get("OPENAI_SECRET_KEY", None), OpenAI, DefaultHttpxClient
+)
+ASYNC_OPENAI_CLIENT = KeyPoolRegistry.client(
+    "openai", os.environ.get("OPENAI_SECRET_KEY", None), AsyncOpenAI, DefaultAsyncHttpxClient
+)
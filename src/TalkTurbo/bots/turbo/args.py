@@ -54,6 +54,22 @@ def parse_args():
         dest="dalle_timeout",
     )
 
+    parser.add_argument(
+        "--http-connect-timeout",
+        type=float,
+        default=5.0,
+        help="Seconds to wait for a connection on raw OpenAI REST calls (dalle).  Defaults to 5",
+        dest="http_connect_timeout",
+    )
+
+    parser.add_argument(
+        "--http-read-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds to wait for a response on raw OpenAI REST calls (dalle).  Defaults to 60",
+        dest="http_read_timeout",
+    )
+
     parser.add_argument(
         "--disable-image-storage",
         action="store_true",
@@ -67,4 +83,174 @@ def parse_args():
         default="pre-load.yaml",
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--completion-mode",
+        choices=["async", "executor"],
+        default="async",
+        help=(
+            "How provider calls are kept off the event loop. async uses the SDKs' async clients,"
+            " executor runs the blocking clients in bounded per-provider thread pools.  Defaults to async"
+        ),
+        dest="completion_mode",
+    )
+
+    parser.add_argument(
+        "--executor-pool-sizes",
+        type=str,
+        default="",
+        help=(
+            "Worker threads per provider in executor mode, e.g. openai=8,anthropic=4,moderation=4,dalle=2."
+            " Providers that are not listed use --executor-default-size"
+        ),
+        dest="executor_pool_sizes",
+    )
+
+    parser.add_argument(
+        "--executor-default-size",
+        type=int,
+        default=4,
+        help="Worker threads for providers without an --executor-pool-sizes entry.  Defaults to 4",
+        dest="executor_default_size",
+    )
+
+    parser.add_argument(
+        "--stream-responses",
+        action="store_true",
+        help=(
+            "Stream replies to mentions, editing the reply as the response arrives."
+            "  Streams use the async clients, so this needs --completion-mode async"
+        ),
+        dest="stream_responses",
+    )
+
+    parser.add_argument(
+        "--stream-edit-interval",
+        type=float,
+        default=1.0,
+        help="Minimum seconds between edits of a streamed reply.  Defaults to 1.0",
+        dest="stream_edit_interval",
+    )
+
+    parser.add_argument(
+        "--speculative-moderation",
+        action="store_true",
+        help=(
+            "Start the completion for a mention while it is still being moderated, and discard"
+            " it if the mention is flagged.  Ignored with --stream-responses"
+        ),
+        dest="speculative_moderation",
+    )
+
+    parser.add_argument(
+        "--coalesce-window-ms",
+        type=int,
+        default=0,
+        help=(
+            "Answer mentions that arrive in the same guild within this many milliseconds"
+            " with a single completion.  Defaults to 0 (disabled)"
+        ),
+        dest="coalesce_window_ms",
+    )
+
+    parser.add_argument(
+        "--coalesce-max-batch",
+        type=int,
+        default=5,
+        help="The most mentions answered by a single completion.  Defaults to 5",
+        dest="coalesce_max_batch",
+    )
+
+    parser.add_argument(
+        "--rate-limits",
+        type=str,
+        default="",
+        help=(
+            "Requests/min and tokens/min quotas to schedule completions within, as key=rpm:tpm."
+            " key is a provider or provider/model, e.g. openai=500:200000,openai/gpt-4o=:30000."
+            "  Unset means no rate limiting"
+        ),
+        dest="rate_limits",
+    )
+
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=3,
+        help="Retries of completion requests that fail with transient provider errors.  Defaults to 3",
+        dest="max_retries",
+    )
+
+    parser.add_argument(
+        "--request-deadline",
+        type=float,
+        default=60.0,
+        help="Seconds a completion request may take, retries included.  Defaults to 60",
+        dest="request_deadline",
+    )
+
+    parser.add_argument(
+        "--moderation-cache-size",
+        type=int,
+        default=4096,
+        help="Moderation verdicts kept in memory for repeated content.  0 disables it.  Defaults to 4096",
+        dest="moderation_cache_size",
+    )
+
+    parser.add_argument(
+        "--moderation-cache-ttl",
+        type=float,
+        default=24 * 3600,
+        help="Seconds a cached moderation verdict is reused for.  Defaults to 86400 (a day)",
+        dest="moderation_cache_ttl",
+    )
+
+    parser.add_argument(
+        "--moderation-cache-path",
+        type=str,
+        default=None,
+        help="SQLite file to keep cached moderation verdicts in across restarts.  Unset means memory only",
+        dest="moderation_cache_path",
+    )
+
+    parser.add_argument(
+        "--moderation-batch-window-ms",
+        type=int,
+        default=0,
+        help=(
+            "Send the messages from every guild that need moderating within this many"
+            " milliseconds as one moderation request.  Defaults to 0 (disabled)"
+        ),
+        dest="moderation_batch_window_ms",
+    )
+
+    parser.add_argument(
+        "--moderation-max-batch",
+        type=int,
+        default=32,
+        help="The most messages sent in one moderation request.  Defaults to 32",
+        dest="moderation_max_batch",
+    )
+
+    parser.add_argument(
+        "--pre-moderation",
+        action="store_true",
+        help=(
+            "Allow short greetings and code-only messages, and reject messages with blocked"
+            " terms, without the moderation endpoint.  Other messages are moderated as usual"
+        ),
+        dest="pre_moderation",
+    )
+
+    parser.add_argument(
+        "--blocked-terms",
+        type=str,
+        default=None,
+        help="File of terms (one per line) rejected in every server by --pre-moderation",
+        dest="blocked_terms",
+    )
+
+    args = parser.parse_args()
+    if args.stream_responses and args.completion_mode == "executor":
+        parser.error("--stream-responses can not be used with --completion-mode executor")
+
+    return args
@@ -1,25 +1,42 @@
 """Turbo application code / callbacks"""
 
+import asyncio
 import logging
 import os
 import sys
 from pprint import pformat as pf
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 
+from TalkTurbo.ApiAdapters.AdapterPool import AdapterPool
 from TalkTurbo.ApiAdapters.AnthropicAdapter import AnthropicAdapter
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
 from TalkTurbo.ApiAdapters.GoogleAdapter import GoogleAdapter
 from TalkTurbo.ApiAdapters.GroqAdapter import GroqAdapter
 from TalkTurbo.ApiAdapters.OpenAIAdapter import OpenAIAdapter
+from TalkTurbo.ApiAdapters.ResilientAdapter import DeadlineExceededError, ResilientAdapter
+from TalkTurbo.ApiAdapters.RoutingAdapter import RoutingAdapter
 from TalkTurbo.bots.turbo.args import parse_args
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.CircuitBreaker import CircuitBreakerRegistry, CircuitOpenError
+from TalkTurbo.ClientRegistry import ClientRegistry
 from TalkTurbo.CompletionAssistant import CompletionAssistant
+from TalkTurbo.ContextPrefix import ContextPrefix
+from TalkTurbo.ExecutorPool import ExecutorPool
+from TalkTurbo.KeyPool import KeyPoolRegistry
 from TalkTurbo.LoggerGenerator import LoggerGenerator
-from TalkTurbo.Messages import AssistantMessage, SystemMessage, UserMessage
+from TalkTurbo.Messages import AssistantMessage, ContentMessage, SystemMessage, UserMessage
+from TalkTurbo.ModerationBatcher import MODERATION_BATCHER
+from TalkTurbo.ModerationCache import MODERATION_CACHE
+from TalkTurbo.Moderations import CATEGORIES, PreModerationFilter
 from TalkTurbo.OpenAIModelAssistant import OpenAIModelAssistant
 from TalkTurbo.PreLoad import get_pre_load_data
-from TalkTurbo.TurboGuild import TurboGuildMap
+from TalkTurbo.RateLimiter import Priority, RateLimitScheduler
+from TalkTurbo.StreamingReply import StreamingReply, split_message
+from TalkTurbo.TurboGuild import TurboGuild, TurboGuildMap
 
 args = parse_args()
 
@@ -28,6 +45,9 @@ logger = LoggerGenerator.create_logger(
     logger_name="Turbo", log_level=logging.DEBUG if args.debug else logging.INFO
 )
 
+# cross-check running context token totals against full recounts while debugging
+ChatContext.VERIFY_TOKEN_COUNT = args.debug
+
 # load secrets from the environment
 load_dotenv()
 DISCORD_SECRET_TOKEN = os.getenv("DISCORD_SECRET_KEY")
@@ -37,16 +57,71 @@ GOOGLE_SECRET_TOKEN = os.environ.get("GOOGLE_SECRET_KEY", None)
 GROQ_SECRET_TOKEN = os.environ.get("GROQ_SECRET_KEY", None)
 GUILD_ID = os.getenv("GUILD_ID")
 
+# repeated content reuses its moderation verdict
+MODERATION_CACHE.configure(
+    max_size=args.moderation_cache_size,
+    ttl=args.moderation_cache_ttl,
+    path=args.moderation_cache_path,
+)
+
+# and the rest is moderated in batches across guilds
+MODERATION_BATCHER.configure(
+    window=args.moderation_batch_window_ms / 1000, max_batch=args.moderation_max_batch
+)
+
+# decides clear-cut messages locally, before the moderation cache and endpoint
+PRE_MODERATION = None
+if args.pre_moderation:
+    PRE_MODERATION = PreModerationFilter(
+        PreModerationFilter.load_terms(args.blocked_terms) if args.blocked_terms else ()
+    )
+
 # used for dalle generation
-assistant = OpenAIModelAssistant()
+assistant = OpenAIModelAssistant(
+    connect_timeout=args.http_connect_timeout,
+    read_timeout=args.http_read_timeout,
+    key_pool=KeyPoolRegistry.get(OpenAIAdapter.PROVIDER, OPENAI_SECRET_TOKEN),
+)
+
+# response length passed to every chat adapter, the adapters' defaults are used if unset
+ADAPTER_KWARGS = {"max_tokens": args.max_response_length} if args.max_response_length else {}
+
+# every chat adapter retries transient errors and fails fast while its provider is down
+RESILIENCE_KWARGS = {"max_retries": args.max_retries, "deadline": args.request_deadline}
 
 # used for chat completions
-CompletionAssistant.set_adapter(OpenAIAdapter(api_token=OPENAI_SECRET_TOKEN))
+CompletionAssistant.set_adapter(
+    ResilientAdapter(
+        AdapterPool.get(
+            OpenAIAdapter, OPENAI_SECRET_TOKEN, OpenAIAdapter.AVAILABLE_MODELS[0], **ADAPTER_KWARGS
+        ),
+        **RESILIENCE_KWARGS,
+    )
+)
+
+# rate limit completions within the providers' quotas, interactions first
+if args.rate_limits:
+    CompletionAssistant.set_scheduler(
+        RateLimitScheduler(RateLimitScheduler.parse_limits(args.rate_limits))
+    )
+
+# bounded per-provider thread pools for blocking calls.
+# every provider call goes through them in executor mode
+EXECUTORS = ExecutorPool(
+    ExecutorPool.parse_pool_sizes(args.executor_pool_sizes), args.executor_default_size
+)
+MODERATION_POOL = "moderation"
+DALLE_POOL = "dalle"
 
 # grab the pre-load data
+# every guild shares one pre-tokenized, pre-serialized prefix built from it
+PRE_LOAD_PREFIX = None
 if args.pre_load_context:
     logger.info("pre-loading context")
     PRE_LOAD_DATA, PRE_LOAD_SYSTEM_PROMPT = get_pre_load_data(args.pre_load_context)
+    PRE_LOAD_PREFIX = ContextPrefix(
+        PRE_LOAD_SYSTEM_PROMPT or TurboGuild.DEFAULT_SYSTEM_PROMPT, PRE_LOAD_DATA
+    )
 
 
 # bot secret prompt
@@ -60,8 +135,18 @@ DEFAULT_SYSTEM_PROMPT = SystemMessage(
     "If asked, you are wearing sassy pants."
 )
 
+# sent when a provider is down or too slow to answer
+UNAVAILABLE_RESPONSE = (
+    "_(turbo's host here: turbo's brain is unreachable right now, try again in a bit"
+    " or pick another model with /set_model)_"
+)
+
 # create a new guild map
-guild_map = TurboGuildMap()
+guild_map = TurboGuildMap(
+    default_prefix=PRE_LOAD_PREFIX,
+    coalesce_window=args.coalesce_window_ms / 1000,
+    coalesce_max_batch=args.coalesce_max_batch,
+)
 
 # discord bot setup
 intents = discord.Intents.default()
@@ -69,16 +154,177 @@ intents.message_content = True
 bot = commands.Bot(command_prefix="!", intents=intents, log_level=logging.INFO)
 
 
-def on_message_helper(discord_message: discord.Message, system_message: str = None) -> str:
+async def is_flagged(message: UserMessage, guild: TurboGuild) -> bool:
+    """
+    Moderate a message without blocking the event loop.
+
+    The pre-moderation filter (see --pre-moderation) decides clear-cut messages
+    locally, only the rest are sent to the moderation endpoint.  Scores are also checked
+    against the guild's own thresholds (see /set_moderation_threshold).
+    """
+    thresholds = guild.moderation_thresholds or None
+    if PRE_MODERATION is not None and message.pre_moderate(PRE_MODERATION, guild.id):
+        return message.flagged(thresholds)
+
+    if args.completion_mode == "executor":
+        return await EXECUTORS.run(MODERATION_POOL, message.flagged, thresholds)
+
+    return await message.flagged_async(thresholds)
+
+
+async def get_chat_completion(
+    guild: TurboGuild, priority: Priority = Priority.MENTION, context: ChatContext = None
+) -> ChatContext:
+    """
+    Get a chat completion for the guild's context (or context, e.g. a fork of it)
+    without blocking the event loop.
+    """
+    context = context or guild.chat_context
+    if args.completion_mode == "executor":
+        adapter = guild.api_adapter or CompletionAssistant.ADAPTER
+        # trim first, so the scheduler charges the tokens that are actually sent
+        adapter.fit_context(context)
+        await CompletionAssistant.schedule(context, adapter, priority)
+        return await EXECUTORS.run(
+            adapter.PROVIDER,
+            CompletionAssistant.get_chat_completion,
+            context=context,
+            adapter=adapter,
+        )
+
+    return await CompletionAssistant.get_chat_completion_async(
+        context=context, adapter=guild.api_adapter, priority=priority
+    )
+
+
+async def stream_reply(guild: TurboGuild, discord_message: discord.Message):
+    """Stream a chat completion for the guild's context into a reply to discord_message."""
+    reply = StreamingReply(send=discord_message.reply, min_interval=args.stream_edit_interval)
+    adapter = guild.api_adapter or CompletionAssistant.ADAPTER
+
+    async for delta in CompletionAssistant.stream_chat_completion(
+        context=guild.chat_context, adapter=guild.api_adapter
+    ):
+        await reply.append(delta)
+
+    await reply.finish(
+        empty_text="_(turbo's host here: turbo didn't have anything to say :bluefootbooby:)_"
+    )
+
+    logger.info(
+        "interaction %s - streamed %s chars in %s edits, %s time to first token p50 %.0f ms",
+        discord_message.id,
+        len(reply.text),
+        reply.edit_count,
+        adapter.PROVIDER,
+        1000 * CompletionAssistant.TIME_TO_FIRST_TOKEN[adapter.PROVIDER].p50,
+    )
+
+
+def flagged_response(message: ContentMessage) -> str:
+    """The reply to a mention that breached the moderation threshold."""
+    max_cat, max_score = message.get_max_category()
+    max_score_percent = f"{100 * max_score:.1f}%"
+    return AssistantMessage(
+        (
+            "_(turbos host here: you've breached the content moderation threshold."
+            f" Category: {max_cat}, Score: {max_score_percent}. yikes."
+            "  keep it safe and friendly please!)_"
+        )
+    ).content
+
+
+def combine_mentions(mentions: list[tuple[discord.Message, ContentMessage, asyncio.Task]]):
+    """The message to answer a batch of mentions with: a lone mention as is, or a combined one."""
+    if len(mentions) == 1:
+        return mentions[0][1]
+
+    return UserMessage(
+        "(SYSTEM) Several users mentioned you at once. Answer each of them in one reply:\n"
+        + "\n".join(
+            f"- {mention.author.display_name}: {content_message.content}"
+            for mention, content_message, _ in mentions
+        )
+    )
+
+
+async def answer_mentions(
+    mentions: list[tuple[discord.Message, ContentMessage, asyncio.Task | None]],
+) -> list[str | None]:
+    """
+    Answer a batch of mentions from one guild with a single completion.
+
+    Runs on the guild's work queue.  A lone mention is added to the context as is;
+    coalesced mentions are combined into one message asking for an answer to each.
+    The response is for the latest mention, the others get None.
+
+    Mentions still being moderated (see --speculative-moderation) are answered
+    speculatively, while their moderation finishes.  If any is flagged the speculative
+    answer is thrown away: flagged mentions get the moderation notice, the rest are
+    answered as usual.
+    """
+    discord_message = mentions[-1][0]
     guild = guild_map.get(discord_message.guild.id)
 
-    # patch in pre-load data if needed
-    if args.pre_load_context and not len(guild.chat_context.pre_load_data):
-        for message in PRE_LOAD_DATA:
-            guild.chat_context.add_pre_load_data(message)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "context for guild %s: %s",
+            guild.id,
+            pf(list(guild.chat_context.get_messages_as_list())),
+        )
+
+    responses = [None] * len(mentions)
+    moderations = [moderation for _, _, moderation in mentions if moderation is not None]
+    if moderations:
 
-        if PRE_LOAD_SYSTEM_PROMPT:
-            guild.chat_context.add_pre_load_system_prompt(PRE_LOAD_SYSTEM_PROMPT)
+        async def any_flagged() -> bool:
+            return any(await asyncio.gather(*moderations))
+
+        response = await CompletionAssistant.get_speculative_chat_completion(
+            guild.chat_context,
+            combine_mentions(mentions),
+            any_flagged(),
+            complete=lambda fork: get_chat_completion(guild, context=fork),
+        )
+        if response is not None:
+            responses[-1] = response.content
+            return responses
+
+        # answer whatever wasn't flagged the usual way
+        for i, (mention, message, moderation) in enumerate(mentions):
+            if moderation.result():
+                logger.info("interaction %s - message flagged for content", mention.id)
+                responses[i] = flagged_response(message)
+        mentions = [mention for mention in mentions if not mention[2].result()]
+        if not mentions:
+            return responses
+        discord_message = mentions[-1][0]
+
+    guild.chat_context.add_message(combine_mentions(mentions))
+
+    response = None
+    if args.stream_responses:
+        await stream_reply(guild, discord_message)
+    else:
+        response = (await get_chat_completion(guild)).get_latest_message().content
+
+    # the answer goes to the latest mention that wasn't flagged
+    latest = max(i for i, flagged in enumerate(responses) if flagged is None)
+    responses[latest] = response
+    return responses
+
+
+async def on_message_helper(
+    discord_message: discord.Message, system_message: str = None
+) -> str | None:
+    """
+    Moderate a mention and queue it on the guild's work queue to be answered.
+
+    Returns the response text to reply with, or None if there is nothing left to send:
+    the response was streamed into a reply (see --stream-responses) or the mention was
+    answered together with a later one (see --coalesce-window-ms).
+    """
+    guild = guild_map.get(discord_message.guild.id)
 
     # patch in the system message
     if system_message:
@@ -95,36 +341,28 @@ def on_message_helper(discord_message: discord.Message, system_message: str = No
     if system_message:
         message = SystemMessage(content=discord_message.content)
 
+    # speculatively answer the mention while it is moderated (streamed replies can't
+    # be taken back, so they always wait for moderation)
+    if args.speculative_moderation and not args.stream_responses:
+        moderation = asyncio.ensure_future(is_flagged(message, guild))
+        return await guild.work_queue.run_batched(
+            (discord_message, message, moderation), answer_mentions
+        )
+
     # check for content violations
     # if so: return an assistant message, do not update the guild context with the
     # flagged message
-    if message.flagged():
+    if await is_flagged(message, guild):
         logger.info("interaction %s - message flagged for content", discord_message.id)
-        max_cat, max_score = message.get_max_category()
-        max_score_percent = f"{100 * (1 - round(max_score, 5))}%"
-        return AssistantMessage(
-            (
-                "_(turbos host here: you've breached the content moderation threshold."
-                f" Category: {max_cat}, Score: {max_score_percent}. yikes."
-                "  keep it safe and friendly please!)_"
-            )
-        ).content
+        return flagged_response(message)
 
     logger.info(
         "guild %s :: interaction %s :: message not flagged for content. proceeding with query.",
         discord_message.guild.name,
         discord_message.id,
     )
-    logger.debug(
-        "context for guild %s: %s",
-        guild.id,
-        pf(guild.chat_context.get_messages_as_list()),
-    )
 
-    guild.chat_context.add_message(message)
-    response = CompletionAssistant.get_chat_completion(context=guild.chat_context)
-
-    return response.get_latest_message().content
+    return await guild.work_queue.run_batched((discord_message, message, None), answer_mentions)
 
 
 @bot.event
@@ -142,8 +380,15 @@ async def on_message(message: discord.Message):
     if bot.user.mentioned_in(message=message) and not message.author.bot:
         log = logging.getLogger("Turbo")
         log.debug("bot mentioned in message %s in guild %s", message.content, message.guild)
-        response = on_message_helper(discord_message=message)
-        await message.reply(response)
+        try:
+            response = await on_message_helper(discord_message=message)
+        except (CircuitOpenError, DeadlineExceededError) as exc:
+            log.warning("mention %s not answered: %s", message.id, exc)
+            response = UNAVAILABLE_RESPONSE
+        if response:
+            # long answers continue in follow-up replies, as streamed ones do
+            for page in split_message(response):
+                await message.reply(page)
 
 
 @bot.tree.command(
@@ -167,9 +412,9 @@ async def generate_image(
 
     # moderate the prompt
     message = UserMessage(query)
-    if message.flagged():
+    if await is_flagged(message, guild):
         logger.info("interaction %s: flagged message", interaction.id)
-        interaction.followup.send(
+        await interaction.followup.send(
             content=(
                 "_(turbos host here: you've breached the content moderation threshold."
                 "  Keep it safe and friendly please!)_"
@@ -184,24 +429,32 @@ async def generate_image(
     )
 
     # query dalle3, get a path to the generated image
-    image_path = assistant.query_dalle(
-        query=query,
-        openai_secret_key=OPENAI_SECRET_TOKEN,
-        use_dalle_3=True,
-    )
+    dalle_kwargs = {"query": query, "openai_secret_key": OPENAI_SECRET_TOKEN, "use_dalle_3": True}
+    if args.completion_mode == "executor":
+        image_path = await EXECUTORS.run(DALLE_POOL, assistant.query_dalle, **dalle_kwargs)
+    else:
+        image_path = await assistant.query_dalle_async(**dalle_kwargs)
 
     # catch problems with image generation
     if not image_path:
         log.warning("dalle did not return an image path")
-        no_image_response = assistant.get_chat_completion(
-            message=UserMessage(
-                "(SYSTEM) the previous message did not return a response from the model"
-                f"the prompt was: {query}"
-                "please include the prompt (or similar) in your reply."
-            ),
-            turbo_guild=guild,
+        no_image_message = UserMessage(
+            "(SYSTEM) the previous message did not return a response from the model."
+            f" the prompt was: {query}."
+            " please include the prompt (or similar) in your reply."
         )
 
+        async def explain_missing_image() -> str:
+            guild.chat_context.add_message(no_image_message)
+            completion = await get_chat_completion(guild, priority=Priority.INTERACTION)
+            return completion.get_latest_message().content
+
+        try:
+            no_image_response = await guild.work_queue.run(explain_missing_image)
+        except (CircuitOpenError, DeadlineExceededError) as exc:
+            log.warning("interaction %s: no reply for the missing image: %s", interaction_id, exc)
+            no_image_response = UNAVAILABLE_RESPONSE
+
         await interaction.followup.send(content=no_image_response)
         return
 
@@ -212,13 +465,17 @@ async def generate_image(
         " The image will be included with your response."
         " The prompt was: " + query
     )
-    guild.chat_context.add_message(sys_message)
 
-    prompt_response = (
-        CompletionAssistant.get_chat_completion(context=guild.chat_context)
-        .get_latest_message()
-        .content
-    )
+    async def remark_on_image() -> str:
+        guild.chat_context.add_message(sys_message)
+        completion = await get_chat_completion(guild, priority=Priority.INTERACTION)
+        return completion.get_latest_message().content
+
+    try:
+        prompt_response = await guild.work_queue.run(remark_on_image)
+    except (CircuitOpenError, DeadlineExceededError) as exc:
+        log.warning("interaction %s: no remark on the image: %s", interaction_id, exc)
+        prompt_response = UNAVAILABLE_RESPONSE
 
     await interaction.followup.send(content=prompt_response, file=discord.File(image_path))
 
@@ -262,6 +519,25 @@ async def list_current_model(interaction: discord.Interaction):
     await interaction.response.send_message(f"current model: {model_name}")
 
 
+def build_adapter(model: str) -> ApiAdapter | None:
+    """
+    A resilient adapter for model, or None if no provider offers it.
+
+    The wrapped adapter (and its SDK clients) is shared by every guild using the model.
+    """
+    for adapter_class, api_token in (
+        (OpenAIAdapter, OPENAI_SECRET_TOKEN),
+        (AnthropicAdapter, ANT_SECRET_TOKEN),
+        (GoogleAdapter, GOOGLE_SECRET_TOKEN),
+        (GroqAdapter, GROQ_SECRET_TOKEN),
+    ):
+        if model in adapter_class.AVAILABLE_MODELS:
+            adapter = AdapterPool.get(adapter_class, api_token, model, **ADAPTER_KWARGS)
+            return ResilientAdapter(adapter, **RESILIENCE_KWARGS)
+
+    return None
+
+
 @bot.tree.command(
     name="set_model",
     description="set the model to use for the bot.  Use /list_available_models to see options.",
@@ -271,19 +547,237 @@ async def set_model(interaction: discord.Interaction, model: str = "gpt-3.5-turb
     logger.info("guild %s: setting model to %s", interaction.guild.name, model)
     response = f"setting model to {model}"
 
-    if model in OpenAIAdapter.AVAILABLE_MODELS:
-        turbo_guild.api_adapter = OpenAIAdapter(api_token=OPENAI_SECRET_TOKEN, model_name=model)
-    elif model in AnthropicAdapter.AVAILABLE_MODELS:
-        turbo_guild.api_adapter = AnthropicAdapter(api_token=ANT_SECRET_TOKEN, model_name=model)
-    elif model in GoogleAdapter.AVAILABLE_MODELS:
-        turbo_guild.api_adapter = GoogleAdapter(api_token=GOOGLE_SECRET_TOKEN, model_name=model)
-    elif model in GroqAdapter.AVAILABLE_MODELS:
-        turbo_guild.api_adapter = GroqAdapter(api_token=GROQ_SECRET_TOKEN, model_name=model)
-    else:
+    adapter = build_adapter(model)
+    if not adapter:
         logger.warning("model %s not found", model)
         response = f"model {model} not found.  use /list_available_models to see options."
+        await interaction.response.send_message(response)
+        return
+
+    # waiting for the guild's queue can outlast the interaction deadline
+    await interaction.response.defer()
+
+    # resize the guild's context budget for the new model, between completions
+    async def switch_adapter() -> int:
+        turbo_guild.set_api_adapter(adapter)
+        return turbo_guild.chat_context.max_tokens
 
-    await interaction.response.send_message(response)
+    budget = await turbo_guild.work_queue.run(switch_adapter)
+    response += f" (context budget: {budget} tokens)"
+
+    await interaction.followup.send(content=response)
+
+
+@bot.tree.command(
+    name="set_route",
+    description="route to the fastest of several equivalent models, e.g. gpt-4o-mini,llama3-70b-8192",
+)
+async def set_route(interaction: discord.Interaction, models: str, hedge: bool = False):
+    turbo_guild = guild_map.get(interaction.guild.id)
+    names = [name.strip() for name in models.split(",") if name.strip()]
+    logger.info("guild %s: routing between %s, hedge: %s", interaction.guild.name, names, hedge)
+
+    adapters = {name: build_adapter(name) for name in names}
+    unknown = [name for name, adapter in adapters.items() if adapter is None]
+    if not names or unknown:
+        await interaction.response.send_message(
+            f"model(s) {unknown} not found.  use /list_available_models to see options."
+        )
+        return
+
+    router = RoutingAdapter(
+        list(adapters.values()),
+        hedge=hedge,
+        scheduler=CompletionAssistant.SCHEDULER,
+    )
+    await interaction.response.defer()
+
+    async def switch_adapter() -> int:
+        turbo_guild.set_api_adapter(router)
+        return turbo_guild.chat_context.max_tokens
+
+    budget = await turbo_guild.work_queue.run(switch_adapter)
+
+    await interaction.followup.send(
+        content=f"routing between {names}{' with hedged requests' if hedge else ''}"
+        f" (context budget: {budget} tokens)"
+    )
+
+
+def routing_stats() -> str:
+    return "".join(
+        f"\n{model}: p50 {1000 * stats.latency.p50:.0f} ms / p95 {1000 * stats.latency.p95:.0f} ms,"
+        f" errors {100 * stats.error_rate:.0f}%"
+        for model, stats in RoutingAdapter.MODEL_STATS.items()
+    )
+
+
+def client_stats() -> str:
+    return f"\nshared adapters: {AdapterPool.size()}" + "".join(
+        f"\n{provider} clients: {clients['created']} created, {clients['reused']} reused"
+        for provider, clients in ClientRegistry.stats().items()
+    )
+
+
+def key_pool_stats() -> str:
+    return "".join(
+        f"\n{provider} key {key['key']}: {key['requests']} requests, {key['throttles']} throttled,"
+        f" {key['remaining_requests']} requests / {key['remaining_tokens']} tokens left"
+        + (f", cooling down for {key['cooling_down']:.0f}s" if key["cooling_down"] else "")
+        for provider, keys in KeyPoolRegistry.stats().items()
+        for key in keys
+    )
+
+
+def moderation_cache_stats() -> str:
+    stats = MODERATION_CACHE.stats()
+    return (
+        f"\nmoderation cache: {stats['hits']} hits, {stats['disk_hits']} disk hits,"
+        f" {stats['misses']} misses, {stats['size']}/{stats['max_size']} cached"
+    )
+
+
+def moderation_batch_stats() -> str:
+    if not MODERATION_BATCHER.enabled:
+        return "\nmoderation batching: off"
+
+    stats = MODERATION_BATCHER.stats()
+    return (
+        f"\nmoderation batching: {stats['items']} messages in {stats['batches']} requests"
+        f" ({stats['requests_saved']} saved)"
+    )
+
+
+def pre_moderation_stats() -> str:
+    if PRE_MODERATION is None:
+        return "\npre-moderation: off"
+
+    stats = PRE_MODERATION.stats()
+    return (
+        f"\npre-moderation: {stats['allow']} allowed, {stats['reject']} rejected,"
+        f" {stats['escalate']} escalated ({stats['messages_per_second']:.0f} messages/s)"
+    )
+
+
+def circuit_breaker_stats() -> str:
+    return "".join(
+        f"\n{provider} circuit: {breaker['state']}, transitions: {breaker['transitions'] or 'none'}"
+        for provider, breaker in CircuitBreakerRegistry.stats().items()
+    )
+
+
+def rate_limit_stats() -> str:
+    if CompletionAssistant.SCHEDULER is None:
+        return "\nrate limits: off"
+
+    stats = CompletionAssistant.SCHEDULER.stats()
+    return f"\nrate limited requests queued: {stats['queue_depth']}" + "".join(
+        f"\n{priority} wait p50 {1000 * wait['p50']:.0f} ms / p95 {1000 * wait['p95']:.0f} ms"
+        for priority, wait in stats["wait_time"].items()
+        if wait["count"]
+    )
+
+
+@bot.tree.command(
+    name="executor_stats",
+    description="show queue depth and wait times of the blocking call thread pools.",
+)
+async def executor_stats(interaction: discord.Interaction):
+    stats = EXECUTORS.stats()
+    lines = [
+        f"{provider}: {pool['running']}/{pool['max_workers']} running, {pool['queue_depth']} queued,"
+        f" wait p50 {1000 * pool['wait_time']['p50']:.0f} ms / p95 {1000 * pool['wait_time']['p95']:.0f} ms"
+        for provider, pool in stats.items()
+    ]
+    report = (
+        f"completion mode: {args.completion_mode}\n"
+        + ("\n".join(lines) or "no pooled calls yet")
+        + f"\nrequests saved by coalescing mentions: {guild_map.requests_saved()}"
+        + rate_limit_stats()
+        + circuit_breaker_stats()
+        + routing_stats()
+        + client_stats()
+        + key_pool_stats()
+        + pre_moderation_stats()
+        + moderation_cache_stats()
+        + moderation_batch_stats()
+    )
+
+    # with many providers, models and keys the report outgrows a single message
+    first, *rest = split_message(report)
+    await interaction.response.send_message(first)
+    for page in rest:
+        await interaction.followup.send(content=page)
+
+
+@bot.tree.command(
+    name="block_term",
+    description="reject messages with this word or phrase in this server without moderating them.",
+)
+@app_commands.default_permissions(manage_guild=True)
+async def block_term(interaction: discord.Interaction, term: str):
+    if PRE_MODERATION is None:
+        await interaction.response.send_message("pre-moderation is off, see --pre-moderation.")
+        return
+
+    logger.info("guild %s: blocking a term", interaction.guild.name)
+    PRE_MODERATION.add_terms([term], guild_id=interaction.guild.id)
+    await interaction.response.send_message(
+        f"blocked ({len(PRE_MODERATION.terms(interaction.guild.id))} terms blocked in this server)",
+        ephemeral=True,
+    )
+
+
+@bot.tree.command(
+    name="unblock_term",
+    description="stop rejecting messages with a term added with /block_term.",
+)
+@app_commands.default_permissions(manage_guild=True)
+async def unblock_term(interaction: discord.Interaction, term: str):
+    if PRE_MODERATION is None:
+        await interaction.response.send_message("pre-moderation is off, see --pre-moderation.")
+        return
+
+    logger.info("guild %s: unblocking a term", interaction.guild.name)
+    PRE_MODERATION.remove_terms([term], guild_id=interaction.guild.id)
+    await interaction.response.send_message(
+        f"unblocked ({len(PRE_MODERATION.terms(interaction.guild.id))} terms blocked in this server)",
+        ephemeral=True,
+    )
+
+
+@bot.tree.command(
+    name="set_moderation_threshold",
+    description="flag messages in this server when a moderation category scores at least threshold.",
+)
+@app_commands.default_permissions(manage_guild=True)
+@app_commands.choices(
+    category=[app_commands.Choice(name=category, value=category) for category in CATEGORIES]
+)
+async def set_moderation_threshold(
+    interaction: discord.Interaction, category: str, threshold: float = None
+):
+    guild = guild_map.get(interaction.guild.id)
+    try:
+        guild.moderation_thresholds.set(category, threshold)
+    except ValueError as exc:
+        await interaction.response.send_message(str(exc), ephemeral=True)
+        return
+
+    logger.info(
+        "guild %s: moderation threshold for %s set to %s",
+        interaction.guild.name,
+        category,
+        threshold,
+    )
+    thresholds = ", ".join(
+        f"{name}: {guild.moderation_thresholds.get(name)}"
+        for name in CATEGORIES
+        if guild.moderation_thresholds.get(name) is not None
+    )
+    await interaction.response.send_message(
+        f"moderation thresholds: {thresholds or 'none, the moderation endpoint decides'}"
+    )
 
 
 @bot.tree.command(
@@ -0,0 +1,432 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from TalkTurbo.ApiAdapters.AnthropicAdapter import AnthropicAdapter
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ApiAdapters.GoogleAdapter import GoogleAdapter
+from TalkTurbo.ApiAdapters.GroqAdapter import GroqAdapter
+from TalkTurbo.ApiAdapters.ModelDescription import ModelDescription
+from TalkTurbo.ApiAdapters.OpenAIAdapter import OpenAIAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.CompletionAssistant import CompletionAssistant
+from TalkTurbo.Messages import AssistantMessage, ContentMessage, SystemMessage, UserMessage
+from TalkTurbo.RateLimiter import RateLimit, RateLimitScheduler
+from TalkTurbo.Tokenizers import ApproximateTokenCounter
+from TalkTurbo.TurboGuild import TurboGuild
+
+
+class CountingAdapter(ApiAdapter):
+    """Converts messages to (role, content) dicts and counts how many it converted."""
+
+    def __init__(self):
+        super().__init__(api_token="", model_name="fake", max_tokens=100)
+        self.converted_prefixes = 0
+        self.converted_messages = 0
+
+    def get_chat_completion(self, context: ChatContext) -> ContentMessage:
+        return AssistantMessage("ok")
+
+    def convert_context_to_api_format(self, context: ChatContext) -> list[dict]:
+        return self._convert_context_cached(context)
+
+    def _convert_prefix(self, context: ChatContext) -> list:
+        self.converted_prefixes += 1
+        return [{"role": "system", "text": context.system_prompt.content}]
+
+    def _convert_message(self, message: ContentMessage) -> dict:
+        self.converted_messages += 1
+        return {"role": message.role.value, "text": message.content}
+
+
+def expected_conversion(context: ChatContext) -> list[dict]:
+    return [{"role": "system", "text": context.system_prompt.content}] + [
+        {"role": m.role.value, "text": m.content} for m in context.messages
+    ]
+
+
+class TestConversionCache(unittest.TestCase):
+    def setUp(self):
+        self.adapter = CountingAdapter()
+        self.context = ChatContext(system_prompt=SystemMessage("Prompt"))
+
+    def test_only_new_messages_are_converted(self):
+        self.context.add_message(UserMessage("one"))
+        self.adapter.convert_context_to_api_format(self.context)
+        self.context.add_message(AssistantMessage("two"))
+        self.context.add_message(UserMessage("three"))
+
+        converted = self.adapter.convert_context_to_api_format(self.context)
+
+        self.assertEqual(converted, expected_conversion(self.context))
+        self.assertEqual(self.adapter.converted_prefixes, 1)
+        self.assertEqual(self.adapter.converted_messages, 3)
+
+    def test_unchanged_context_reuses_result(self):
+        self.context.add_message(UserMessage("one"))
+        first = self.adapter.convert_context_to_api_format(self.context)
+        second = self.adapter.convert_context_to_api_format(self.context)
+        self.assertIs(first, second)
+
+    def test_eviction(self):
+        self.context.max_tokens = 6
+        self.context.add_message(UserMessage("first question"))
+        self.context.add_message(AssistantMessage("first answer"))
+        self.adapter.convert_context_to_api_format(self.context)
+
+        self.context.add_message(UserMessage("second question"))
+        converted = self.adapter.convert_context_to_api_format(self.context)
+
+        self.assertEqual(len(self.context.messages), 1)
+        self.assertEqual(converted, expected_conversion(self.context))
+        self.assertEqual(self.adapter.converted_messages, 3)
+
+    def test_everything_evicted(self):
+        self.context.max_tokens = 4
+        self.context.add_message(UserMessage("first question"))
+        self.adapter.convert_context_to_api_format(self.context)
+
+        self.context.add_message(UserMessage("second question"))
+        self.context.add_message(UserMessage("third question"))
+
+        converted = self.adapter.convert_context_to_api_format(self.context)
+        self.assertEqual(converted, expected_conversion(self.context))
+
+    def test_prefix_change(self):
+        self.context.add_message(UserMessage("one"))
+        self.adapter.convert_context_to_api_format(self.context)
+
+        self.context.add_pre_load_system_prompt(SystemMessage("New prompt"))
+        converted = self.adapter.convert_context_to_api_format(self.context)
+
+        self.assertEqual(converted, expected_conversion(self.context))
+        self.assertEqual(self.adapter.converted_prefixes, 2)
+
+    def test_history_replaced(self):
+        self.context.add_message(UserMessage("one"))
+        self.adapter.convert_context_to_api_format(self.context)
+
+        self.context.messages = [UserMessage("two")]
+        converted = self.adapter.convert_context_to_api_format(self.context)
+
+        self.assertEqual(converted, expected_conversion(self.context))
+
+    def test_fork_starts_from_its_source(self):
+        for i in range(10):
+            self.context.add_message(UserMessage(f"question {i}"))
+            self.context.add_message(AssistantMessage(f"answer {i}"))
+        self.adapter.convert_context_to_api_format(self.context)
+
+        # like a speculative completion: commit the last fork's turn, then fork again
+        self.context.add_message(UserMessage("question 10"))
+        self.context.add_message(AssistantMessage("answer 10"))
+        fork = self.context.fork()
+        fork.add_message(UserMessage("question 11"))
+        before = self.adapter.converted_messages
+
+        converted = self.adapter.convert_context_to_api_format(fork)
+
+        self.assertEqual(converted, expected_conversion(fork))
+        self.assertEqual(self.adapter.converted_messages - before, 3)
+        self.assertEqual(self.adapter.converted_prefixes, 1)
+        # the source is unaffected by the fork
+        self.assertEqual(
+            self.adapter.convert_context_to_api_format(self.context),
+            expected_conversion(self.context),
+        )
+
+    def test_fork_of_changed_source_converts_everything(self):
+        self.context.add_message(UserMessage("one"))
+        fork = self.context.fork()
+        self.context.add_message(AssistantMessage("two"))
+        fork.add_message(AssistantMessage("other"))
+
+        self.assertEqual(
+            self.adapter.convert_context_to_api_format(fork), expected_conversion(fork)
+        )
+
+    def test_caches_are_per_context(self):
+        other = ChatContext(system_prompt=SystemMessage("Other"))
+        self.context.add_message(UserMessage("one"))
+        other.add_message(UserMessage("two"))
+
+        self.assertEqual(
+            self.adapter.convert_context_to_api_format(self.context),
+            expected_conversion(self.context),
+        )
+        self.assertEqual(
+            self.adapter.convert_context_to_api_format(other), expected_conversion(other)
+        )
+
+
+class TestProviderConversions(unittest.TestCase):
+    def setUp(self):
+        self.context = ChatContext(
+            system_prompt=SystemMessage("Prompt"), pre_load_data=[UserMessage("pre")]
+        )
+        self.context.add_message(UserMessage("hi"))
+        self.context.add_message(AssistantMessage("hello"))
+
+    def test_anthropic(self):
+        adapter = AnthropicAdapter(api_token="test")
+        self.assertEqual(
+            adapter.convert_context_to_api_format(self.context),
+            [
+                {"content": "(ignore this message)", "role": "user"},
+                {"role": "assistant", "content": "Prompt"},
+                {"role": "user", "content": "pre"},
+                {"role": "user", "content": "hi"},
+                {"role": "assistant", "content": "hello"},
+            ],
+        )
+        # the shared prefix dicts are untouched
+        self.assertEqual(self.context.get_messages_as_list()[0]["role"], "system")
+
+    def test_google(self):
+        adapter = GoogleAdapter(api_token="test")
+        self.assertEqual(
+            adapter.convert_context_to_api_format(self.context),
+            [
+                {"role": "user", "parts": ["Prompt"]},
+                {"role": "model", "parts": ["Sounds great ;)"]},
+                {"role": "user", "parts": ["hi"]},
+                {"role": "model", "parts": ["hello"]},
+            ],
+        )
+
+
+class TestContextBudgets(unittest.TestCase):
+    def test_model_description_budget(self):
+        description = ModelDescription("model", max_input_tokens=8192, max_output_tokens=2048)
+        self.assertEqual(description.context_budget(1024), 7168)
+        self.assertEqual(description.context_budget(4096), 6144)
+
+    def test_every_available_model_is_described(self):
+        for adapter_cls in (AnthropicAdapter, GoogleAdapter, GroqAdapter):
+            self.assertEqual(adapter_cls.AVAILABLE_MODELS, list(adapter_cls.MODEL_DESCRIPTIONS))
+
+    def test_small_and_large_windows(self):
+        small = GroqAdapter(api_token="test", model_name="llama3-8b-8192", max_tokens=1024)
+        large = AnthropicAdapter(api_token="test", model_name="claude-3-haiku-20240307")
+
+        self.assertEqual(small.context_budget(), int((8192 - 1024) * 0.95))
+        self.assertEqual(large.context_budget(), int((200000 - 1024) * 0.95))
+
+    def test_response_limit_capped_at_model_output(self):
+        adapter = GoogleAdapter(api_token="test", max_tokens=100000)
+        self.assertEqual(adapter.response_token_limit(), 2048)
+
+    def test_unknown_model_has_no_budget(self):
+        adapter = GroqAdapter(api_token="test", model_name="not-a-model")
+        self.assertIsNone(adapter.context_budget())
+
+    def test_set_api_adapter_resizes_context(self):
+        guild = TurboGuild("123")
+        for i in range(200):
+            guild.chat_context.add_message(UserMessage(f"message number {i} " * 10))
+
+        guild.set_api_adapter(GroqAdapter(api_token="test", model_name="llama3-8b-8192"))
+
+        self.assertEqual(guild.chat_context.max_tokens, guild.api_adapter.context_budget())
+        self.assertEqual(guild.chat_context.token_counter.name, ApproximateTokenCounter.NAME)
+        self.assertLessEqual(
+            guild.chat_context.context_length_in_tokens(), guild.chat_context.max_tokens
+        )
+
+
+class TestAsyncCompletions(unittest.TestCase):
+    def test_default_runs_sync_completion(self):
+        adapter = CountingAdapter()
+        response = asyncio.run(adapter.get_chat_completion_async(ChatContext()))
+        self.assertEqual(response.content, "ok")
+
+    def test_openai_uses_async_client(self):
+        adapter = OpenAIAdapter(api_token="test")
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="hi!", role="assistant"))]
+        )
+        adapter._async_open_ai_client = SimpleNamespace(
+            chat=SimpleNamespace(
+                completions=SimpleNamespace(create=AsyncMock(return_value=completion))
+            )
+        )
+
+        response = asyncio.run(adapter.get_chat_completion_async(ChatContext()))
+
+        self.assertIsInstance(response, AssistantMessage)
+        self.assertEqual(response.content, "hi!")
+        adapter._async_open_ai_client.chat.completions.create.assert_awaited_once()
+        _, kwargs = adapter._async_open_ai_client.chat.completions.create.call_args
+        self.assertEqual(kwargs["max_completion_tokens"], adapter.response_token_limit())
+
+    def test_completion_assistant_async(self):
+        CompletionAssistant.set_adapter(CountingAdapter())
+        context = ChatContext()
+        context.add_message(UserMessage("hello"))
+
+        asyncio.run(CompletionAssistant.get_chat_completion_async(context))
+
+        self.assertEqual(context.get_latest_message().content, "ok")
+        self.assertEqual(len(context.messages), 2)
+
+    def test_completion_assistant_waits_for_scheduler(self):
+        adapter = CountingAdapter()
+        adapter.PROVIDER = "fake"
+        scheduler = RateLimitScheduler({"fake": RateLimit(requests_per_minute=60)})
+        CompletionAssistant.set_scheduler(scheduler)
+        self.addCleanup(CompletionAssistant.set_scheduler, None)
+
+        context = ChatContext()
+        context.add_message(UserMessage("hello"))
+        asyncio.run(CompletionAssistant.get_chat_completion_async(context, adapter))
+
+        self.assertLess(scheduler._limiters["fake"].requests.level, 59.5)
+        self.assertEqual(context.get_latest_message().content, "ok")
+
+
+class FailingStreamAdapter(CountingAdapter):
+    async def stream_chat_completion(self, context: ChatContext):
+        yield "partial"
+        raise ConnectionError("stream dropped")
+
+
+async def collect(stream) -> list[str]:
+    return [delta async for delta in stream]
+
+
+class TestStreamingCompletions(unittest.TestCase):
+    def setUp(self):
+        CompletionAssistant.set_adapter(CountingAdapter())
+        self.context = ChatContext()
+        self.context.add_message(UserMessage("hello"))
+
+    def test_default_stream_is_one_delta(self):
+        deltas = asyncio.run(collect(CountingAdapter().stream_chat_completion(self.context)))
+        self.assertEqual(deltas, ["ok"])
+
+    def test_openai_stream(self):
+        adapter = OpenAIAdapter(api_token="test")
+
+        async def chunks():
+            for text in ["he", None, "llo"]:
+                yield SimpleNamespace(
+                    choices=[SimpleNamespace(delta=SimpleNamespace(content=text))]
+                )
+            yield SimpleNamespace(choices=[])
+
+        create = AsyncMock(return_value=chunks())
+        adapter._async_open_ai_client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+        )
+
+        deltas = asyncio.run(collect(adapter.stream_chat_completion(self.context)))
+
+        self.assertEqual(deltas, ["he", "llo"])
+        self.assertTrue(create.await_args.kwargs["stream"])
+
+    def test_context_updated_when_stream_completes(self):
+        deltas = asyncio.run(collect(CompletionAssistant.stream_chat_completion(self.context)))
+
+        self.assertEqual(deltas, ["ok"])
+        self.assertEqual(self.context.get_latest_message().content, "ok")
+        self.assertGreater(CompletionAssistant.TIME_TO_FIRST_TOKEN[None].count, 0)
+
+    def test_context_unchanged_when_stream_fails(self):
+        with self.assertRaises(ConnectionError):
+            asyncio.run(
+                collect(
+                    CompletionAssistant.stream_chat_completion(
+                        self.context, adapter=FailingStreamAdapter()
+                    )
+                )
+            )
+
+        self.assertEqual(len(self.context.messages), 1)
+        self.assertEqual(self.context.get_latest_message().content, "hello")
+
+
+class SlowAdapter(CountingAdapter):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.cancelled = False
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return AssistantMessage(f"answer to {context.get_latest_message().content}")
+
+
+async def moderation(flagged: bool, latency: float = 0.0) -> bool:
+    await asyncio.sleep(latency)
+    return flagged
+
+
+class TestSpeculativeCompletions(unittest.TestCase):
+    def setUp(self):
+        CompletionAssistant.SPECULATION.clear()
+        self.context = ChatContext()
+        self.context.add_message(UserMessage("earlier"))
+
+    def speculate(self, adapter: ApiAdapter, flagged) -> ContentMessage | None:
+        CompletionAssistant.set_adapter(adapter)
+        return asyncio.run(
+            CompletionAssistant.get_speculative_chat_completion(
+                self.context, UserMessage("hello"), flagged
+            )
+        )
+
+    def test_commits_when_not_flagged(self):
+        response = self.speculate(SlowAdapter(0.01), moderation(False, 0.02))
+
+        self.assertEqual(response.content, "answer to hello")
+        self.assertEqual(
+            [m.content for m in self.context.messages], ["earlier", "hello", "answer to hello"]
+        )
+        self.assertEqual(CompletionAssistant.SPECULATION["committed"], 1)
+
+    def test_moderation_and_completion_overlap(self):
+        start = time.perf_counter()
+        self.speculate(SlowAdapter(0.1), moderation(False, 0.1))
+        self.assertLess(time.perf_counter() - start, 0.18)
+
+    def test_flagged_cancels_completion(self):
+        adapter = SlowAdapter(10)
+
+        self.assertIsNone(self.speculate(adapter, moderation(True, 0.01)))
+
+        self.assertTrue(adapter.cancelled)
+        self.assertEqual([m.content for m in self.context.messages], ["earlier"])
+        self.assertEqual(CompletionAssistant.SPECULATION["discarded"], 1)
+
+    def test_flagged_after_completion_discards_it(self):
+        self.assertIsNone(self.speculate(SlowAdapter(0), moderation(True, 0.02)))
+        self.assertEqual([m.content for m in self.context.messages], ["earlier"])
+
+    def test_flagged_swallows_completion_error(self):
+        class BrokenAdapter(CountingAdapter):
+            async def get_chat_completion_async(self, context):
+                raise ConnectionError("down")
+
+        self.assertIsNone(self.speculate(BrokenAdapter(), moderation(True, 0.02)))
+
+    def test_moderation_error_cancels_completion(self):
+        async def failing_moderation():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("moderation down")
+
+        adapter = SlowAdapter(10)
+        with self.assertRaises(ConnectionError):
+            self.speculate(adapter, failing_moderation())
+
+        self.assertTrue(adapter.cancelled)
+        self.assertEqual(len(self.context.messages), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -51,6 +51,21 @@ class TestChatContext(unittest.TestCase):
         self.assertEqual(len(c.pre_load_data), 1)
         self.assertEqual(c.pre_load_data[-1].content, "Hello")
 
+    def test_add_pre_load_data_batch_rebuilds_prefix_once(self):
+        c = ChatContext()
+        version = c.version
+        c.add_pre_load_data(
+            UserMessage("question", None), AssistantMessage("answer"), UserMessage("again", None)
+        )
+        self.assertEqual([m.content for m in c.pre_load_data], ["question", "answer", "again"])
+        self.assertEqual(c.version, version + 1)
+
+    def test_add_pre_load_data_batch_rejects_non_content_message(self):
+        c = ChatContext()
+        with self.assertRaises(ValueError):
+            c.add_pre_load_data(UserMessage("Hello", None), "World")
+        self.assertEqual(c.pre_load_data, [])
+
     def test_add_pre_load_data_not_content_message(self):
         c = ChatContext()
         with self.assertRaises(ValueError):
@@ -81,6 +96,51 @@ class TestChatContext(unittest.TestCase):
         c._reduce_context()
         self.assertEqual(len(c.messages), 1)
 
+    def test_running_token_count_matches_recount(self):
+        c = ChatContext(system_prompt=SystemMessage("You are a helpful bot."), max_tokens=20)
+        c.add_pre_load_data(UserMessage("pre-load question"))
+        c.add_pre_load_data(AssistantMessage("pre-load answer"))
+        for i in range(10):
+            c.add_message(UserMessage(f"question number {i}"))
+            c.add_message(AssistantMessage(f"answer number {i}"))
+
+        self.assertLessEqual(c.context_length_in_tokens(), c.max_tokens)
+        self.assertEqual(c.context_length_in_tokens(), c._count_tokens())
+
+    def test_running_token_count_system_prompt_swap(self):
+        c = ChatContext()
+        c.add_message(UserMessage("Hello"))
+        c.add_pre_load_system_prompt(SystemMessage("A much longer system prompt"))
+        self.assertEqual(c.context_length_in_tokens(), c._count_tokens())
+
+    def test_verify_token_count(self):
+        c = ChatContext()
+        c.add_message(UserMessage("Hello"))
+        c._history._token_count += 1
+
+        ChatContext.VERIFY_TOKEN_COUNT = True
+        try:
+            with self.assertRaises(RuntimeError):
+                c.add_message(UserMessage("World"))
+        finally:
+            ChatContext.VERIFY_TOKEN_COUNT = False
+
+    def test_reduce_context_drops_whole_turns(self):
+        c = ChatContext(max_tokens=7)
+        c.add_message(UserMessage("first question"))
+        c.add_message(AssistantMessage("first answer"))
+        c.add_message(UserMessage("second question"))
+        c.add_message(AssistantMessage("second answer"))
+        c.add_message(UserMessage("third question"))
+
+        self.assertEqual(c.messages[0].content, "second question")
+        self.assertEqual(c.get_latest_message().content, "third question")
+
+    def test_reduce_context_keeps_latest_turn(self):
+        c = ChatContext(max_tokens=2)
+        c.add_message(UserMessage("this message is longer than the budget"))
+        self.assertEqual(len(c.messages), 1)
+
     def test_get_messages_as_list(self):
         c = ChatContext()
         c.messages = [UserMessage("Hello", None), UserMessage("World", None)]
@@ -93,6 +153,44 @@ class TestChatContext(unittest.TestCase):
 
         self.assertEqual(c.get_messages_as_list(), expected)
 
+    def test_get_messages_as_list_is_read_only(self):
+        c = ChatContext()
+        c.add_message(UserMessage("Hello"))
+        payload = c.get_messages_as_list()
+
+        with self.assertRaises(TypeError):
+            payload[-1]["role"] = "assistant"
+        with self.assertRaises(TypeError):
+            payload[0]["content"] = "new system prompt"
+        self.assertFalse(hasattr(payload, "append"))
+
+    def test_get_messages_as_list_tracks_eviction(self):
+        c = ChatContext(system_prompt=SystemMessage("Prompt"), max_tokens=6)
+        c.add_message(UserMessage("first question"))
+        c.add_message(AssistantMessage("first answer"))
+        c.add_message(UserMessage("second question"))
+
+        payload = c.get_messages_as_list()
+
+        self.assertEqual(len(payload), 2)
+        self.assertEqual(payload[0], {"role": "system", "content": "Prompt"})
+        self.assertEqual(payload[-1], {"role": "user", "content": "second question"})
+        self.assertEqual(payload[1:], [{"role": "user", "content": "second question"}])
+
+    def test_fork(self):
+        c = ChatContext(system_prompt=SystemMessage("Prompt"))
+        c.add_message(UserMessage("question"))
+
+        fork = c.fork()
+        fork.add_message(AssistantMessage("answer"))
+        fork.add_message(UserMessage("follow up"))
+
+        self.assertEqual([m.content for m in c.messages], ["question"])
+        self.assertEqual([m.content for m in fork.messages], ["question", "answer", "follow up"])
+        self.assertIs(fork.prefix, c.prefix)
+        self.assertEqual(fork.context_length_in_tokens(), fork._count_tokens())
+        self.assertEqual(c.context_length_in_tokens(), c._count_tokens())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from TalkTurbo.ApiAdapters.AdapterPool import AdapterPool
+from TalkTurbo.ApiAdapters.AnthropicAdapter import AnthropicAdapter
+from TalkTurbo.ApiAdapters.GoogleAdapter import GoogleAdapter
+from TalkTurbo.ApiAdapters.GroqAdapter import GroqAdapter
+from TalkTurbo.ApiAdapters.OpenAIAdapter import OpenAIAdapter
+from TalkTurbo.ClientRegistry import ClientRegistry
+
+
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        ClientRegistry.clear()
+        AdapterPool.clear()
+
+    def test_one_client_per_provider_and_key(self):
+        factory = Mock(side_effect=lambda api_key: object())
+
+        first = ClientRegistry.get("openai", "key-a", factory)
+        self.assertIs(ClientRegistry.get("openai", "key-a", factory), first)
+        self.assertIsNot(ClientRegistry.get("openai", "key-b", factory), first)
+        self.assertIsNot(ClientRegistry.get("groq", "key-a", factory), first)
+
+        self.assertEqual(factory.call_count, 3)
+        self.assertEqual(ClientRegistry.stats()["openai"], {"created": 2, "reused": 1})
+
+    def test_keys_are_not_stored(self):
+        ClientRegistry.get("openai", "sk-secret", lambda api_key: object())
+        self.assertNotIn("sk-secret", repr(ClientRegistry._CLIENTS))
+
+    def test_adapters_share_clients(self):
+        for adapter_class in (OpenAIAdapter, AnthropicAdapter, GroqAdapter):
+            model_a, model_b = adapter_class.AVAILABLE_MODELS[:2]
+            a = adapter_class(api_token="test", model_name=model_a)
+            b = adapter_class(api_token="test", model_name=model_b)
+            other_key = adapter_class(api_token="other", model_name=model_a)
+
+            for attribute in vars(a):
+                if attribute.endswith("_client"):
+                    self.assertIs(getattr(a, attribute), getattr(b, attribute))
+                    self.assertIsNot(getattr(a, attribute), getattr(other_key, attribute))
+
+    @patch("TalkTurbo.ApiAdapters.GoogleAdapter.genai.configure")
+    def test_google_configured_once_per_key(self, mock_configure):
+        GoogleAdapter(api_token="test")
+        GoogleAdapter(api_token="test")
+        GoogleAdapter(api_token="test", max_tokens=100)
+
+        mock_configure.assert_called_once_with(api_key="test")
+
+
+class TestAdapterPool(unittest.TestCase):
+    def setUp(self):
+        AdapterPool.clear()
+
+    def test_one_adapter_per_model(self):
+        first = AdapterPool.get(OpenAIAdapter, "test", "gpt-4o")
+
+        self.assertIs(AdapterPool.get(OpenAIAdapter, "test", "gpt-4o"), first)
+        self.assertIsNot(AdapterPool.get(OpenAIAdapter, "test", "gpt-4"), first)
+        self.assertIsNot(AdapterPool.get(OpenAIAdapter, "other", "gpt-4o"), first)
+        self.assertEqual(AdapterPool.size(), 3)
+
+    def test_kwargs_are_part_of_the_key(self):
+        short = AdapterPool.get(GroqAdapter, "test", "llama3-8b-8192", max_tokens=100)
+
+        self.assertIsNot(AdapterPool.get(GroqAdapter, "test", "llama3-8b-8192"), short)
+        self.assertEqual(short.max_tokens, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
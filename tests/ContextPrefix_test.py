@@ -0,0 +1,58 @@
+import unittest
+
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.ContextPrefix import ContextPrefix
+from TalkTurbo.Messages import AssistantMessage, SystemMessage, UserMessage
+from TalkTurbo.Tokenizers import TokenizerRegistry
+
+
+class TestContextPrefix(unittest.TestCase):
+    def setUp(self):
+        self.prefix = ContextPrefix(
+            SystemMessage("You are a cat."), [UserMessage("hi"), AssistantMessage("meow")]
+        )
+
+    def test_completion_dicts(self):
+        self.assertEqual(
+            self.prefix.completion_dicts,
+            (
+                {"role": "system", "content": "You are a cat."},
+                {"role": "user", "content": "hi"},
+                {"role": "assistant", "content": "meow"},
+            ),
+        )
+
+    def test_token_count(self):
+        counter = TokenizerRegistry.get()
+        expected = sum(
+            m.token_count(counter) for m in (self.prefix.system_prompt, *self.prefix.pre_load_data)
+        )
+        self.assertEqual(self.prefix.token_count(counter), expected)
+        self.assertEqual(self.prefix._token_counts, {counter.name: expected})
+
+    def test_copy_on_write(self):
+        prefix = self.prefix.with_pre_load_data(UserMessage("purr"))
+
+        self.assertEqual(len(self.prefix.pre_load_data), 2)
+        self.assertEqual(len(prefix.pre_load_data), 3)
+        self.assertIs(prefix.system_prompt, self.prefix.system_prompt)
+
+        prefix = self.prefix.with_system_prompt(SystemMessage("You are a dog."))
+        self.assertEqual(self.prefix.system_prompt.content, "You are a cat.")
+        self.assertEqual(prefix.system_prompt.content, "You are a dog.")
+
+    def test_contexts_share_prefix(self):
+        c1 = ChatContext(prefix=self.prefix)
+        c2 = ChatContext(prefix=self.prefix)
+        self.assertIs(c1.prefix, c2.prefix)
+
+        c1.add_pre_load_data(UserMessage("purr"))
+
+        self.assertIsNot(c1.prefix, self.prefix)
+        self.assertIs(c2.prefix, self.prefix)
+        self.assertEqual(len(c1.pre_load_data), 3)
+        self.assertEqual(len(c2.pre_load_data), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from TalkTurbo.ExecutorPool import BoundedExecutor, ExecutorPool
+
+
+class TestBoundedExecutor(unittest.TestCase):
+    def test_runs_call(self):
+        executor = BoundedExecutor("test", 2)
+        result = asyncio.run(executor.run(lambda a, b=0: a + b, 1, b=2))
+        self.assertEqual(result, 3)
+        self.assertEqual(executor.wait_times.count, 1)
+
+    def test_bounded_concurrency(self):
+        executor = BoundedExecutor("test", 2)
+        release = threading.Event()
+        observed = []
+
+        async def main():
+            calls = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(5)]
+            while executor.running < 2:
+                await asyncio.sleep(0.001)
+            observed.append((executor.running, executor.queue_depth))
+            release.set()
+            await asyncio.gather(*calls)
+
+        asyncio.run(main())
+
+        self.assertEqual(observed, [(2, 3)])
+        self.assertEqual(executor.queue_depth, 0)
+        self.assertEqual(executor.running, 0)
+
+    def test_wait_time_recorded(self):
+        executor = BoundedExecutor("test", 1)
+
+        async def main():
+            await asyncio.gather(*(executor.run(time.sleep, 0.02) for _ in range(3)))
+
+        asyncio.run(main())
+
+        self.assertEqual(executor.wait_times.count, 3)
+        self.assertGreaterEqual(executor.wait_times.percentile(100), 0.03)
+
+    def test_cancelled_before_start_leaves_queue(self):
+        executor = BoundedExecutor("test", 1)
+        release = threading.Event()
+
+        async def main():
+            blocker = asyncio.ensure_future(executor.run(release.wait))
+            waiting = asyncio.ensure_future(executor.run(int, "1"))
+            while executor.running < 1 or executor.queue_depth < 1:
+                await asyncio.sleep(0.001)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            depth = executor.queue_depth
+            release.set()
+            await blocker
+            return depth
+
+        self.assertEqual(asyncio.run(main()), 0)
+        self.assertEqual(executor.queue_depth, 0)
+        self.assertEqual(executor.running, 0)
+
+    def test_errors_propagate(self):
+        executor = BoundedExecutor("test", 1)
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(executor.run(fail))
+        self.assertEqual(executor.running, 0)
+
+
+class TestExecutorPool(unittest.TestCase):
+    def test_per_provider_sizes(self):
+        pool = ExecutorPool({"openai": 8}, default_size=2)
+        self.assertEqual(pool.get("openai").max_workers, 8)
+        self.assertEqual(pool.get("groq").max_workers, 2)
+        self.assertIs(pool.get("openai"), pool.get("openai"))
+
+    def test_stats(self):
+        pool = ExecutorPool()
+        asyncio.run(pool.run("openai", int, "1"))
+        self.assertEqual(set(pool.stats()), {"openai"})
+        self.assertEqual(pool.stats()["openai"]["queue_depth"], 0)
+
+    def test_parse_pool_sizes(self):
+        self.assertEqual(
+            ExecutorPool.parse_pool_sizes("openai=8, dalle=2"), {"openai": 8, "dalle": 2}
+        )
+        self.assertEqual(ExecutorPool.parse_pool_sizes(""), {})
+        for spec in ("openai", "openai=0", "=3", "openai=x"):
+            with self.assertRaises(ValueError):
+                ExecutorPool.parse_pool_sizes(spec)
+
+
+if __name__ == "__main__":
+    unittest.main()
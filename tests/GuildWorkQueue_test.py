@@ -0,0 +1,145 @@
+import asyncio
+import unittest
+
+from TalkTurbo.GuildWorkQueue import GuildWorkQueue
+
+
+class TestGuildWorkQueue(unittest.TestCase):
+    def test_jobs_run_one_at_a_time_in_order(self):
+        queue = GuildWorkQueue()
+        events = []
+
+        def job(name: str):
+            async def run():
+                events.append(f"start {name}")
+                await asyncio.sleep(0.01)
+                events.append(f"end {name}")
+                return name
+
+            return run
+
+        async def main():
+            return await asyncio.gather(*(queue.run(job(name)) for name in "abc"))
+
+        self.assertEqual(asyncio.run(main()), ["a", "b", "c"])
+        self.assertEqual(events, ["start a", "end a", "start b", "end b", "start c", "end c"])
+
+    def test_errors_reach_the_caller(self):
+        queue = GuildWorkQueue()
+
+        async def fail():
+            raise ValueError("boom")
+
+        async def succeed():
+            return "ok"
+
+        async def main():
+            return await asyncio.gather(queue.run(fail), queue.run(succeed), return_exceptions=True)
+
+        failed, succeeded = asyncio.run(main())
+        self.assertIsInstance(failed, ValueError)
+        self.assertEqual(succeeded, "ok")
+
+    def test_cancelled_handler_fails_its_batch(self):
+        queue = GuildWorkQueue(coalesce_window=0.01, max_batch=3)
+
+        async def cancelled(items):
+            raise asyncio.CancelledError()
+
+        async def double(items):
+            return [item * 2 for item in items]
+
+        async def main():
+            batch = [asyncio.ensure_future(queue.run_batched(i, cancelled)) for i in range(2)]
+            done, pending = await asyncio.wait(batch, timeout=1)
+            # the queue still works through later jobs
+            later = await asyncio.wait_for(queue.run_batched(3, double), timeout=1)
+            return [future.cancelled() for future in done], len(pending), later
+
+        self.assertEqual(asyncio.run(main()), ([True, True], 0, 6))
+
+    def test_cancelled_worker_fails_queued_jobs(self):
+        queue = GuildWorkQueue(coalesce_window=0.05)
+
+        async def double(items):
+            return [item * 2 for item in items]
+
+        async def main():
+            jobs = [asyncio.ensure_future(queue.run_batched(i, double)) for i in range(2)]
+            await asyncio.sleep(0.01)
+            queue._worker.cancel()
+            done, pending = await asyncio.wait(jobs, timeout=1)
+            return [future.cancelled() for future in done], len(pending)
+
+        self.assertEqual(asyncio.run(main()), ([True, True], 0))
+
+    def test_short_result_list_fails_the_rest(self):
+        queue = GuildWorkQueue(coalesce_window=0.01, max_batch=3)
+
+        async def first_only(items):
+            return [items[0]]
+
+        async def main():
+            return await asyncio.gather(
+                *(queue.run_batched(i, first_only) for i in range(2)), return_exceptions=True
+            )
+
+        first, second = asyncio.run(main())
+        self.assertEqual(first, 0)
+        self.assertIsInstance(second, RuntimeError)
+
+    def test_no_coalescing_by_default(self):
+        queue = GuildWorkQueue()
+        batches = []
+
+        async def handler(items):
+            batches.append(items)
+            return [item * 2 for item in items]
+
+        async def main():
+            return await asyncio.gather(*(queue.run_batched(i, handler) for i in range(3)))
+
+        self.assertEqual(asyncio.run(main()), [0, 2, 4])
+        self.assertEqual(batches, [[0], [1], [2]])
+        self.assertEqual(queue.requests_saved, 0)
+
+    def test_burst_is_coalesced(self):
+        queue = GuildWorkQueue(coalesce_window=0.01, max_batch=3)
+        batches = []
+
+        async def handler(items):
+            batches.append(items)
+            return [item * 2 for item in items]
+
+        async def main():
+            return await asyncio.gather(*(queue.run_batched(i, handler) for i in range(5)))
+
+        self.assertEqual(asyncio.run(main()), [0, 2, 4, 6, 8])
+        self.assertEqual(batches, [[0, 1, 2], [3, 4]])
+        self.assertEqual(queue.stats()["batched_jobs"], 5)
+        self.assertEqual(queue.requests_saved, 3)
+
+    def test_plain_jobs_are_not_coalesced_past(self):
+        queue = GuildWorkQueue(coalesce_window=0.01)
+        events = []
+
+        async def handler(items):
+            events.append(list(items))
+            return items
+
+        async def job():
+            events.append("job")
+
+        async def main():
+            await asyncio.gather(
+                queue.run_batched(1, handler),
+                queue.run(job),
+                queue.run_batched(2, handler),
+            )
+
+        asyncio.run(main())
+        self.assertEqual(events, [[1], "job", [2]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from TalkTurbo.ClientRegistry import ClientRegistry
+from TalkTurbo.KeyPool import KeyPool, KeyPoolRegistry, PooledClient, retry_after_seconds
+from TalkTurbo.OpenAIModelAssistant import OpenAIModelAssistant
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+MODERATION = {
+    "id": "modr-1",
+    "model": "text-moderation-latest",
+    "results": [{"flagged": False, "categories": {}, "category_scores": {}}],
+}
+
+
+class QuotaProvider:
+    """A local stand-in for the api that reports each key's remaining quota in headers."""
+
+    def __init__(self, quotas: dict[str, int], throttled: set = frozenset()):
+        self.quotas = dict(quotas)
+        self.throttled = set(throttled)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        key = request.headers["authorization"].removeprefix("Bearer ")
+        self.requests.append(key)
+        if key in self.throttled:
+            return httpx.Response(429, headers={"retry-after": "10"}, json={"error": {}})
+
+        self.quotas[key] -= 1
+        return httpx.Response(
+            200,
+            headers={"x-ratelimit-remaining-requests": str(self.quotas[key])},
+            json=MODERATION,
+        )
+
+    def http_client_class(self, base: type = httpx.Client) -> type:
+        provider = self
+
+        class LocalHttpClient(base):
+            def __init__(self, **kwargs):
+                super().__init__(transport=httpx.MockTransport(provider), **kwargs)
+
+        return LocalHttpClient
+
+
+class TestKeyPool(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.pool = KeyPool("openai", ["key-a", "key-b", "key-c"], cooldown=30, clock=self.clock)
+        self.a, self.b, self.c = self.pool.keys
+
+    def acquire_many(self, count: int) -> list[str]:
+        keys = []
+        for _ in range(count):
+            keys.append(self.pool.acquire().key)
+            self.clock.now += 0.01
+        return keys
+
+    def test_round_robin_without_quota_reports(self):
+        self.assertEqual(self.acquire_many(6), ["key-a", "key-b", "key-c"] * 2)
+
+    def test_prefers_most_remaining_quota(self):
+        self.pool.record_response(self.a, 200, {"x-ratelimit-remaining-requests": "5"})
+        self.pool.record_response(self.b, 200, {"x-ratelimit-remaining-requests": "50"})
+        self.pool.record_response(self.c, 200, {"x-ratelimit-remaining-requests": "20"})
+
+        self.assertEqual(self.pool.acquire(), self.b)
+        self.assertEqual(self.b.remaining_requests, 49)
+
+    def test_unreported_keys_are_tried_first(self):
+        self.pool.record_response(self.a, 200, {"x-ratelimit-remaining-requests": "500"})
+        self.assertNotEqual(self.pool.acquire(), self.a)
+
+    def test_anthropic_headers(self):
+        self.pool.record_response(
+            self.a,
+            200,
+            {
+                "anthropic-ratelimit-requests-remaining": "3",
+                "anthropic-ratelimit-tokens-remaining": "1000",
+            },
+        )
+        self.assertEqual((self.a.remaining_requests, self.a.remaining_tokens), (3, 1000))
+
+    def test_throttled_key_cools_down(self):
+        self.pool.record_response(self.a, 429, {"retry-after": "10"})
+
+        self.assertNotIn("key-a", self.acquire_many(4))
+        self.assertEqual(self.a.throttles, 1)
+
+        self.clock.now = 10
+        self.assertIn("key-a", self.acquire_many(3))
+
+    def test_throttled_without_retry_after(self):
+        self.pool.record_response(self.a, 429, {})
+        self.assertEqual(self.a.cooldown_until, 30)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_after_seconds({"retry-after-ms": "250", "retry-after": "1"}), 0.25)
+        self.assertEqual(retry_after_seconds({"retry-after": "1.5"}), 1.5)
+        self.assertIsNone(retry_after_seconds({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+        self.assertIsNone(retry_after_seconds({}))
+
+    def test_exhausted_key_cools_down_until_reset(self):
+        self.pool.record_response(
+            self.a,
+            200,
+            {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m30s"},
+        )
+        self.assertEqual(self.a.cooldown_until, 90)
+
+    def test_all_cooling_down_uses_first_to_recover(self):
+        for key, seconds in ((self.a, "30"), (self.b, "5"), (self.c, "10")):
+            self.pool.record_response(key, 429, {"retry-after": seconds})
+
+        self.assertEqual(self.pool.acquire(), self.b)
+
+    def test_parse_keys(self):
+        self.assertEqual(KeyPool.parse_keys(" key-a, key-b,,"), ["key-a", "key-b"])
+        self.assertEqual(KeyPool.parse_keys(None), [])
+
+    def test_needs_keys(self):
+        with self.assertRaises(ValueError):
+            KeyPool("openai", [])
+
+    def test_stats_hide_keys(self):
+        pool = KeyPool("openai", ["sk-secret-1234"])
+        self.assertEqual(pool.stats()[0]["key"], "...1234")
+
+
+class TestPooledClient(unittest.TestCase):
+    def setUp(self):
+        ClientRegistry.clear()
+        KeyPoolRegistry.clear()
+
+    def test_single_key_gets_a_plain_client(self):
+        client = KeyPoolRegistry.client("openai", "key-a", OpenAI, httpx.Client)
+        self.assertIsInstance(client, OpenAI)
+
+    def test_spreads_requests_by_reported_quota(self):
+        provider = QuotaProvider({"key-a": 3, "key-b": 100})
+        client = KeyPoolRegistry.client(
+            "openai", "key-a,key-b", OpenAI, provider.http_client_class()
+        )
+        self.assertIsInstance(client, PooledClient)
+
+        for _ in range(10):
+            client.moderations.create(input="hello")
+
+        # one request each to learn the quotas, then key-b has far more left
+        self.assertEqual(provider.requests[:2], ["key-a", "key-b"])
+        self.assertEqual(provider.requests[2:].count("key-a"), 0)
+
+    def test_throttled_key_is_skipped(self):
+        provider = QuotaProvider({"key-a": 100, "key-b": 100}, throttled={"key-a"})
+        client = KeyPoolRegistry.client(
+            "openai", "key-a,key-b", OpenAI, provider.http_client_class()
+        )
+        pool = KeyPoolRegistry.get("openai", "key-a,key-b")
+
+        with self.assertRaises(Exception):
+            client.with_options(max_retries=0).moderations.create(input="hello")
+        for _ in range(5):
+            client.moderations.create(input="hello")
+
+        self.assertEqual(provider.requests, ["key-a"] + ["key-b"] * 5)
+        self.assertEqual(pool.keys[0].throttles, 1)
+
+    def test_async_client_reports_quota(self):
+        provider = QuotaProvider({"key-a": 10, "key-b": 10})
+        client = KeyPoolRegistry.client(
+            "openai", "key-a,key-b", AsyncOpenAI, provider.http_client_class(httpx.AsyncClient)
+        )
+
+        async def moderate():
+            for _ in range(4):
+                await client.moderations.create(input="hello")
+
+        asyncio.run(moderate())
+
+        remaining = [
+            key.remaining_requests for key in KeyPoolRegistry.get("openai", "key-a,key-b").keys
+        ]
+        self.assertEqual(remaining, [8, 8])
+
+
+class TestAssistantKeyPool(unittest.TestCase):
+    def test_rest_calls_draw_keys_from_pool(self):
+        pool = KeyPool("openai", ["key-a", "key-b"])
+        response = SimpleNamespace(
+            status_code=429, headers={"retry-after": "5"}, json=lambda: MODERATION
+        )
+
+        with patch.object(OpenAIModelAssistant.session(), "post", return_value=response) as post:
+            OpenAIModelAssistant.get_moderation_score("hi", "ignored", key_pool=pool)
+            OpenAIModelAssistant.get_moderation_score("hi", "ignored", key_pool=pool)
+
+        authorizations = [call.kwargs["headers"]["authorization"] for call in post.call_args_list]
+        self.assertEqual(authorizations, ["Bearer key-a", "Bearer key-b"])
+        self.assertEqual([key.throttles for key in pool.keys], [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from TalkTurbo.MessageHistory import MessageHistory
+from TalkTurbo.Messages import AssistantMessage, UserMessage
+
+
+class TestMessageHistory(unittest.TestCase):
+    def test_empty(self):
+        history = MessageHistory()
+        self.assertEqual(len(history), 0)
+        self.assertEqual(history.turn_count, 0)
+        self.assertEqual(list(history), [])
+        with self.assertRaises(IndexError):
+            history.latest()
+
+    def test_turn_boundaries(self):
+        history = MessageHistory()
+        history.append(UserMessage("hi"), 1)
+        history.append(AssistantMessage("hello"), 2)
+        history.append(UserMessage("how are you?"), 3)
+
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history.turn_count, 2)
+        self.assertEqual(history.token_count, 6)
+        self.assertEqual(history.latest().content, "how are you?")
+
+    def test_evict_oldest_turn_drops_reply(self):
+        history = MessageHistory()
+        history.append(UserMessage("hi"), 1)
+        history.append(AssistantMessage("hello"), 2)
+        history.append(UserMessage("how are you?"), 3)
+
+        freed = history.evict_oldest_turn()
+
+        self.assertEqual(freed, 3)
+        self.assertEqual([m.content for m in history], ["how are you?"])
+        self.assertEqual(history.token_count, 3)
+
+    def test_leading_assistant_message_is_its_own_turn(self):
+        history = MessageHistory(
+            [AssistantMessage("welcome!"), UserMessage("thanks")], token_counts=[2, 1]
+        )
+        self.assertEqual(history.turn_count, 2)
+
+        history.evict_oldest_turn()
+        self.assertEqual([m.content for m in history], ["thanks"])
+
+    def test_reversed(self):
+        history = MessageHistory([UserMessage("a"), AssistantMessage("b"), UserMessage("c")])
+        self.assertEqual([m.content for m in reversed(history)], ["c", "b", "a"])
+
+    def test_appended_and_evicted_counts(self):
+        history = MessageHistory([UserMessage("a"), AssistantMessage("b"), UserMessage("c")])
+        history.evict_oldest_turn()
+        history.append(AssistantMessage("d"), 0)
+
+        self.assertEqual(history.appended_count, 4)
+        self.assertEqual(history.evicted_count, 2)
+        self.assertEqual([m.content for m in history.tail(2)], ["c", "d"])
+        self.assertEqual(history.tail(0), [])
+
+    def test_recount(self):
+        history = MessageHistory([UserMessage("ab"), AssistantMessage("cdef")], [1, 1])
+        history.recount(lambda message: len(message.content))
+        self.assertEqual(history.token_count, 6)
+        self.assertEqual(history.evict_oldest_turn(), 6)
+
+    def test_copy_is_independent(self):
+        history = MessageHistory([UserMessage("hi")], [1])
+        copy = history.copy()
+        copy.append(AssistantMessage("hello"), 2)
+        copy.append(UserMessage("bye"), 3)
+
+        self.assertEqual([m.content for m in history], ["hi"])
+        self.assertEqual((history.token_count, history.appended_count), (1, 1))
+        self.assertEqual([m.content for m in copy], ["hi", "hello", "bye"])
+        self.assertEqual((copy.token_count, copy.turn_count), (6, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
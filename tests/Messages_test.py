@@ -1,36 +1,62 @@
+import asyncio
+import copy
+import json
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+
+from openai.types import ModerationCreateResponse
 
 from TalkTurbo.Messages import (
     AssistantMessage,
     ContentMessage,
+    FrozenDict,
     MessageRole,
     SystemMessage,
     UserMessage,
 )
-from TalkTurbo.Moderations import CategoryFlags, CategoryScores
+from TalkTurbo.ModerationCache import MODERATION_CACHE
+from TalkTurbo.Moderations import (
+    CATEGORIES,
+    CategoryFlags,
+    CategoryScores,
+    ModerationThresholds,
+    PreModerationFilter,
+)
+
+# the endpoint's categories, including ones TalkTurbo does not track
+API_CATEGORIES = CATEGORIES + ("illicit", "illicit/violent")
 
-# Mock response for moderation
-mock_moderation_response = {
-    "results": [
+
+def moderation_response(scores: dict) -> ModerationCreateResponse:
+    """A moderation response as the SDK returns it, with scores keyed by category."""
+    category_scores = {category: scores.get(category, 0.01) for category in API_CATEGORIES}
+    return ModerationCreateResponse.model_validate(
         {
-            "flagged": True,
-            "categories": {
-                "sexual": False,
-                # ... other categories ...
-                "violence": True,
-            },
-            "category_scores": {
-                "sexual": 0.1,
-                # ... other categories ...
-                "violence": 0.9,
-            },
+            "id": "modr-1",
+            "model": "text-moderation-latest",
+            "results": [
+                {
+                    "flagged": any(score > 0.5 for score in category_scores.values()),
+                    "categories": {
+                        category: score > 0.5 for category, score in category_scores.items()
+                    },
+                    "category_scores": category_scores,
+                    "category_applied_input_types": {
+                        category: ["text"] for category in API_CATEGORIES
+                    },
+                }
+            ],
         }
-    ]
-}
+    )
+
+
+mock_moderation_response = moderation_response({"self-harm/intent": 0.9, "violence": 0.6})
 
 
 class TestMessageClasses(unittest.TestCase):
+    def setUp(self):
+        MODERATION_CACHE.clear()
+
     def test_content_message_creation(self):
         msg = ContentMessage(MessageRole.USER, "Hello, world!")
 
@@ -40,46 +66,142 @@ class TestMessageClasses(unittest.TestCase):
         self.assertIsNotNone(msg.encoding)
         self.assertTrue(isinstance(msg.encoding_length_in_tokens, int))
 
-    @patch("TalkTurbo.Messages.json.loads", autospec=True)
+    def test_messages_are_slotted(self):
+        msg = UserMessage("Hello, world!")
+        self.assertFalse(hasattr(msg, "__dict__"))
+        self.assertIsInstance(msg.created_on_utc, int)
+        self.assertIn("Hello, world!", str(msg))
+
+    def test_token_count_is_lazy(self):
+        msg = UserMessage("Hello, world!")
+        self.assertIsNone(msg._encoding_length_in_tokens)
+
+        length = msg.encoding_length_in_tokens
+
+        self.assertEqual(msg._encoding_length_in_tokens, length)
+        self.assertEqual(len(msg.encoding), length)
+
     @patch("TalkTurbo.Messages.OPENAI_CLIENT.moderations.create", autospec=True)
-    def test_moderation(self, mock_create: Mock, mock_loads: Mock):
-        mock_loads.return_value = mock_moderation_response
+    def test_moderation(self, mock_create: Mock):
+        mock_create.return_value = mock_moderation_response
         msg = ContentMessage(MessageRole.USER, "Some potentially sensitive content")
         msg.moderate()
 
-        self.assertTrue(msg._flagged)
-        self.assertIsInstance(msg._category_flags, CategoryFlags)
-        self.assertIsInstance(msg._category_scores, CategoryScores)
+        self.assertTrue(msg._moderation.flagged)
+        self.assertIsInstance(msg._moderation.category_flags, CategoryFlags)
+        self.assertIsInstance(msg._moderation.category_scores, CategoryScores)
+        self.assertEqual(msg.get_max_category(), ("self-harm/intent", 0.9))
+        self.assertTrue(msg.get_category_flags().self_harm_intent)
+
+    @patch("TalkTurbo.Messages.OPENAI_CLIENT.moderations.create", autospec=True)
+    def test_thresholds_on_every_category(self, mock_create: Mock):
+        for category in CATEGORIES:
+            MODERATION_CACHE.clear()
+            mock_create.return_value = moderation_response({category: 0.4})
+            msg = UserMessage("Some content")
+
+            self.assertFalse(msg.flagged(), category)
+            self.assertTrue(msg.flagged(ModerationThresholds({category: 0.3})), category)
+            self.assertEqual(msg.get_max_category(), (category, 0.4))
 
-    @patch("TalkTurbo.Messages.json.loads", autospec=True)
     @patch("TalkTurbo.Messages.OPENAI_CLIENT.moderations.create", autospec=True)
-    def test_flagged_method(self, mock_create: Mock, mock_loads: Mock):
-        mock_loads.return_value = mock_moderation_response
+    def test_flagged_method(self, mock_create: Mock):
+        mock_create.return_value = mock_moderation_response
         msg = ContentMessage(MessageRole.USER, "Some content")
 
         result = msg.flagged()
 
         self.assertTrue(result)
 
-    @patch("TalkTurbo.Messages.json.loads", autospec=True)
+    @patch("TalkTurbo.Messages.ASYNC_OPENAI_CLIENT.moderations.create", new_callable=AsyncMock)
+    def test_flagged_async_method(self, mock_create: AsyncMock):
+        mock_create.return_value = mock_moderation_response
+        msg = ContentMessage(MessageRole.USER, "Some content")
+
+        result = asyncio.run(msg.flagged_async())
+
+        self.assertTrue(result)
+        mock_create.assert_awaited_once()
+
+        # the result is kept, so later checks don't moderate again
+        self.assertTrue(asyncio.run(msg.flagged_async()))
+        mock_create.assert_awaited_once()
+
+    @patch("TalkTurbo.Messages.OPENAI_CLIENT.moderations.create", autospec=True)
+    def test_moderation_is_cached(self, mock_create: Mock):
+        mock_create.return_value = mock_moderation_response
+
+        self.assertTrue(UserMessage("Some  content ").flagged())
+        second = UserMessage("Some content")
+
+        self.assertTrue(second.flagged())
+        mock_create.assert_called_once()
+        self.assertEqual(second.get_category_scores().self_harm_intent, 0.9)
+
+    @patch("TalkTurbo.Messages.ASYNC_OPENAI_CLIENT.moderations.create", new_callable=AsyncMock)
+    def test_moderate_async_uses_cache(self, mock_create: AsyncMock):
+        # cached before dumps kept the endpoint's category names
+        cached = json.loads(mock_moderation_response.model_dump_json())
+        MODERATION_CACHE.put("Some content", "text-moderation-latest", cached)
+
+        message = UserMessage("Some content")
+        self.assertTrue(asyncio.run(message.flagged_async()))
+        self.assertEqual(message.get_max_category(), ("self-harm/intent", 0.9))
+        mock_create.assert_not_awaited()
+
     @patch("TalkTurbo.Messages.OPENAI_CLIENT.moderations.create", autospec=True)
-    def test_get_category_flags_method(self, mock_create: Mock, mock_loads: Mock):
-        mock_loads.return_value = mock_moderation_response
+    def test_pre_moderate(self, mock_create: Mock):
+        pre_filter = PreModerationFilter(["badword"])
+
+        rejected = UserMessage("badword")
+        self.assertTrue(rejected.pre_moderate(pre_filter))
+        self.assertTrue(rejected.flagged())
+        self.assertEqual(rejected.get_category_scores().harassment, 1.0)
+
+        allowed = UserMessage("hello!")
+        self.assertTrue(allowed.pre_moderate(pre_filter))
+        self.assertFalse(allowed.flagged())
+
+        self.assertFalse(UserMessage("tell me a story").pre_moderate(pre_filter))
+        mock_create.assert_not_called()
+
+    @patch("TalkTurbo.Messages.OPENAI_CLIENT.moderations.create", autospec=True)
+    def test_get_category_flags_method(self, mock_create: Mock):
+        mock_create.return_value = mock_moderation_response
         msg = ContentMessage(MessageRole.USER, "Some content")
 
         result = msg.get_category_flags()
 
         self.assertIsInstance(result, CategoryFlags)
 
-    @patch("TalkTurbo.Messages.json.loads", autospec=True)
     @patch("TalkTurbo.Messages.OPENAI_CLIENT.moderations.create", autospec=True)
-    def test_get_category_scores_method(self, mock_create: Mock, mock_loads: Mock):
-        mock_loads.return_value = mock_moderation_response
+    def test_get_category_scores_method(self, mock_create: Mock):
+        mock_create.return_value = mock_moderation_response
         msg = ContentMessage(MessageRole.USER, "Some content")
         result = msg.get_category_scores()
 
         self.assertIsInstance(result, CategoryScores)
 
+    def test_get_max_category(self):
+        MODERATION_CACHE.put(
+            "Some content",
+            "text-moderation-latest",
+            {
+                "results": [
+                    {
+                        "flagged": False,
+                        "categories": {},
+                        "category_scores": {"hate": 0.7, "violence": 0.2},
+                    }
+                ]
+            },
+        )
+        msg = UserMessage("Some content")
+
+        self.assertEqual(msg.get_max_category(), ("hate", 0.7))
+        self.assertFalse(msg.flagged())
+        self.assertTrue(msg.flagged(ModerationThresholds({"hate": 0.5})))
+
     def test_system_message_creation(self):
         msg = SystemMessage("System message")
 
@@ -105,6 +227,20 @@ class TestMessageClasses(unittest.TestCase):
 
         self.assertEqual(completion_dict, {"role": MessageRole.ASSISTANT.value, "content": content})
 
+    def test_frozen_dict(self):
+        frozen = FrozenDict({"role": "user", "content": "hi"})
+
+        with self.assertRaises(TypeError):
+            frozen["role"] = "assistant"
+        with self.assertRaises(TypeError):
+            frozen.update(role="assistant")
+
+        self.assertEqual(frozen, {"role": "user", "content": "hi"})
+        self.assertEqual(copy.deepcopy(frozen), frozen)
+        mutable = frozen.copy()
+        mutable["role"] = "assistant"
+        self.assertEqual(frozen["role"], "user")
+
 
 if __name__ == "__main__":
     unittest.main()
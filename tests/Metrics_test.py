@@ -0,0 +1,32 @@
+import unittest
+
+from TalkTurbo.Metrics import LatencyStats
+
+
+class TestLatencyStats(unittest.TestCase):
+    def test_empty(self):
+        stats = LatencyStats()
+        self.assertEqual(stats.p50, 0.0)
+        self.assertEqual(stats.stats(), {"count": 0, "p50": 0.0, "p95": 0.0})
+
+    def test_percentiles(self):
+        stats = LatencyStats()
+        for i in range(1, 101):
+            stats.record(i / 1000)
+
+        self.assertAlmostEqual(stats.p50, 0.051)
+        self.assertAlmostEqual(stats.p95, 0.096)
+        self.assertEqual(stats.count, 100)
+
+    def test_window(self):
+        stats = LatencyStats(window=10)
+        for i in range(100):
+            stats.record(float(i))
+
+        self.assertEqual(len(stats), 10)
+        self.assertEqual(stats.count, 100)
+        self.assertGreaterEqual(stats.p50, 90.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from openai.types import ModerationCreateResponse
+
+from TalkTurbo.Messages import UserMessage
+from TalkTurbo.ModerationBatcher import MODERATION_BATCHER, ModerationBatcher
+from TalkTurbo.ModerationCache import MODERATION_CACHE
+from TalkTurbo.Moderations import CATEGORIES
+
+
+def result(content: str) -> dict:
+    flagged = "bad" in content
+    return {
+        "flagged": flagged,
+        "categories": {"hate": flagged},
+        "category_scores": {"hate": 0.9 if flagged else 0.1},
+    }
+
+
+def moderation_response(contents: list[str]) -> ModerationCreateResponse:
+    """The SDK's response to moderating contents, flagging self-harm in the bad ones."""
+    categories = CATEGORIES + ("illicit", "illicit/violent")
+    results = []
+    for content in contents:
+        flagged = "bad" in content
+        scores = {category: 0.01 for category in categories}
+        scores["self-harm"] = 0.9 if flagged else 0.1
+        results.append(
+            {
+                "flagged": flagged,
+                "categories": {category: score > 0.5 for category, score in scores.items()},
+                "category_scores": scores,
+                "category_applied_input_types": {category: ["text"] for category in categories},
+            }
+        )
+
+    return ModerationCreateResponse.model_validate(
+        {"id": "modr-1", "model": "text-moderation-latest", "results": results}
+    )
+
+
+class FakeModerations:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests: list[tuple[list[str], str]] = []
+
+    async def __call__(self, contents: list[str], model: str) -> list[dict]:
+        self.requests.append((contents, model))
+        await asyncio.sleep(self.delay)
+        return [result(content) for content in contents]
+
+
+class TestModerationBatcher(unittest.TestCase):
+    def setUp(self):
+        self.send = FakeModerations()
+        self.batcher = ModerationBatcher(window=0.01, max_batch=4, send=self.send)
+
+    def moderate_all(self, contents: list[str], model: str = "model") -> list[dict]:
+        async def run():
+            return await asyncio.gather(
+                *(self.batcher.moderate(content, model) for content in contents)
+            )
+
+        return asyncio.run(run())
+
+    def test_one_request_per_window(self):
+        responses = self.moderate_all(["fine", "bad words", "also fine"])
+
+        self.assertEqual(self.send.requests, [(["fine", "bad words", "also fine"], "model")])
+        self.assertEqual(
+            [response["results"][0]["flagged"] for response in responses], [False, True, False]
+        )
+        self.assertEqual(self.batcher.stats()["requests_saved"], 2)
+
+    def test_max_batch_closes_the_batch(self):
+        self.moderate_all([f"message {i}" for i in range(10)])
+
+        self.assertEqual([len(contents) for contents, _ in self.send.requests], [4, 4, 2])
+        self.assertEqual((self.batcher.items, self.batcher.batches), (10, 3))
+
+    def test_identical_contents_sent_once(self):
+        responses = self.moderate_all(["bad", "bad", "ok"])
+
+        self.assertEqual(self.send.requests, [(["bad", "ok"], "model")])
+        self.assertTrue(responses[1]["results"][0]["flagged"])
+
+    def test_batches_per_model(self):
+        async def run():
+            return await asyncio.gather(
+                self.batcher.moderate("a", "model-a"), self.batcher.moderate("b", "model-b")
+            )
+
+        asyncio.run(run())
+
+        self.assertCountEqual(self.send.requests, [(["a"], "model-a"), (["b"], "model-b")])
+
+    def test_failure_reaches_every_caller(self):
+        async def fail(contents, model):
+            raise ConnectionError("down")
+
+        self.batcher = ModerationBatcher(window=0.01, send=fail)
+
+        async def run():
+            return await asyncio.gather(
+                self.batcher.moderate("a", "model"),
+                self.batcher.moderate("b", "model"),
+                return_exceptions=True,
+            )
+
+        self.assertTrue(all(isinstance(error, ConnectionError) for error in asyncio.run(run())))
+
+    def test_short_result_list_reaches_every_caller(self):
+        async def short(contents, model):
+            return [result(content) for content in contents[:1]]
+
+        self.batcher = ModerationBatcher(window=0.01, send=short)
+
+        async def run():
+            return await asyncio.wait_for(
+                asyncio.gather(
+                    self.batcher.moderate("a", "model"),
+                    self.batcher.moderate("b", "model"),
+                    return_exceptions=True,
+                ),
+                timeout=1,
+            )
+
+        self.assertTrue(all(isinstance(error, ValueError) for error in asyncio.run(run())))
+
+    def test_enabled(self):
+        self.assertTrue(self.batcher.enabled)
+        self.batcher.configure(window=0)
+        self.assertFalse(self.batcher.enabled)
+        self.batcher.configure(window=0.01, max_batch=1)
+        self.assertFalse(self.batcher.enabled)
+
+
+class TestMessagesUseBatcher(unittest.TestCase):
+    def setUp(self):
+        MODERATION_CACHE.clear()
+        MODERATION_BATCHER.configure(window=0.01, max_batch=32)
+        self.addCleanup(MODERATION_BATCHER.configure, window=0.0)
+
+    @patch("TalkTurbo.Messages.ASYNC_OPENAI_CLIENT.moderations.create", new_callable=AsyncMock)
+    def test_messages_share_a_request(self, mock_create: AsyncMock):
+        mock_create.side_effect = lambda input, model: moderation_response(input)
+        messages = [UserMessage("hello"), UserMessage("bad words"), UserMessage("bye")]
+
+        async def run():
+            return await asyncio.gather(*(message.flagged_async() for message in messages))
+
+        self.assertEqual(asyncio.run(run()), [False, True, False])
+        mock_create.assert_awaited_once_with(
+            input=["hello", "bad words", "bye"], model="text-moderation-latest"
+        )
+        self.assertEqual(messages[1].get_max_category(), ("self-harm", 0.9))
+
+        # and the verdicts are cached
+        self.assertTrue(asyncio.run(UserMessage("bad words").flagged_async()))
+        mock_create.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
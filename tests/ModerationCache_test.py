@@ -0,0 +1,160 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from TalkTurbo.ModerationCache import ModerationCache
+
+
+def response(flagged: bool = False, score: float = 0.1) -> dict:
+    return {
+        "id": "modr-1",
+        "model": "text-moderation-007",
+        "results": [
+            {
+                "flagged": flagged,
+                "categories": {"hate": flagged},
+                "category_scores": {"hate": score},
+            }
+        ],
+    }
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestModerationCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ModerationCache(max_size=2, ttl=60, clock=self.clock)
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get("hello", "model"))
+        self.cache.put("hello", "model", response(score=0.3))
+
+        cached = self.cache.get("hello", "model")
+
+        self.assertEqual(cached["results"][0]["category_scores"], {"hate": 0.3})
+        self.assertNotIn("id", cached)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_keyed_by_model(self):
+        self.cache.put("hello", "model-a", response())
+        self.assertIsNone(self.cache.get("hello", "model-b"))
+
+    def test_normalized_content(self):
+        self.cache.put("hello   there\n", "model", response())
+
+        self.assertIsNotNone(self.cache.get(" hello there", "model"))
+        self.assertIsNotNone(self.cache.get("ｈｅｌｌｏ there", "model"))
+        self.assertIsNone(self.cache.get("HELLO THERE", "model"))
+
+    def test_ttl(self):
+        self.cache.put("hello", "model", response())
+        self.clock.now += 61
+
+        self.assertIsNone(self.cache.get("hello", "model"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        self.cache.put("a", "model", response())
+        self.cache.put("b", "model", response())
+        self.cache.get("a", "model")
+        self.cache.put("c", "model", response())
+
+        self.assertIsNotNone(self.cache.get("a", "model"))
+        self.assertIsNone(self.cache.get("b", "model"))
+
+    def test_disabled(self):
+        cache = ModerationCache(max_size=0)
+        cache.put("hello", "model", response())
+        self.assertIsNone(cache.get("hello", "model"))
+
+    def test_configure_shrinks(self):
+        self.cache.put("a", "model", response())
+        self.cache.put("b", "model", response())
+        self.cache.configure(max_size=1, ttl=5)
+
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.ttl, 5)
+
+
+class TestModerationCacheDiskTier(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "moderations.sqlite")
+        self.clock = FakeClock()
+
+    def open(self) -> ModerationCache:
+        cache = ModerationCache(ttl=60, path=self.path, clock=self.clock)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_survives_restart(self):
+        self.open().put("hello", "model", response(flagged=True))
+
+        cache = self.open()
+        cached = cache.get("hello", "model")
+
+        self.assertTrue(cached["results"][0]["flagged"])
+        self.assertEqual(cache.disk_hits, 1)
+        # promoted to memory
+        cache.get("hello", "model")
+        self.assertEqual(cache.hits, 1)
+
+    def test_expired_rows_are_dropped(self):
+        self.open().put("hello", "model", response())
+        self.clock.now += 61
+
+        self.assertIsNone(self.open().get("hello", "model"))
+
+    def test_async_disk_tier_runs_off_the_event_loop(self):
+        threads = []
+        cache = self.open()
+        for name in ("_get_disk", "_put_disk"):
+            method = getattr(cache, name)
+
+            def record(*args, method=method):
+                threads.append(threading.current_thread())
+                return method(*args)
+
+            setattr(cache, name, record)
+
+        async def run():
+            await cache.put_async("hello", "model", response(flagged=True))
+            cache._verdicts.clear()
+            return await cache.get_async("hello", "model")
+
+        self.assertTrue(asyncio.run(run())["results"][0]["flagged"])
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+        self.assertEqual(cache.disk_hits, 1)
+
+        # written through to disk
+        self.assertIsNotNone(self.open().get("hello", "model"))
+
+    def test_async_memory_hit_skips_the_disk_tier(self):
+        cache = self.open()
+        cache.put("hello", "model", response())
+        cache._get_disk = None
+
+        self.assertIsNotNone(asyncio.run(cache.get_async("hello", "model")))
+        self.assertEqual(cache.hits, 1)
+
+    def test_clear(self):
+        cache = self.open()
+        cache.put("hello", "model", response())
+        cache.clear()
+
+        self.assertIsNone(self.open().get("hello", "model"))
+
+
+if __name__ == "__main__":
+    unittest.main()
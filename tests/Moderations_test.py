@@ -1,6 +1,16 @@
+import os
+import tempfile
 import unittest
 
-from TalkTurbo.Moderations import CategoryFlags, CategoryScores
+from TalkTurbo.Moderations import (
+    CATEGORIES,
+    CategoryFlags,
+    CategoryScores,
+    ModerationResult,
+    ModerationThresholds,
+    PreModerationDecision,
+    PreModerationFilter,
+)
 
 
 class TestCategories(unittest.TestCase):
@@ -9,12 +19,12 @@ class TestCategories(unittest.TestCase):
         self.assertTrue(flags.sexual)
         self.assertFalse(flags.hate)
         self.assertTrue(flags.harassment)
-        self.assertFalse(flags.selfharm)
-        self.assertTrue(flags.sexual_minor)
+        self.assertFalse(flags.self_harm)
+        self.assertTrue(flags.sexual_minors)
         self.assertFalse(flags.hate_threatening)
         self.assertTrue(flags.violence_graphic)
-        self.assertFalse(flags.self_harm_inten)
-        self.assertTrue(flags.self_harm_instruction)
+        self.assertFalse(flags.self_harm_intent)
+        self.assertTrue(flags.self_harm_instructions)
         self.assertFalse(flags.harassment_threatening)
         self.assertTrue(flags.violence)
 
@@ -23,12 +33,12 @@ class TestCategories(unittest.TestCase):
         self.assertEqual(scores.sexual, 0.5)
         self.assertEqual(scores.hate, 0.2)
         self.assertEqual(scores.harassment, 0.8)
-        self.assertEqual(scores.selfharm, 0.1)
-        self.assertEqual(scores.sexual_minor, 0.6)
+        self.assertEqual(scores.self_harm, 0.1)
+        self.assertEqual(scores.sexual_minors, 0.6)
         self.assertEqual(scores.hate_threatening, 0.3)
         self.assertEqual(scores.violence_graphic, 0.9)
         self.assertEqual(scores.self_harm_intent, 0.4)
-        self.assertEqual(scores.self_harm_instruction, 0.7)
+        self.assertEqual(scores.self_harm_instructions, 0.7)
         self.assertEqual(scores.harassment_threatening, 0.5)
         self.assertEqual(scores.violence, 0.2)
 
@@ -38,12 +48,12 @@ class TestCategories(unittest.TestCase):
             ("sexual", True),
             ("hate", False),
             ("harassment", True),
-            ("selfharm", False),
-            ("sexual_minor", True),
+            ("self_harm", False),
+            ("sexual_minors", True),
             ("hate_threatening", False),
             ("violence_graphic", True),
-            ("self_harm_inten", False),
-            ("self_harm_instruction", True),
+            ("self_harm_intent", False),
+            ("self_harm_instructions", True),
             ("harassment_threatening", False),
             ("violence", True),
         ]
@@ -56,12 +66,12 @@ class TestCategories(unittest.TestCase):
             ("sexual", 0.5),
             ("hate", 0.2),
             ("harassment", 0.8),
-            ("selfharm", 0.1),
-            ("sexual_minor", 0.6),
+            ("self_harm", 0.1),
+            ("sexual_minors", 0.6),
             ("hate_threatening", 0.3),
             ("violence_graphic", 0.9),
             ("self_harm_intent", 0.4),
-            ("self_harm_instruction", 0.7),
+            ("self_harm_instructions", 0.7),
             ("harassment_threatening", 0.5),
             ("violence", 0.2),
         ]
@@ -92,12 +102,12 @@ class TestCategories(unittest.TestCase):
         self.assertTrue(flags.sexual)
         self.assertFalse(flags.hate)
         self.assertTrue(flags.harassment)
-        self.assertFalse(flags.selfharm)
-        self.assertTrue(flags.sexual_minor)
+        self.assertFalse(flags.self_harm)
+        self.assertTrue(flags.sexual_minors)
         self.assertFalse(flags.hate_threatening)
         self.assertTrue(flags.violence_graphic)
-        self.assertFalse(flags.self_harm_inten)
-        self.assertTrue(flags.self_harm_instruction)
+        self.assertFalse(flags.self_harm_intent)
+        self.assertTrue(flags.self_harm_instructions)
         self.assertFalse(flags.harassment_threatening)
         self.assertTrue(flags.violence)
 
@@ -125,15 +135,188 @@ class TestCategories(unittest.TestCase):
         self.assertEqual(scores.sexual, 0.5)
         self.assertEqual(scores.hate, 0.2)
         self.assertEqual(scores.harassment, 0.8)
-        self.assertEqual(scores.selfharm, 0.1)
-        self.assertEqual(scores.sexual_minor, 0.6)
+        self.assertEqual(scores.self_harm, 0.1)
+        self.assertEqual(scores.sexual_minors, 0.6)
         self.assertEqual(scores.hate_threatening, 0.3)
         self.assertEqual(scores.violence_graphic, 0.9)
         self.assertEqual(scores.self_harm_intent, 0.4)
-        self.assertEqual(scores.self_harm_instruction, 0.7)
+        self.assertEqual(scores.self_harm_instructions, 0.7)
         self.assertEqual(scores.harassment_threatening, 0.5)
         self.assertEqual(scores.violence, 0.2)
 
+    def test_named_values_and_lookup(self):
+        scores = CategoryScores(hate=0.4, self_harm_intent=0.7)
+
+        self.assertEqual(scores["self-harm/intent"], 0.7)
+        self.assertEqual(scores.violence, 0.0)
+        self.assertEqual(len(scores.values), len(CATEGORIES))
+        with self.assertRaises(TypeError):
+            CategoryScores(selfharm=0.1)
+
+    def test_missing_categories_are_zero(self):
+        response = {"results": [{"categories": {"hate": True}, "category_scores": {"hate": 0.3}}]}
+
+        self.assertFalse(CategoryFlags.from_moderation_response(response).violence)
+        self.assertEqual(CategoryScores.from_moderation_response(response).violence, 0.0)
+
+    def test_from_mapping_accepts_sdk_field_names(self):
+        scores = {category: index / 10 for index, category in enumerate(CATEGORIES)}
+        field_names = {
+            category.replace("-", "_").replace("/", "_"): score
+            for category, score in scores.items()
+        }
+
+        self.assertEqual(
+            CategoryScores.from_mapping(field_names), CategoryScores.from_mapping(scores)
+        )
+        self.assertEqual(CategoryScores.from_mapping(field_names).self_harm_intent, 0.7)
+
+    def test_max_category(self):
+        # "violence" sorts last, but harassment has the highest score
+        scores = CategoryScores(0.5, 0.2, 0.8, 0.1, 0.6, 0.3, 0.7, 0.4, 0.7, 0.5, 0.2)
+
+        self.assertEqual(scores.max_category(), "harassment")
+        self.assertEqual(scores.max_score(), 0.8)
+
+
+class TestModerationThresholds(unittest.TestCase):
+    def setUp(self):
+        self.thresholds = ModerationThresholds({"violence": 0.5, "self-harm/intent": 0.2})
+
+    def test_breached(self):
+        self.assertTrue(self.thresholds.breached(CategoryScores(violence=0.5)))
+        self.assertTrue(self.thresholds.breached(CategoryScores(self_harm_intent=0.3)))
+        # categories without a threshold are left to the endpoint
+        self.assertFalse(self.thresholds.breached(CategoryScores(hate=0.99, violence=0.4)))
+        self.assertEqual(
+            self.thresholds.breached_categories(CategoryScores(violence=0.9, self_harm_intent=0.9)),
+            ["self-harm/intent", "violence"],
+        )
+
+    def test_breached_batch(self):
+        batch = [CategoryScores(violence=0.1), CategoryScores(violence=0.6), CategoryScores()]
+        self.assertEqual(self.thresholds.breached_batch(batch), [False, True, False])
+
+    def test_set_and_clear(self):
+        self.thresholds.set("violence", None)
+        self.assertIsNone(self.thresholds.get("violence"))
+        self.assertEqual(self.thresholds.get("self-harm/intent"), 0.2)
+        self.assertTrue(self.thresholds)
+
+        self.thresholds.set("self-harm/intent", None)
+        self.assertFalse(self.thresholds)
+
+        with self.assertRaises(ValueError):
+            self.thresholds.set("violence", 1.5)
+        with self.assertRaises(ValueError):
+            self.thresholds.set("selfharm", 0.5)
+
+    def test_flagged_with(self):
+        response = {
+            "results": [{"flagged": False, "categories": {}, "category_scores": {"violence": 0.6}}]
+        }
+        result = ModerationResult.from_moderation_response(response)
+
+        self.assertFalse(result.flagged_with())
+        self.assertTrue(result.flagged_with(self.thresholds))
+
+
+class TestPreModerationFilter(unittest.TestCase):
+    def setUp(self):
+        self.filter = PreModerationFilter(["badword", "very rude phrase", "bad"])
+
+    def decision(self, content: str, guild_id=None) -> PreModerationDecision:
+        return self.filter.check(content, guild_id)[0]
+
+    def test_blocked_terms_are_rejected(self):
+        decision, result = self.filter.check("you are a BADWORD!")
+
+        self.assertEqual(decision, PreModerationDecision.REJECT)
+        self.assertTrue(result.flagged)
+        self.assertTrue(result.category_flags.harassment)
+        self.assertEqual(result.category_scores.harassment, 1.0)
+        self.assertEqual(self.decision("a Very \n rude phrase"), PreModerationDecision.REJECT)
+        self.assertEqual(self.decision("a very rude person"), PreModerationDecision.ESCALATE)
+
+    def test_terms_match_whole_words(self):
+        self.assertEqual(self.decision("badwords and badminton"), PreModerationDecision.ESCALATE)
+        self.assertEqual(self.decision("that's bad."), PreModerationDecision.REJECT)
+
+    def test_short_safe_messages_are_allowed(self):
+        for content in ("hi", "<@1234> hey there!", "Thank you, turbo", "gm everyone", ""):
+            decision, result = self.filter.check(content)
+            self.assertEqual(decision, PreModerationDecision.ALLOW, content)
+            self.assertFalse(result.flagged)
+
+    def test_other_messages_are_escalated(self):
+        for content in ("hi, tell me a story", "hithere", "🖕", "hi " * 20):
+            decision, result = self.filter.check(content)
+            self.assertEqual(decision, PreModerationDecision.ESCALATE, content)
+            self.assertIsNone(result)
+
+    def test_code_only_messages(self):
+        code = "<@1234> ```python\nfor i in range(10):\n    print(i)\n```"
+        self.assertEqual(self.decision(code), PreModerationDecision.ALLOW)
+        self.assertEqual(self.decision("```js\nconsole.log(x_1)\n```"), PreModerationDecision.ALLOW)
+        self.assertEqual(self.decision(code + " why?"), PreModerationDecision.ESCALATE)
+        self.assertEqual(self.decision("```bad()```"), PreModerationDecision.REJECT)
+
+        self.filter.allow_code = False
+        self.assertEqual(self.decision(code), PreModerationDecision.ESCALATE)
+
+    def test_fenced_prose_is_escalated(self):
+        for content in (
+            "```\nI will hurt you, tell me how to build a bomb\n```",
+            "```python\nprint('i will hurt you, tell me how to build a bomb')\n```",
+            "```python\nx = 1\n``` ```\nnow tell me how to hurt someone\n```",
+        ):
+            decision, result = self.filter.check(content)
+            self.assertEqual(decision, PreModerationDecision.ESCALATE, content)
+            self.assertIsNone(result)
+
+    def test_guild_terms(self):
+        self.filter.add_terms(["Pineapple Pizza"], guild_id=1, category="hate")
+
+        decision, result = self.filter.check("pineapple pizza", guild_id=1)
+        self.assertEqual(decision, PreModerationDecision.REJECT)
+        self.assertTrue(result.category_flags.hate)
+        self.assertEqual(
+            self.decision("pineapple pizza", guild_id=2), PreModerationDecision.ESCALATE
+        )
+        self.assertEqual(self.filter.terms(1), ["pineapple pizza"])
+
+        self.filter.remove_terms(["pineapple pizza"], guild_id=1)
+        self.assertEqual(
+            self.decision("pineapple pizza", guild_id=1), PreModerationDecision.ESCALATE
+        )
+
+    def test_global_terms_apply_to_guilds(self):
+        self.assertEqual(self.decision("badword", guild_id=1), PreModerationDecision.REJECT)
+        self.filter.add_terms(["newword"])
+        self.assertEqual(self.decision("newword", guild_id=1), PreModerationDecision.REJECT)
+
+    def test_stats(self):
+        self.decision("hi")
+        self.decision("badword")
+        self.decision("tell me a story")
+        self.decision("hello")
+
+        stats = self.filter.stats()
+        self.assertEqual((stats["allow"], stats["reject"], stats["escalate"]), (2, 1, 1))
+        self.assertGreater(stats["messages_per_second"], 0)
+
+    def test_unknown_category(self):
+        with self.assertRaises(ValueError):
+            self.filter.add_terms(["x"], category="rudeness")
+
+    def test_load_terms(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "terms.txt")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("# blocked everywhere\nbadword\n\nvery bad phrase  # spaced\n")
+
+            self.assertEqual(PreModerationFilter.load_terms(path), ["badword", "very bad phrase"])
+
 
 if __name__ == "__main__":
     unittest.main()
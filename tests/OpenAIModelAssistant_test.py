@@ -1,6 +1,13 @@
+import asyncio
+import json
+import tempfile
 import unittest
 from unittest.mock import patch
 
+import httpx
+import requests
+
+from TalkTurbo.ChatContext import ChatContext
 from TalkTurbo.OpenAIModelAssistant import OpenAIModelAssistant
 
 
@@ -115,3 +122,93 @@ class TestOpenAIModelAssistant(unittest.TestCase):
         result = assistant._category_score(moderation_response)
 
         self.assertEqual(result, expected_result)
+
+
+class TestPooledRequests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_session_is_shared(self):
+        session = OpenAIModelAssistant.session()
+
+        self.assertIs(OpenAIModelAssistant().session(), session)
+        self.assertEqual(
+            session.get_adapter("https://api.openai.com")._pool_maxsize,
+            OpenAIModelAssistant.POOL_SIZE,
+        )
+
+    @patch.object(OpenAIModelAssistant.session(), "post")
+    def test_query_model_uses_timeouts(self, mock_post):
+        assistant = OpenAIModelAssistant(connect_timeout=1.0, read_timeout=2.0)
+
+        assistant.query_model(ChatContext(), prompt="hi")
+
+        self.assertEqual(mock_post.call_args.kwargs["timeout"], (1.0, 2.0))
+
+    @patch.object(OpenAIModelAssistant.session(), "post")
+    def test_query_dalle_timeout(self, mock_post):
+        mock_post.side_effect = requests.ReadTimeout("too slow")
+
+        self.assertIsNone(OpenAIModelAssistant().query_dalle("a cat", path=self.tmp.name + "/"))
+
+    def test_query_dalle_async(self):
+        requests_seen = []
+
+        def provider(request: httpx.Request) -> httpx.Response:
+            requests_seen.append(request)
+            if request.url.path == "/v1/images/generations":
+                return httpx.Response(
+                    200, json={"data": [{"url": "https://images.example/cat.png"}]}
+                )
+            return httpx.Response(200, content=b"png bytes")
+
+        async def generate():
+            assistant = OpenAIModelAssistant()
+            assistant._async_client = httpx.AsyncClient(transport=httpx.MockTransport(provider))
+            try:
+                return await assistant.query_dalle_async(
+                    "a cat", path=self.tmp.name + "/", openai_secret_key="key", use_dalle_3=True
+                )
+            finally:
+                await assistant.aclose()
+
+        path = asyncio.run(generate())
+
+        with open(path, "rb") as image:
+            self.assertEqual(image.read(), b"png bytes")
+        self.assertEqual(json.loads(requests_seen[0].content)["model"], "dall-e-3")
+        self.assertEqual(requests_seen[0].headers["authorization"], "Bearer key")
+
+    def test_query_dalle_async_without_image(self):
+        async def generate():
+            assistant = OpenAIModelAssistant()
+            assistant._async_client = httpx.AsyncClient(
+                transport=httpx.MockTransport(lambda request: httpx.Response(400, json={}))
+            )
+            return await assistant.query_dalle_async("a cat", path=self.tmp.name + "/")
+
+        self.assertIsNone(asyncio.run(generate()))
+
+    def test_query_dalle_async_unexpected_response(self):
+        responses = [
+            httpx.Response(200, content=b"<html>bad gateway</html>"),
+            httpx.Response(200, json={"data": []}),
+            httpx.Response(200, json={"data": None}),
+        ]
+
+        async def generate(response):
+            assistant = OpenAIModelAssistant()
+            assistant._async_client = httpx.AsyncClient(
+                transport=httpx.MockTransport(lambda request: response)
+            )
+            return await assistant.query_dalle_async("a cat", path=self.tmp.name + "/")
+
+        for response in responses:
+            with self.assertLogs("Turbo", level="WARNING"):
+                self.assertIsNone(asyncio.run(generate(response)))
+
+    def test_async_client_timeouts(self):
+        client = OpenAIModelAssistant(connect_timeout=1.0, read_timeout=2.0).async_client
+
+        self.assertEqual((client.timeout.connect, client.timeout.read), (1.0, 2.0))
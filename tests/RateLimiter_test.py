@@ -0,0 +1,143 @@
+import asyncio
+import time
+import unittest
+
+from TalkTurbo.RateLimiter import Priority, RateLimit, RateLimitScheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(60, clock=self.clock)
+
+    def test_starts_full(self):
+        self.assertEqual(self.bucket.delay(60), 0.0)
+
+    def test_refills_at_rate(self):
+        self.bucket.take(60)
+        self.assertAlmostEqual(self.bucket.delay(1), 1.0)
+
+        self.clock.now = 30
+        self.assertAlmostEqual(self.bucket.level, 30)
+        self.assertEqual(self.bucket.delay(30), 0.0)
+
+    def test_never_overfills(self):
+        self.clock.now = 1000
+        self.assertEqual(self.bucket.level, 60)
+
+    def test_requests_over_capacity_wait_for_full_bucket(self):
+        self.bucket.take(1)
+        self.assertAlmostEqual(self.bucket.delay(1000), 1.0)
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+    def test_unlimited_is_immediate(self):
+        scheduler = RateLimitScheduler({"openai": RateLimit(tokens_per_minute=60)})
+
+        async def main():
+            start = time.perf_counter()
+            for _ in range(10):
+                await scheduler.acquire("groq", "llama3-8b-8192", 10_000)
+            return time.perf_counter() - start
+
+        self.assertLess(asyncio.run(main()), 0.05)
+        self.assertEqual(scheduler.wait_times[Priority.MENTION].count, 0)
+
+    def test_token_limit_spreads_requests(self):
+        # 1000 tokens/s
+        scheduler = RateLimitScheduler({"openai": RateLimit(tokens_per_minute=60_000)})
+
+        async def main():
+            await scheduler.acquire("openai", "gpt-4o", 60_000)
+            start = time.perf_counter()
+            await scheduler.acquire("openai", "gpt-4o", 50)
+            return time.perf_counter() - start
+
+        self.assertGreaterEqual(asyncio.run(main()), 0.04)
+
+    def test_interactions_go_first(self):
+        scheduler = RateLimitScheduler({"openai/gpt-4o": RateLimit(tokens_per_minute=60_000)})
+        admitted = []
+
+        async def request(name: str, priority: Priority):
+            await scheduler.acquire("openai", "gpt-4o", 20, priority=priority)
+            admitted.append(name)
+
+        async def main():
+            await scheduler.acquire("openai", "gpt-4o", 60_000)
+            mentions = [
+                asyncio.create_task(request(f"mention {i}", Priority.MENTION)) for i in range(3)
+            ]
+            await asyncio.sleep(0)
+            interaction = asyncio.create_task(request("interaction", Priority.INTERACTION))
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.queue_depth("openai"), 4)
+            await asyncio.gather(*mentions, interaction)
+
+        asyncio.run(main())
+
+        self.assertEqual(admitted[0], "interaction")
+        self.assertEqual(scheduler.wait_times[Priority.INTERACTION].count, 1)
+        self.assertEqual(scheduler.queue_depth(), 0)
+
+    def test_models_queue_separately(self):
+        scheduler = RateLimitScheduler({"openai/gpt-4": RateLimit(requests_per_minute=1)})
+
+        async def main():
+            await scheduler.acquire("openai", "gpt-4", 1)
+            blocked = asyncio.create_task(scheduler.acquire("openai", "gpt-4", 1))
+            await asyncio.wait_for(scheduler.acquire("openai", "gpt-4o", 1), 0.1)
+            self.assertFalse(blocked.done())
+            blocked.cancel()
+
+        asyncio.run(main())
+
+    def test_priority_holds_across_models_sharing_a_provider_limit(self):
+        scheduler = RateLimitScheduler({"openai": RateLimit(tokens_per_minute=60_000)})
+        admitted = []
+
+        async def request(name: str, model: str, tokens: int, priority: Priority):
+            await scheduler.acquire("openai", model, tokens, priority=priority)
+            admitted.append(name)
+
+        async def main():
+            await scheduler.acquire("openai", "gpt-4o", 60_000)
+            # the smaller mention would fit in the shared bucket first
+            mention = asyncio.create_task(request("mention", "gpt-4o-mini", 100, Priority.MENTION))
+            await asyncio.sleep(0)
+            interaction = asyncio.create_task(
+                request("interaction", "gpt-4o", 500, Priority.INTERACTION)
+            )
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.queue_depth("openai", "gpt-4o"), 1)
+            await asyncio.gather(mention, interaction)
+
+        asyncio.run(main())
+
+        self.assertEqual(admitted, ["interaction", "mention"])
+
+    def test_parse_limits(self):
+        self.assertEqual(
+            RateLimitScheduler.parse_limits("openai=500:200000, openai/gpt-4o=:30000, groq=30"),
+            {
+                "openai": RateLimit(500, 200000),
+                "openai/gpt-4o": RateLimit(None, 30000),
+                "groq": RateLimit(30, None),
+            },
+        )
+        self.assertEqual(RateLimitScheduler.parse_limits(""), {})
+        for spec in ("=1:2", "openai=a:1", "openai=1:b"):
+            with self.assertRaises(ValueError):
+                RateLimitScheduler.parse_limits(spec)
+
+
+if __name__ == "__main__":
+    unittest.main()
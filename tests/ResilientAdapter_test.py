@@ -0,0 +1,266 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import httpx
+from openai import AsyncOpenAI
+
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ApiAdapters.OpenAIAdapter import OpenAIAdapter
+from TalkTurbo.ApiAdapters.ResilientAdapter import DeadlineExceededError, ResilientAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.CircuitBreaker import CircuitBreaker, CircuitOpenError, CircuitState
+from TalkTurbo.Messages import AssistantMessage, ContentMessage, UserMessage
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class FakeProvider(ApiAdapter):
+    """Answers with the scripted outcomes in order: an exception is raised, a str is returned."""
+
+    PROVIDER = "fake"
+
+    def __init__(self, *outcomes, latency: float = 0.0):
+        super().__init__(api_token="", model_name="fake-model", max_tokens=100)
+        self.outcomes = list(outcomes)
+        self.latency = latency
+        self.calls = 0
+
+    def _next(self) -> ContentMessage:
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return AssistantMessage(outcome)
+
+    def get_chat_completion(self, context: ChatContext) -> ContentMessage:
+        return self._next()
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        await asyncio.sleep(self.latency)
+        return self._next()
+
+    async def stream_chat_completion(self, context: ChatContext):
+        for word in self._next().content.split():
+            yield word
+
+    def convert_context_to_api_format(self, context: ChatContext):
+        return list(context.get_messages_as_list())
+
+
+def resilient(provider: ApiAdapter, **kwargs) -> ResilientAdapter:
+    kwargs.setdefault("breaker", CircuitBreaker("test", failure_threshold=3, reset_timeout=0.05))
+    kwargs.setdefault("base_delay", 0.001)
+    return ResilientAdapter(provider, sleep=lambda seconds: None, **kwargs)
+
+
+class TestRetries(unittest.TestCase):
+    def setUp(self):
+        self.context = ChatContext()
+        self.context.add_message(UserMessage("hello"))
+
+    def test_transient_errors_are_retried(self):
+        provider = FakeProvider(ProviderError(429), ProviderError(503), "hi")
+        adapter = resilient(provider)
+
+        response = asyncio.run(adapter.get_chat_completion_async(self.context))
+
+        self.assertEqual(response.content, "hi")
+        self.assertEqual(provider.calls, 3)
+        self.assertEqual(adapter.retries, 2)
+
+    def test_sync_calls_are_retried(self):
+        provider = FakeProvider(ConnectionError("reset"), "hi")
+        self.assertEqual(resilient(provider).get_chat_completion(self.context).content, "hi")
+        self.assertEqual(provider.calls, 2)
+
+    def test_bad_requests_are_not_retried(self):
+        provider = FakeProvider(ProviderError(400))
+        with self.assertRaises(ProviderError):
+            asyncio.run(resilient(provider).get_chat_completion_async(self.context))
+        self.assertEqual(provider.calls, 1)
+
+    def test_gives_up_after_max_retries(self):
+        provider = FakeProvider(*[ProviderError(500)] * 5)
+        adapter = resilient(provider, max_retries=2)
+
+        with self.assertRaises(ProviderError):
+            asyncio.run(adapter.get_chat_completion_async(self.context))
+        self.assertEqual(provider.calls, 3)
+        self.assertEqual(adapter.failures, 1)
+
+    def test_retry_after_is_honoured(self):
+        adapter = resilient(FakeProvider())
+        error = ProviderError(429, {"retry-after": "1.5"})
+
+        self.assertEqual(adapter.retry_after(error), 1.5)
+        self.assertEqual(adapter.retry_after(ProviderError(429, {"retry-after-ms": "250"})), 0.25)
+        self.assertIsNone(adapter.retry_after(ProviderError(429)))
+        self.assertGreaterEqual(adapter.backoff(0, retry_after=1.5), 1.5)
+
+    def test_backoff_is_jittered_and_capped(self):
+        adapter = resilient(FakeProvider(), base_delay=1.0, max_delay=4.0)
+        delays = [adapter.backoff(10) for _ in range(100)]
+
+        self.assertTrue(all(0 <= delay <= 4.0 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_deadline(self):
+        adapter = resilient(FakeProvider(latency=1.0), deadline=0.05)
+        with self.assertRaises(DeadlineExceededError):
+            asyncio.run(adapter.get_chat_completion_async(self.context))
+
+    def test_retry_past_deadline_gives_up(self):
+        provider = FakeProvider(ProviderError(429, {"retry-after": "10"}))
+        with self.assertRaises(ProviderError):
+            asyncio.run(resilient(provider, deadline=1.0).get_chat_completion_async(self.context))
+        self.assertEqual(provider.calls, 1)
+
+    def test_stream_deadline(self):
+        class SlowStream(FakeProvider):
+            async def stream_chat_completion(self, context):
+                self.calls += 1
+                await asyncio.sleep(1.0)
+                yield "late"
+
+        provider = SlowStream()
+
+        async def collect():
+            adapter = resilient(provider, deadline=0.05)
+            return [delta async for delta in adapter.stream_chat_completion(self.context)]
+
+        with self.assertRaises(DeadlineExceededError):
+            asyncio.run(collect())
+        self.assertEqual(provider.calls, 1)
+
+    def test_stream_retried_before_first_delta(self):
+        provider = FakeProvider(ProviderError(502), "hello there")
+
+        async def collect():
+            return [
+                delta async for delta in resilient(provider).stream_chat_completion(self.context)
+            ]
+
+        self.assertEqual(asyncio.run(collect()), ["hello", "there"])
+        self.assertEqual(provider.calls, 2)
+
+    def test_delegates_budgets(self):
+        wrapped = OpenAIAdapter(api_token="test", model_name="gpt-4")
+        adapter = resilient(wrapped)
+
+        self.assertEqual(adapter.PROVIDER, "openai")
+        self.assertEqual(adapter.context_budget(), wrapped.context_budget())
+        self.assertIs(adapter.token_counter, wrapped.token_counter)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.context = ChatContext()
+        self.breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0.05)
+
+    def test_opens_and_fails_fast(self):
+        provider = FakeProvider(*[ProviderError(503)] * 3)
+        adapter = resilient(provider, max_retries=0, breaker=self.breaker)
+
+        for _ in range(3):
+            with self.assertRaises(ProviderError):
+                asyncio.run(adapter.get_chat_completion_async(self.context))
+
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            asyncio.run(adapter.get_chat_completion_async(self.context))
+        self.assertEqual(provider.calls, 3)
+
+    def test_recovers_through_half_open(self):
+        provider = FakeProvider(*[ProviderError(503)] * 3, "back")
+        adapter = resilient(provider, max_retries=0, breaker=self.breaker)
+
+        for _ in range(3):
+            with self.assertRaises(ProviderError):
+                asyncio.run(adapter.get_chat_completion_async(self.context))
+
+        asyncio.run(asyncio.sleep(0.06))
+        self.assertEqual(self.breaker.state, CircuitState.HALF_OPEN)
+
+        response = asyncio.run(adapter.get_chat_completion_async(self.context))
+
+        self.assertEqual(response.content, "back")
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+        self.assertEqual(
+            self.breaker.stats()["transitions"],
+            {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1},
+        )
+
+    def test_failed_trial_reopens(self):
+        clock = SimpleNamespace(now=0.0)
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, reset_timeout=10, clock=lambda: clock.now
+        )
+        breaker.record_failure()
+        clock.now = 10
+
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            # only one trial call at a time
+            breaker.before_call()
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+
+
+class TestLocalProvider(unittest.TestCase):
+    """OpenAIAdapter against a local stand-in for the OpenAI API that injects errors."""
+
+    def test_rate_limited_then_answers(self):
+        responses = [
+            httpx.Response(
+                429, headers={"retry-after": "0"}, json={"error": {"message": "slow down"}}
+            ),
+            httpx.Response(500, json={"error": {"message": "oops"}}),
+            httpx.Response(
+                200,
+                json={
+                    "id": "1",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": "gpt-4o-mini",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "made it"},
+                        }
+                    ],
+                },
+            ),
+        ]
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return responses.pop(0)
+
+        openai_adapter = OpenAIAdapter(api_token="test")
+        openai_adapter._async_open_ai_client = AsyncOpenAI(
+            api_key="test",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        adapter = resilient(openai_adapter)
+
+        context = ChatContext()
+        context.add_message(UserMessage("hello"))
+        response = asyncio.run(adapter.get_chat_completion_async(context))
+
+        self.assertEqual(response.content, "made it")
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(adapter.retries, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
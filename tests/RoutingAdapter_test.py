@@ -0,0 +1,176 @@
+import asyncio
+import unittest
+
+from TalkTurbo.ApiAdapters.ApiAdapter import ApiAdapter
+from TalkTurbo.ApiAdapters.GroqAdapter import GroqAdapter
+from TalkTurbo.ApiAdapters.OpenAIAdapter import OpenAIAdapter
+from TalkTurbo.ApiAdapters.RoutingAdapter import RoutingAdapter
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.CompletionAssistant import CompletionAssistant
+from TalkTurbo.Messages import AssistantMessage, ContentMessage, UserMessage
+
+
+class SleepyProvider(ApiAdapter):
+    """Answers with its own name after latency seconds, or raises error."""
+
+    def __init__(self, provider: str, latency: float = 0.0, error: Exception = None):
+        super().__init__(api_token="", model_name="model", max_tokens=100)
+        self.PROVIDER = provider
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    def get_chat_completion(self, context: ChatContext) -> ContentMessage:
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return AssistantMessage(self.PROVIDER)
+
+    async def get_chat_completion_async(self, context: ChatContext) -> ContentMessage:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return AssistantMessage(self.PROVIDER)
+
+    def convert_context_to_api_format(self, context: ChatContext):
+        return list(context.get_messages_as_list())
+
+
+def seed(adapter: ApiAdapter, latency: float, count: int = 20):
+    for _ in range(count):
+        RoutingAdapter.MODEL_STATS[RoutingAdapter.stats_key(adapter)].record_success(latency)
+
+
+class TestRoutingAdapter(unittest.TestCase):
+    def setUp(self):
+        RoutingAdapter.MODEL_STATS.clear()
+        self.context = ChatContext()
+        self.context.add_message(UserMessage("hello"))
+
+    def complete(self, router: RoutingAdapter) -> str:
+        return asyncio.run(router.get_chat_completion_async(self.context)).content
+
+    def test_routes_to_fastest(self):
+        slow, fast = SleepyProvider("slow"), SleepyProvider("fast")
+        seed(slow, 2.0)
+        seed(fast, 0.5)
+
+        router = RoutingAdapter([slow, fast])
+
+        self.assertEqual(router.ranked(), [fast, slow])
+        self.assertEqual(self.complete(router), "fast")
+
+    def test_untried_candidates_go_first(self):
+        known, new = SleepyProvider("known"), SleepyProvider("new")
+        seed(known, 0.1)
+        self.assertEqual(RoutingAdapter([known, new]).ranked()[0], new)
+
+    def test_errors_are_penalized(self):
+        flaky, steady = SleepyProvider("flaky"), SleepyProvider("steady")
+        seed(flaky, 0.5)
+        for _ in range(10):
+            RoutingAdapter.MODEL_STATS[RoutingAdapter.stats_key(flaky)].record_error()
+        seed(steady, 1.0)
+
+        self.assertEqual(RoutingAdapter([flaky, steady]).ranked()[0], steady)
+
+    def test_fails_over(self):
+        broken = SleepyProvider("broken", error=ConnectionError("down"))
+        backup = SleepyProvider("backup")
+        seed(backup, 1.0)
+
+        router = RoutingAdapter([broken, backup])
+
+        self.assertEqual(self.complete(router), "backup")
+        self.assertEqual(router.stats_for(broken).error_rate, 1.0)
+        self.assertEqual(router.ranked()[0], backup)
+
+    def test_sync_fails_over(self):
+        router = RoutingAdapter([SleepyProvider("a", error=ConnectionError()), SleepyProvider("b")])
+        self.assertEqual(router.get_chat_completion(self.context).content, "b")
+
+    def test_all_fail(self):
+        router = RoutingAdapter([SleepyProvider("a", error=ConnectionError("down"))])
+        with self.assertRaises(ConnectionError):
+            self.complete(router)
+
+    def test_hedge_wins_when_primary_stalls(self):
+        stalled = SleepyProvider("stalled", latency=1.0)
+        backup = SleepyProvider("backup", latency=0.01)
+        seed(stalled, 0.01)
+        seed(backup, 0.05)
+
+        router = RoutingAdapter([stalled, backup], hedge=True)
+
+        self.assertEqual(self.complete(router), "backup")
+        self.assertEqual((router.hedges, router.hedges_won), (1, 1))
+        self.assertEqual(stalled.cancelled, 1)
+
+    def test_fails_over_when_primary_fails_before_the_hedge(self):
+        failing = SleepyProvider("failing", error=RuntimeError("a boom"))
+        backup = SleepyProvider("backup")
+        seed(failing, 0.5)
+        seed(backup, 1.0)
+
+        router = RoutingAdapter([failing, backup], hedge=True)
+
+        self.assertEqual(router.ranked()[0], failing)
+        self.assertEqual(self.complete(router), "backup")
+        self.assertEqual(router.hedges, 0)
+        self.assertEqual((failing.calls, backup.calls), (1, 1))
+
+    def test_no_hedge_when_primary_is_fast(self):
+        primary = SleepyProvider("primary", latency=0.0)
+        backup = SleepyProvider("backup")
+        seed(primary, 0.5)
+        seed(backup, 1.0)
+
+        router = RoutingAdapter([primary, backup], hedge=True)
+
+        self.assertEqual(self.complete(router), "primary")
+        self.assertEqual(router.hedges, 0)
+        self.assertEqual(backup.calls, 0)
+
+    def test_no_hedge_without_stats(self):
+        router = RoutingAdapter([SleepyProvider("a"), SleepyProvider("b")], hedge=True)
+        self.complete(router)
+        self.assertEqual(router.hedges, 0)
+
+    def test_scheduled_once_per_candidate_tried(self):
+        class RecordingScheduler:
+            def __init__(self):
+                self.requests = []
+
+            async def acquire(self, provider, model, tokens, priority=None, deadline=None):
+                self.requests.append(provider)
+
+        scheduler = RecordingScheduler()
+        failing, working = SleepyProvider("failing", error=ConnectionError()), SleepyProvider("ok")
+        router = RoutingAdapter([failing, working], scheduler=scheduler)
+        CompletionAssistant.set_adapter(router)
+        CompletionAssistant.set_scheduler(scheduler)
+        self.addCleanup(CompletionAssistant.set_scheduler, None)
+
+        asyncio.run(CompletionAssistant.get_chat_completion_async(self.context, router))
+
+        self.assertEqual(scheduler.requests, ["failing", "ok"])
+
+    def test_context_fits_every_candidate(self):
+        small = GroqAdapter(api_token="test", model_name="llama3-8b-8192")
+        large = OpenAIAdapter(api_token="test", model_name="gpt-4o-mini")
+        router = RoutingAdapter([large, small])
+
+        router.fit_context(self.context)
+
+        self.assertEqual(self.context.max_tokens, small.context_budget())
+        self.assertEqual(router.context_budget(), small.context_budget())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+
+from TalkTurbo.StreamingReply import MAX_MESSAGE_LENGTH, StreamingReply, split_message
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.contents = [content]
+
+    async def edit(self, content: str):
+        self.contents.append(content)
+
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+        self.now = 0.0
+
+    async def send(self, content: str) -> FakeMessage:
+        message = FakeMessage(content)
+        self.sent.append(message)
+        return message
+
+    def clock(self) -> float:
+        return self.now
+
+
+class TestStreamingReply(unittest.TestCase):
+    def setUp(self):
+        self.channel = FakeChannel()
+        self.reply = StreamingReply(self.channel.send, min_interval=1.0, clock=self.channel.clock)
+
+    def stream(self, deltas: list[str], step: float = 0.1, empty_text: str = None):
+        async def main():
+            for delta in deltas:
+                await self.reply.append(delta)
+                self.channel.now += step
+            await self.reply.finish(empty_text)
+
+        asyncio.run(main())
+
+    def test_first_delta_is_sent(self):
+        self.stream(["hello"])
+        self.assertEqual(len(self.channel.sent), 1)
+        self.assertEqual(self.channel.sent[0].contents, ["hello"])
+
+    def test_edits_are_throttled(self):
+        # 30 deltas over 3 seconds
+        self.stream([f"{i} " for i in range(30)], step=0.1)
+
+        message = self.channel.sent[0]
+        self.assertEqual(len(self.channel.sent), 1)
+        self.assertLessEqual(self.reply.edit_count, 4)
+        self.assertEqual(message.contents[-1], self.reply.text)
+
+    def test_whitespace_is_not_sent(self):
+        self.stream(["\n", " ", "text"])
+        self.assertEqual(self.channel.sent[0].contents, ["\n text"])
+
+    def test_empty_stream(self):
+        self.stream([], empty_text="nothing to say")
+        self.assertEqual(self.channel.sent[0].contents, ["nothing to say"])
+
+    def test_overflow_continues_in_follow_ups(self):
+        self.stream(["a" * 1500, "b" * 1500], step=1.0)
+
+        shown = [message.contents[-1] for message in self.channel.sent]
+        self.assertEqual(len(shown), 2)
+        self.assertTrue(all(len(page) <= StreamingReply.MAX_LENGTH for page in shown))
+        self.assertEqual("".join(shown), "a" * 1500 + "b" * 1500)
+
+    def test_overflow_splits_between_lines(self):
+        lines = [f"line {i}: " + "x" * 90 for i in range(30)]
+        self.stream([line + "\n" for line in lines], step=0.5)
+
+        shown = [message.contents[-1] for message in self.channel.sent]
+        self.assertEqual(len(shown), 2)
+        self.assertEqual("\n".join(shown).split("\n")[:30], lines)
+
+
+class TestSplitMessage(unittest.TestCase):
+    def test_short_text_is_one_message(self):
+        self.assertEqual(split_message("a\nb"), ["a\nb"])
+        self.assertEqual(split_message(""), [""])
+
+    def test_splits_between_lines(self):
+        lines = [f"line {i}: " + "x" * 90 for i in range(60)]
+        pages = split_message("\n".join(lines))
+
+        self.assertGreater(len(pages), 1)
+        self.assertTrue(all(len(page) <= MAX_MESSAGE_LENGTH for page in pages))
+        self.assertEqual("\n".join(pages).split("\n"), lines)
+
+    def test_long_line_is_cut(self):
+        self.assertEqual(split_message("ab\nabcdefghij\nc", 4), ["ab", "abcd", "efgh", "ij\nc"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from TalkTurbo.ChatContext import ChatContext
+from TalkTurbo.Messages import UserMessage
+from TalkTurbo.Tokenizers import (
+    ApproximateTokenCounter,
+    TiktokenCounter,
+    TokenCountCache,
+    TokenCounter,
+    TokenizerRegistry,
+)
+
+
+class TestTokenizerRegistry(unittest.TestCase):
+    def test_single_instance_per_encoding(self):
+        self.assertIs(TokenizerRegistry.get("cl100k_base"), TokenizerRegistry.get("cl100k_base"))
+        self.assertIs(TokenizerRegistry.get(), TokenizerRegistry.get("cl100k_base"))
+
+    def test_single_instance_across_threads(self):
+        TokenizerRegistry._COUNTERS.pop("p50k_base", None)
+        created = []
+        init = TiktokenCounter.__init__
+
+        def slow_init(counter, name):
+            time.sleep(0.01)
+            init(counter, name)
+            created.append(counter)
+
+        barrier = threading.Barrier(8)
+        results = []
+
+        def get():
+            barrier.wait()
+            results.append(TokenizerRegistry.get("p50k_base"))
+
+        with patch.object(TiktokenCounter, "__init__", slow_init):
+            threads = [threading.Thread(target=get) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(created), 1)
+        self.assertTrue(all(counter is created[0] for counter in results))
+
+    def test_encoding_for_model(self):
+        self.assertEqual(TokenizerRegistry.encoding_for_model("gpt-4o-mini"), "o200k_base")
+        self.assertEqual(TokenizerRegistry.encoding_for_model("o1-preview"), "o200k_base")
+        self.assertEqual(TokenizerRegistry.encoding_for_model("gpt-4"), "cl100k_base")
+        self.assertEqual(
+            TokenizerRegistry.encoding_for_model("claude-3-haiku-20240307"),
+            ApproximateTokenCounter.NAME,
+        )
+        self.assertEqual(
+            TokenizerRegistry.encoding_for_model("llama3-8b-8192"), ApproximateTokenCounter.NAME
+        )
+
+    def test_encodings_load_lazily(self):
+        counter = TiktokenCounter("o200k_base")
+        self.assertIsNone(counter._encoding)
+
+    def test_approximate_counter(self):
+        counter = TokenizerRegistry.get(ApproximateTokenCounter.NAME)
+        self.assertIsInstance(counter, ApproximateTokenCounter)
+        self.assertEqual(counter.count(""), 0)
+        self.assertEqual(counter.count("a" * 35), 10)
+        with self.assertRaises(NotImplementedError):
+            counter.encode("hello")
+
+    def test_message_recounts_for_new_counter(self):
+        message = UserMessage("a" * 70)
+        exact = message.token_count(TokenizerRegistry.get("cl100k_base"))
+        approximate = message.token_count(TokenizerRegistry.get(ApproximateTokenCounter.NAME))
+
+        self.assertEqual(approximate, 20)
+        self.assertNotEqual(exact, approximate)
+
+    def test_context_set_token_counter(self):
+        c = ChatContext(max_tokens=15)
+        c.add_message(UserMessage("a" * 35))
+        c.add_message(UserMessage("b" * 35))
+        self.assertEqual(len(c.messages), 2)
+
+        c.set_token_counter(TokenizerRegistry.get(ApproximateTokenCounter.NAME))
+
+        self.assertEqual(c.context_length_in_tokens(), 10)
+        self.assertEqual(len(c.messages), 1)
+
+
+class TestTokenCountCache(unittest.TestCase):
+    def setUp(self):
+        self.counter = TokenizerRegistry.get("cl100k_base")
+
+    def test_hits_and_misses(self):
+        cache = TokenCountCache(max_size=8)
+        first = cache.count(self.counter, "hello there")
+        second = cache.count(self.counter, "hello there")
+
+        self.assertEqual(first, second)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 1, "max_size": 8})
+
+    def test_keyed_by_encoding(self):
+        class WordCounter(TokenCounter):
+            def count(self, text: str) -> int:
+                return len(text.split())
+
+        cache = TokenCountCache()
+        cache.count(self.counter, "hello there")
+        self.assertEqual(cache.count(WordCounter("words"), "hello there"), 2)
+        self.assertEqual(len(cache), 2)
+
+    def test_lru_eviction(self):
+        cache = TokenCountCache(max_size=2)
+        cache.count(self.counter, "a")
+        cache.count(self.counter, "b")
+        cache.count(self.counter, "a")
+        cache.count(self.counter, "c")
+
+        self.assertIn(TokenCountCache._key("a", self.counter.name), cache._counts)
+        self.assertNotIn(TokenCountCache._key("b", self.counter.name), cache._counts)
+
+    def test_disabled(self):
+        cache = TokenCountCache(max_size=0)
+        cache.count(self.counter, "hello")
+        cache.count(self.counter, "hello")
+        self.assertEqual(cache.stats()["hits"], 0)
+        self.assertEqual(len(cache), 0)
+
+    def test_approximate_counts_are_not_cached(self):
+        cache = TokenCountCache()
+        cache.count(TokenizerRegistry.get(ApproximateTokenCounter.NAME), "hello")
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 import unittest
 
-from TalkTurbo.Messages import UserMessage
-from TalkTurbo.TurboGuild import TurboGuildMap
+from TalkTurbo.ContextPrefix import ContextPrefix
+from TalkTurbo.Messages import SystemMessage, UserMessage
+from TalkTurbo.TurboGuild import TurboGuild, TurboGuildMap
 
 
 class TurboGuildMapTest(unittest.TestCase):
@@ -29,6 +30,32 @@ class TurboGuildMapTest(unittest.TestCase):
             guild2.chat_context.get_messages_as_list(),
         )
 
+    def test_guilds_share_default_prefix(self):
+        guild_map = TurboGuildMap()
+        guild1 = guild_map.get("123")
+        guild2 = guild_map.get("456")
+
+        self.assertIs(guild1.chat_context.prefix, TurboGuild.DEFAULT_PREFIX)
+        self.assertIs(guild2.chat_context.prefix, TurboGuild.DEFAULT_PREFIX)
+
+    def test_custom_default_prefix(self):
+        prefix = ContextPrefix(SystemMessage("You are a cat."), [UserMessage("hi")])
+        guild_map = TurboGuildMap(default_prefix=prefix)
+        guild = guild_map.get("123")
+
+        self.assertIs(guild.chat_context.prefix, prefix)
+        self.assertEqual(guild.chat_context.get_messages_as_list()[0]["content"], "You are a cat.")
+
+    def test_guilds_get_own_work_queues(self):
+        guild_map = TurboGuildMap(coalesce_window=0.25, coalesce_max_batch=3)
+        guild1 = guild_map.get("123")
+        guild2 = guild_map.get("456")
+
+        self.assertIsNot(guild1.work_queue, guild2.work_queue)
+        self.assertEqual(guild1.work_queue.coalesce_window, 0.25)
+        self.assertEqual(guild1.work_queue.max_batch, 3)
+        self.assertEqual(guild_map.requests_saved(), 0)
+
     def test_single_guild_reference(self):
         """sanity test: test that the same guild is returned when the same id is used."""
         guild_map = TurboGuildMap()